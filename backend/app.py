@@ -1,18 +1,30 @@
 """
 Flask 主应用程序
 """
+import json
 import os
-from flask import Flask, request, jsonify
+import queue
+import sys
+import threading
+from pathlib import Path
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
-from datetime import datetime
+from datetime import datetime, timedelta
+
+# database 包位于项目根目录
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 from config import config
 from services.arxiv_service import ArxivService
 from services.ai_service import AIService
-from services.cache_service import CacheService
+from services.cache_service import CacheRefresher, CacheService, CacheSweeper, make_cache_key
 from services.authority_service import PaperEnhancementService
 from services.analysis_service import PaperAnalysisService
+from services.paper_store import PaperStore
+from services.harvest_service import HarvestService, HarvestScheduler
+from services.job_service import JobService
+from services.singleflight import SingleFlight, SingleFlightError, SingleFlightTimeout
 
 # 加载环境变量
 load_dotenv()
@@ -34,54 +46,389 @@ CORS(app, resources={
 })
 
 # 初始化服务
+# 本地论文库（arXiv论文的写穿透存储）
+paper_store = None
+if app.config.get('PAPER_STORE_ENABLED', True):
+    try:
+        paper_store = PaperStore(app.config['SQLALCHEMY_DATABASE_URI'])
+    except Exception as e:
+        print(f"⚠ Warning: Could not initialize paper store: {e}")
+
 arxiv_service = ArxivService(
     max_results=app.config.get('ARXIV_MAX_RESULTS', 100),
-    timeout=app.config.get('REQUEST_TIMEOUT', 30)
+    timeout=app.config.get('REQUEST_TIMEOUT', 30),
+    page_size=app.config.get('ARXIV_PAGE_SIZE', 500),
+    max_concurrent_pages=app.config.get('ARXIV_MAX_CONCURRENT_PAGES', 3),
+    request_interval=app.config.get('ARXIV_REQUEST_INTERVAL', 3.0),
+    pool_size=app.config.get('ARXIV_POOL_SIZE', 10),
+    max_retries=app.config.get('ARXIV_MAX_RETRIES', 3),
+    retry_backoff=app.config.get('ARXIV_RETRY_BACKOFF', 1.0),
+    id_batch_size=app.config.get('ARXIV_ID_BATCH_SIZE', 100),
+    paper_store=paper_store,
+    base_url=app.config.get('ARXIV_BASE_URL')
 )
 
 cache_service = CacheService(
-    expiry_days=app.config.get('CACHE_EXPIRY_DAYS', 30)
+    cache_dir=app.config.get('CACHE_DIR', './cache'),
+    expiry_days=app.config.get('CACHE_EXPIRY_DAYS', 30),
+    backend=app.config.get('CACHE_BACKEND', 'sqlite'),
+    memory_max_mb=app.config.get('CACHE_MEMORY_MAX_MB', 64),
+    codec=app.config.get('CACHE_CODEC', 'zlib'),
+    codec_level=app.config.get('CACHE_CODEC_LEVEL', 6),
+    max_size_mb=app.config.get('CACHE_MAX_SIZE_MB', 0),
+    eviction_policy=app.config.get('CACHE_EVICTION_POLICY', 'lru'),
+    memory_revalidate_seconds=app.config.get('CACHE_MEMORY_REVALIDATE_SECONDS', 2)
+)
+
+# 后台清理：分批删除过期条目，并按淘汰策略把缓存控制在容量上限内
+cache_sweeper = None
+if app.config.get('CACHE_SWEEP_INTERVAL_MINUTES', 10) > 0:
+    cache_sweeper = CacheSweeper(
+        cache_service,
+        interval_seconds=app.config['CACHE_SWEEP_INTERVAL_MINUTES'] * 60,
+        batch_size=app.config.get('CACHE_SWEEP_BATCH_SIZE', 500)
+    )
+    cache_sweeper.start()
+
+# 搜索结果的软/硬过期：软过期后先返回陈旧结果，由后台线程刷新
+search_soft_ttl = int(app.config.get('SEARCH_CACHE_SOFT_TTL_HOURS', 24) * 3600)
+search_hard_ttl = int(app.config.get('SEARCH_CACHE_HARD_TTL_HOURS', 24 * 30) * 3600)
+cache_refresher = CacheRefresher(cache_service, max_workers=app.config.get('CACHE_REFRESH_WORKERS', 2))
+
+# 相同搜索的并发请求只计算一次（本进程内的线程之间，以及同一主机的多个工作进程之间）
+search_flight = SingleFlight(
+    lock_dir=app.config.get('SINGLEFLIGHT_LOCK_DIR') or os.path.join(app.config.get('CACHE_DIR', './cache'), 'locks'),
+    timeout=app.config.get('SINGLEFLIGHT_TIMEOUT', 120)
 )
 
+# 进程内增量采集（可选，也可以用 harvest.py 单独运行）
+harvest_scheduler = None
+if paper_store and app.config.get('HARVEST_ENABLED') and app.config.get('HARVEST_CATEGORIES'):
+    harvest_scheduler = HarvestScheduler(
+        HarvestService(
+            arxiv_service,
+            paper_store,
+            initial_days=app.config.get('HARVEST_INITIAL_DAYS', 7),
+            overlap_hours=app.config.get('HARVEST_OVERLAP_HOURS', 48)
+        ),
+        app.config['HARVEST_CATEGORIES'],
+        interval_hours=app.config.get('HARVEST_INTERVAL_HOURS', 24)
+    )
+    harvest_scheduler.start()
+
 # 论文信息增强服务
 enhancement_service = PaperEnhancementService()
 
 # AI服务（如果提供了API密钥）
 ai_service = None
 ai_provider = app.config.get('AI_PROVIDER', 'qwen3').lower()
+ai_options = {
+    'max_workers': app.config.get('AI_MAX_WORKERS', 4),
+    'requests_per_minute': app.config.get('AI_REQUESTS_PER_MINUTE', 0),
+    'tokens_per_minute': app.config.get('AI_TOKENS_PER_MINUTE', 0),
+    'request_timeout': app.config.get('AI_REQUEST_TIMEOUT', 30),
+    'item_timeout': app.config.get('AI_ITEM_TIMEOUT', 60),
+    # 总结和关键词按内容寻址缓存，/api/summarize 与批量任务共享
+    'result_cache': cache_service,
+    'result_cache_ttl': int(app.config.get('AI_RESULT_CACHE_DAYS', 180) * 24 * 3600),
+    'packed': app.config.get('AI_PACKED_SUMMARIES', False),
+    'pack_token_budget': app.config.get('AI_PACK_TOKEN_BUDGET', 6000),
+    'pack_max_papers': app.config.get('AI_PACK_MAX_PAPERS', 20),
+    # 重试、熔断和对冲按供应商生效，都失败时可用摘要节选兜底
+    'local_fallback': app.config.get('AI_LOCAL_FALLBACK', True),
+    'max_retries': app.config.get('AI_MAX_RETRIES', 2),
+    'retry_backoff': app.config.get('AI_RETRY_BACKOFF', 0.5),
+    'retry_max_backoff': app.config.get('AI_RETRY_MAX_BACKOFF', 8),
+    'breaker_failures': app.config.get('AI_BREAKER_FAILURES', 5),
+    'breaker_reset_seconds': app.config.get('AI_BREAKER_RESET_SECONDS', 60),
+    'hedge_after': app.config.get('AI_HEDGE_AFTER', 0)
+}
+
+
+def build_ai_service(provider: str, model: str = None, **options):
+    """
+    按供应商创建AI服务，缺少API密钥或初始化失败时返回None
+    
+    Args:
+        provider: 'qwen3' 或 'gemini'
+        model: 模型名称（可选，默认使用该供应商的模型配置）
+        **options: 传给 AIService 的其他参数
+    """
+    if provider == 'qwen3':
+        api_key = app.config.get('QWEN3_API_KEY')
+        model = model or app.config.get('QWEN3_MODEL', 'free:QwQ-32B')
+        options['api_endpoint'] = app.config.get('QWEN3_API_ENDPOINT', 'https://api.suanli.cn/v1')
+        name = 'Qwen3'
+    elif provider == 'gemini':
+        api_key = app.config.get('GEMINI_API_KEY')
+        model = model or app.config.get('GEMINI_MODEL', 'gemini-pro')
+        name = 'Gemini'
+    else:
+        print(f"⚠ Warning: Unknown AI provider: {provider}")
+        return None
+    
+    if not api_key:
+        print(f"⚠ Warning: {provider.upper()}_API_KEY not set in environment")
+        return None
+    
+    try:
+        service = AIService(api_key=api_key, model=model, provider=provider, **options)
+        print(f"✓ {name} AI service initialized successfully")
+        return service
+    except Exception as e:
+        print(f"⚠ Warning: Could not initialize {name} AI service: {e}")
+        return None
+
+
+# 主供应商在前，备用供应商按配置顺序排在后面；主供应商不可用时由第一个可用的备用供应商顶替
+ai_chain = [build_ai_service(ai_provider, app.config.get('AI_MODEL'), **ai_options)]
+for fallback_provider in app.config.get('AI_FALLBACK_PROVIDERS', []):
+    if fallback_provider != ai_provider:
+        ai_chain.append(build_ai_service(fallback_provider, **ai_options))
+ai_chain = [service for service in ai_chain if service]
+
+if ai_chain:
+    ai_service = ai_chain[0]
+    ai_service.fallbacks = ai_chain[1:]
+    if ai_service.fallbacks:
+        print(f"✓ AI provider chain: {' → '.join(s.provider for s in ai_chain)}")
+
+# 论文分析服务（用于生成总结和聚合）
+# 已结束季度的论文集合不再变化，其综述与AI总结一样长期缓存
+analysis_service = PaperAnalysisService(
+    ai_service=ai_service,
+    cache_service=cache_service,
+    hierarchical=app.config.get('TRAJECTORY_MODE', 'hierarchical') == 'hierarchical',
+    max_workers=app.config.get('TRAJECTORY_MAX_WORKERS', 4),
+    closed_quarter_ttl=int(app.config.get('AI_RESULT_CACHE_DAYS', 180) * 24 * 3600),
+    open_quarter_ttl=int(app.config.get('TRAJECTORY_OPEN_QUARTER_TTL_HOURS', 24) * 3600),
+    quarter_token_budget=app.config.get('TRAJECTORY_QUARTER_TOKEN_BUDGET', 3000),
+    trajectory_token_budget=app.config.get('TRAJECTORY_TOKEN_BUDGET', 4000),
+    max_abstract_tokens=app.config.get('ANALYSIS_MAX_ABSTRACT_TOKENS', 120)
+)
 
-if ai_provider == 'qwen3':
-    if app.config.get('QWEN3_API_KEY'):
+# 后台任务（发展脉络等耗时的AI生成），任务状态写入缓存，多个工作进程之间都能查询
+job_service = JobService(
+    max_workers=app.config.get('JOB_WORKERS', 2),
+    result_store=cache_service,
+    result_ttl=int(app.config.get('JOB_RESULT_TTL_MINUTES', 60) * 60)
+)
+
+# 搜索流水线（增强/分析逻辑）的版本，修改后递增，可按 pipeline:<版本> 标签失效旧结果
+SEARCH_PIPELINE_VERSION = 4
+
+
+def search_cache_tags(query: str):
+    """搜索结果缓存的标签：查询、AI模型（发展脉络可能由供应商链中任一模型生成）、流水线版本"""
+    models = [service.model_tag for service in ai_service.chain] if ai_service else ['none']
+    return [
+        f"query:{' '.join(query.split()).lower()}",
+        *[f'model:{model}' for model in models],
+        f'pipeline:{SEARCH_PIPELINE_VERSION}'
+    ]
+
+
+def fetch_papers(query: str, days_back: int, max_results: int):
+    """
+    获取搜索结果，优先使用本地论文库
+    
+    本地库覆盖该查询时，只向arXiv请求上次搜索之后提交的论文（补齐缺口），
+    再从本地库返回最新的结果；否则完整请求arXiv并记录覆盖范围
+    
+    Returns:
+        (论文列表, 是否由本地库回答)
+    """
+    if paper_store:
         try:
-            ai_service = AIService(
-                api_key=app.config['QWEN3_API_KEY'],
-                model=app.config.get('AI_MODEL', 'free:QwQ-32B'),
-                provider='qwen3',
-                api_endpoint=app.config.get('QWEN3_API_ENDPOINT', 'https://api.suanli.cn/v1')
-            )
-            print(f"✓ Qwen3 AI service initialized successfully")
+            coverage = paper_store.get_coverage(query, days_back, max_results)
         except Exception as e:
-            print(f"⚠ Warning: Could not initialize Qwen3 AI service: {e}")
-    else:
-        print("⚠ Warning: QWEN3_API_KEY not set in environment")
-elif ai_provider == 'gemini':
-    if app.config.get('GEMINI_API_KEY'):
+            print(f"[ERROR] Paper store lookup failed: {e}")
+            coverage = None
+        
+        if coverage:
+            overlap = timedelta(hours=app.config.get('PAPER_STORE_GAP_OVERLAP_HOURS', 72))
+            searched_at = datetime.utcnow()
+            try:
+                new_papers = arxiv_service.search_papers(
+                    query,
+                    days_back,
+                    coverage.max_results,
+                    submitted_after=coverage.searched_at - overlap,
+                    raise_errors=True
+                )
+                paper_store.record_search(
+                    query, coverage.days_back, coverage.max_results, new_papers, searched_at
+                )
+            except Exception as e:
+                # 补齐失败时不推进覆盖时间，仍返回本地已有的结果
+                print(f"[ERROR] Failed to fill search gap from arXiv: {e}")
+            
+            return paper_store.get_query_papers(query, max_results), True
+    
+    searched_at = datetime.utcnow()
+    papers = arxiv_service.search_papers(query, days_back, max_results)
+    
+    if paper_store and papers:
         try:
-            ai_service = AIService(
-                api_key=app.config['GEMINI_API_KEY'],
-                model=app.config.get('AI_MODEL', 'gemini-pro'),
-                provider='gemini'
-            )
-            print(f"✓ Gemini AI service initialized successfully")
+            paper_store.record_search(query, days_back, max_results, papers, searched_at)
         except Exception as e:
-            print(f"⚠ Warning: Could not initialize Gemini AI service: {e}")
-    else:
-        print("⚠ Warning: GEMINI_API_KEY not set in environment")
-else:
-    print(f"⚠ Warning: Unknown AI provider: {ai_provider}")
+            print(f"[ERROR] Failed to record search: {e}")
+    
+    return papers, False
 
-# 论文分析服务（用于生成总结和聚合）
-analysis_service = PaperAnalysisService(ai_service=ai_service)
+
+def build_search_result(query: str, days_back: int, max_results: int, include_trajectory: bool = True):
+    """
+    执行完整的搜索流水线：获取论文、补充发表信息、生成发展脉络和季度聚合
+    
+    Args:
+        include_trajectory: 是否同步生成发展脉络，False时 trajectory_summary 为None，由后台任务补上
+    
+    Returns:
+        (结果数据, 是否由本地库回答)，未找到论文时结果数据为None
+    """
+    # 从本地论文库/arXiv获取数据
+    papers, from_store = fetch_papers(query, days_back, max_results)
+    
+    if not papers:
+        return None, from_store
+    
+    # 为论文添加发表信息（会议/期刊名称、CCF等级、引用数）
+    papers = enhancement_service.enrich_papers(papers)
+    
+    # 生成发展脉络总结（左栏）
+    trajectory_summary = analysis_service.generate_trajectory_summary(papers) if include_trajectory else None
+    
+    # 生成季度聚合数据（右栏）
+    quarterly_data = analysis_service.get_quarterly_aggregates(papers)
+    
+    return {
+        'papers': papers,
+        'trajectory_summary': trajectory_summary,
+        'quarterly_data': quarterly_data
+    }, from_store
+
+
+def compute_search_result(
+    cache_key: str,
+    query: str,
+    days_back: int,
+    max_results: int,
+    include_trajectory: bool = True
+):
+    """
+    执行搜索流水线并写入缓存，相同缓存键的并发调用合并为一次计算
+    
+    Returns:
+        (结果数据, 是否由本地库回答)，未找到论文时结果数据为None
+    """
+    def compute():
+        result, from_store = build_search_result(query, days_back, max_results, include_trajectory)
+        if result:
+            cache_service.set(cache_key, result, ttl=search_hard_ttl, tags=search_cache_tags(query))
+        return result, from_store
+    
+    def check():
+        # 其他进程刚完成同一个搜索时，直接读取它写入的新鲜缓存（绕过本进程内存层中可能过时的副本）
+        cached_result, stale = cache_service.get_with_staleness(cache_key, search_soft_ttl, revalidate=True)
+        if cached_result and not stale:
+            return cached_result, False
+        return None
+    
+    return search_flight.do(cache_key, compute, check)
+
+
+def refresh_search_result(cache_key: str, query: str, days_back: int, max_results: int):
+    """后台刷新用：重新执行搜索流水线（结果已在其中写入缓存，未找到论文时保留原缓存）"""
+    compute_search_result(cache_key, query, days_back, max_results)
+    return None
+
+
+def paper_ids(papers: list) -> list:
+    return [paper.get('arxiv_id') for paper in papers]
+
+
+def compute_trajectory(papers: list, cache_key: str = None, query: str = None):
+    """
+    后台任务：生成发展脉络，并补写到还没有发展脉络的搜索结果缓存中
+    
+    缓存在任务期间被刷新为其他论文列表时不覆盖
+    """
+    trajectory = analysis_service.generate_trajectory_summary(papers)
+    
+    if cache_key and trajectory:
+        cached = cache_service.get(cache_key, revalidate=True)
+        if cached and not cached.get('trajectory_summary') and paper_ids(cached['papers']) == paper_ids(papers):
+            # 缓存返回的字典可能是内存层中共享的对象，不能原地修改
+            cache_service.set(
+                cache_key, {**cached, 'trajectory_summary': trajectory},
+                ttl=search_hard_ttl, tags=search_cache_tags(query)
+            )
+    
+    return trajectory
+
+
+def with_trajectory_job(result: dict, job_key: str, cache_key: str = None, query: str = None) -> dict:
+    """结果中没有发展脉络时提交后台任务，在返回的数据中附上 trajectory_job_id"""
+    if result.get('trajectory_summary') or not result.get('papers'):
+        return result
+    
+    papers = result['papers']
+    job_id = job_service.submit(
+        'trajectory',
+        lambda: compute_trajectory(papers, cache_key, query),
+        key=f'trajectory:{job_key}'
+    )
+    return {**result, 'trajectory_job_id': job_id}
+
+
+def parse_fields(value: str):
+    """解析 fields 查询参数（逗号分隔的论文字段名），未提供时返回None表示全部字段"""
+    fields = [field.strip() for field in (value or '').split(',') if field.strip()]
+    return fields or None
+
+
+def project_paper(paper: dict, fields) -> dict:
+    """只保留论文的指定字段（fields为None时原样返回），不存在的字段忽略"""
+    if not fields:
+        return paper
+    return {field: paper[field] for field in fields if field in paper}
+
+
+def shape_search_data(result: dict, fields) -> dict:
+    """
+    准备搜索结果的响应数据：按 fields 投影论文字段
+    
+    旧版缓存中季度聚合内嵌了完整论文，这里按 arxiv_id 转为 paper_indices 引用
+    """
+    papers = result.get('papers') or []
+    quarterly_data = result.get('quarterly_data') or []
+    
+    if any('papers' in aggregate for aggregate in quarterly_data):
+        positions = {paper.get('arxiv_id'): i for i, paper in enumerate(papers)}
+        quarterly_data = [
+            {
+                **{key: value for key, value in aggregate.items() if key != 'papers'},
+                'paper_indices': [
+                    positions[paper.get('arxiv_id')]
+                    for paper in aggregate.get('papers', []) if paper.get('arxiv_id') in positions
+                ]
+            }
+            for aggregate in quarterly_data
+        ]
+    
+    return {
+        **result,
+        'papers': [project_paper(paper, fields) for paper in papers],
+        'quarterly_data': quarterly_data
+    }
+
+
+def encode_stream_event(event: str, payload: dict, ndjson: bool) -> str:
+    """把事件编码为 SSE 消息或一行 NDJSON（事件名放在 event 字段中）"""
+    if ndjson:
+        return json.dumps({'event': event, **payload}, ensure_ascii=False) + '\n'
+    return f'event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n'
 
 
 # ==================== 路由 ====================
@@ -96,8 +443,14 @@ def index():
         'endpoints': {
             'search': '/api/search',
             'paper': '/api/paper/<arxiv_id>',
+            'papers_batch': '/api/papers/batch',
             'summarize': '/api/summarize',
-            'cache_stats': '/api/cache/stats'
+            'summarize_stream': '/api/summarize/stream',
+            'ai_status': '/api/ai/status',
+            'job': '/api/jobs/<job_id>',
+            'job_events': '/api/jobs/<job_id>/events',
+            'cache_stats': '/api/cache/stats',
+            'cache_metrics': '/api/cache/metrics'
         }
     })
 
@@ -111,6 +464,14 @@ def search_papers():
         - query: 搜索关键词 (必需)
         - days_back: 搜索多少天内的论文 (可选，默认1825天=5年)
         - max_results: 返回结果数量 (可选，默认100)
+        - source: 数据来源 (可选，arxiv 或 local，默认arxiv)
+                  local 在本地论文库中全文搜索（BM25排序），支持 "短语" 和前缀 word*
+        - fields: 只返回论文的这些字段，逗号分隔 (可选，如 arxiv_id,title,published)
+        
+    quarterly_data 中每个季度的论文以 paper_indices（在 papers 中的下标）引用
+                  
+    开启 SEARCH_ASYNC_TRAJECTORY 时论文和季度数据立即返回，发展脉络在后台生成：
+    data.trajectory_summary 为null，data.trajectory_job_id 可用于 /api/jobs/<job_id> 查询结果
     """
     query = request.args.get('query', '').strip()
     
@@ -122,48 +483,62 @@ def search_papers():
     
     days_back = request.args.get('days_back', type=int, default=365*3)  # 改为3年
     max_results = request.args.get('max_results', type=int, default=100)
+    source = request.args.get('source', 'arxiv').lower()
+    fields = parse_fields(request.args.get('fields'))
+    
+    if source == 'local':
+        return search_local_papers(query, days_back, max_results, fields)
     
-    # 检查缓存
-    cache_key = f'search:{query}:{days_back}'
-    cached_result = cache_service.get(cache_key)
+    # 检查缓存：软过期的结果立即返回并在后台刷新，硬过期后才同步重新获取
+    cache_key = make_cache_key('search', query=query, days_back=days_back, max_results=max_results)
+    cached_result, stale = cache_service.get_with_staleness(cache_key, search_soft_ttl)
+    async_trajectory = app.config.get('SEARCH_ASYNC_TRAJECTORY', True)
     
     if cached_result:
+        if stale:
+            cache_refresher.schedule(
+                cache_key,
+                lambda: refresh_search_result(cache_key, query, days_back, max_results),
+                ttl=search_hard_ttl
+            )
+        
+        if async_trajectory:
+            cached_result = with_trajectory_job(cached_result, cache_key, cache_key, query)
+        
         return jsonify({
             'status': 'success',
             'message': '从缓存中获取',
-            'data': cached_result,
-            'from_cache': True
+            'data': shape_search_data(cached_result, fields),
+            'from_cache': True,
+            'stale': stale
         })
     
-    # 从arXiv获取数据
-    papers = arxiv_service.search_papers(query, days_back, max_results)
+    try:
+        result, from_store = compute_search_result(
+            cache_key, query, days_back, max_results, include_trajectory=not async_trajectory
+        )
+    except SingleFlightTimeout as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'等待相同搜索的结果超时: {str(e)}'
+        }), 504
+    except SingleFlightError as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'搜索失败: {str(e)}'
+        }), 502
     
-    # 为论文添加发表信息（会议/期刊名称、CCF等级、引用数）
-    if papers:
-        papers = enhancement_service.enrich_papers(papers)
-        
-        # 生成发展脉络总结（左栏）
-        trajectory_summary = analysis_service.generate_trajectory_summary(papers)
-        
-        # 生成季度聚合数据（右栏）
-        quarterly_data = analysis_service.get_quarterly_aggregates(papers)
-        
-        # 缓存结果
-        cache_service.set(cache_key, {
-            'papers': papers,
-            'trajectory_summary': trajectory_summary,
-            'quarterly_data': quarterly_data
-        })
+    if result:
+        if async_trajectory:
+            result = with_trajectory_job(result, cache_key, cache_key, query)
         
         return jsonify({
             'status': 'success',
-            'message': f'找到 {len(papers)} 篇论文',
-            'data': {
-                'papers': papers,
-                'trajectory_summary': trajectory_summary,
-                'quarterly_data': quarterly_data
-            },
-            'from_cache': False
+            'message': f'找到 {len(result["papers"])} 篇论文',
+            'data': shape_search_data(result, fields),
+            'from_cache': False,
+            'stale': False,
+            'from_store': from_store
         })
     
     return jsonify({
@@ -178,6 +553,49 @@ def search_papers():
     })
 
 
+def search_local_papers(query: str, days_back: int, max_results: int, fields=None):
+    """在本地论文库中全文搜索，不访问arXiv"""
+    if not paper_store:
+        return jsonify({
+            'status': 'error',
+            'message': '本地论文库未启用'
+        }), 503
+    
+    try:
+        papers = paper_store.search_local(query, max_results, days_back)
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    except RuntimeError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 503
+    
+    papers = enhancement_service.enrich_papers(papers)
+    result = {
+        'papers': papers,
+        'trajectory_summary': None,
+        'quarterly_data': analysis_service.get_quarterly_aggregates(papers)
+    }
+    
+    if app.config.get('SEARCH_ASYNC_TRAJECTORY', True):
+        job_key = make_cache_key('local', query=query, days_back=days_back, max_results=max_results)
+        result = with_trajectory_job(result, job_key)
+    elif papers:
+        result['trajectory_summary'] = analysis_service.generate_trajectory_summary(papers)
+    
+    return jsonify({
+        'status': 'success',
+        'message': f'本地找到 {len(papers)} 篇论文' if papers else '未找到相关论文',
+        'data': shape_search_data(result, fields),
+        'from_cache': False,
+        'from_store': True
+    })
+
+
 @app.route('/api/paper/<arxiv_id>', methods=['GET'])
 def get_paper(arxiv_id):
     """
@@ -185,6 +603,9 @@ def get_paper(arxiv_id):
     
     Args:
         arxiv_id: arXiv论文ID (例如: 2301.12345)
+        
+    查询参数:
+        - fields: 只返回这些字段，逗号分隔 (可选)
     """
     paper = arxiv_service.get_paper_by_id(arxiv_id)
     
@@ -196,7 +617,68 @@ def get_paper(arxiv_id):
     
     return jsonify({
         'status': 'success',
-        'data': paper
+        'data': project_paper(paper, parse_fields(request.args.get('fields')))
+    })
+
+
+@app.route('/api/papers/batch', methods=['POST'])
+def get_papers_batch():
+    """
+    批量获取多篇论文信息
+    
+    先从本地缓存读取，未命中的ID通过arXiv id_list分块并发获取
+    
+    请求体:
+        {
+            "arxiv_ids": ["2301.12345", "2302.54321v2", ...]
+        }
+    
+    返回的papers与arxiv_ids顺序一致，未找到的位置为null，并在missing中列出
+    """
+    data = request.get_json(silent=True)
+    
+    if not data or not isinstance(data.get('arxiv_ids'), list):
+        return jsonify({
+            'status': 'error',
+            'message': '请提供arxiv_ids列表'
+        }), 400
+    
+    arxiv_ids = [str(i).strip() for i in data['arxiv_ids'] if str(i).strip()]
+    max_ids = app.config.get('ARXIV_BATCH_MAX_IDS', 1000)
+    
+    if len(arxiv_ids) > max_ids:
+        return jsonify({
+            'status': 'error',
+            'message': f'单次最多查询 {max_ids} 个ID'
+        }), 400
+    
+    # 先查本地缓存
+    found = {}
+    for arxiv_id in dict.fromkeys(arxiv_ids):
+        cached = cache_service.get(f'paper:{arxiv_id}')
+        if cached:
+            found[arxiv_id] = cached
+    from_cache = len(found)
+    
+    # 未命中的ID批量从arXiv获取
+    to_fetch = [i for i in dict.fromkeys(arxiv_ids) if i not in found]
+    if to_fetch:
+        for arxiv_id, paper in arxiv_service.get_papers_by_ids(to_fetch).items():
+            if paper:
+                found[arxiv_id] = paper
+                cache_service.set(f'paper:{arxiv_id}', paper)
+    
+    papers = [found.get(arxiv_id) for arxiv_id in arxiv_ids]
+    missing = [arxiv_id for arxiv_id in dict.fromkeys(arxiv_ids) if arxiv_id not in found]
+    
+    return jsonify({
+        'status': 'success',
+        'message': f'找到 {len(found)} 篇论文，{len(missing)} 篇未找到',
+        'data': {
+            'papers': papers,
+            'missing': missing
+        },
+        'from_cache': from_cache
     })
 
 
@@ -280,6 +762,8 @@ def get_quarterly_data():
         {
             "papers": [...论文列表...]
         }
+        
+    每个季度的论文以 paper_indices（在请求的 papers 中的下标）引用
     """
     data = request.get_json()
     
@@ -306,9 +790,11 @@ def summarize_papers():
     请求体:
         {
             "papers": [
-                {"title": "...", "summary": "..."},
+                {"arxiv_id": "...", "title": "...", "summary": "..."},
                 ...
-            ]
+            ],
+            "max_length": 200,
+            "packed": true    (可选，是否把多篇论文打包进一个请求，默认 AI_PACKED_SUMMARIES)
         }
     """
     if not ai_service:
@@ -328,7 +814,7 @@ def summarize_papers():
     papers = data['papers']
     max_length = data.get('max_length', 200)
     
-    summaries = ai_service.batch_summarize(papers, max_length)
+    summaries = ai_service.batch_summarize(papers, max_length, packed=data.get('packed'))
     
     return jsonify({
         'status': 'success',
@@ -337,6 +823,165 @@ def summarize_papers():
     })
 
 
+@app.route('/api/summarize/stream', methods=['POST'])
+def summarize_papers_stream():
+    """
+    流式AI总结：每篇论文的总结一完成就推送，按完成顺序，缓存命中的最先推送
+    
+    请求体同 /api/summarize
+    
+    查询参数:
+        - format: sse (默认，Server-Sent Events) 或 ndjson (每行一个JSON对象)
+    
+    事件:
+        - summary: {"index": 在请求中的下标, "arxiv_id", "summary", "error", "cached"}
+        - done: {"total", "completed", "failed"}
+    
+    客户端断开连接后剩余的总结请求会被取消
+    """
+    if not ai_service:
+        return jsonify({
+            'status': 'error',
+            'message': 'AI服务未配置'
+        }), 503
+    
+    data = request.get_json()
+    
+    if not data or 'papers' not in data:
+        return jsonify({
+            'status': 'error',
+            'message': '请提供papers列表'
+        }), 400
+    
+    papers = data['papers']
+    max_length = data.get('max_length', 200)
+    packed = data.get('packed')
+    ndjson = request.args.get('format', 'sse').lower() == 'ndjson'
+    cancel_event = threading.Event()
+    
+    def encode(event, payload):
+        return encode_stream_event(event, payload, ndjson)
+    
+    def produce(events):
+        try:
+            for index, result in ai_service.iter_summaries(
+                papers, max_length, packed=packed, cancel_event=cancel_event
+            ):
+                events.put(('summary', {'index': index, **result}))
+        except Exception as e:
+            print(f"[ERROR] Summary stream failed: {e}")
+            events.put(('error', {'message': str(e)}))
+        finally:
+            events.put(None)
+    
+    def generate():
+        # 总结在后台线程中进行；等待期间定期发送心跳，以便及时发现客户端断开
+        events = queue.Queue()
+        threading.Thread(target=produce, args=(events,), name='summary-stream', daemon=True).start()
+        completed = failed = 0
+        
+        try:
+            while True:
+                try:
+                    item = events.get(timeout=1)
+                except queue.Empty:
+                    yield '\n' if ndjson else ': keep-alive\n\n'
+                    continue
+                
+                if item is None:
+                    break
+                
+                event, payload = item
+                if event == 'summary':
+                    completed += 1
+                    failed += payload['error'] is not None
+                yield encode(event, payload)
+            
+            yield encode('done', {'total': len(papers), 'completed': completed, 'failed': failed})
+        finally:
+            # 正常结束或客户端断开（生成器被关闭）时取消剩余工作
+            cancel_event.set()
+    
+    response = Response(generate(), mimetype='application/x-ndjson' if ndjson else 'text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """查询后台任务的状态和结果（status 为 queued、running、done 或 failed）"""
+    job = job_service.get(job_id)
+    
+    if not job:
+        return jsonify({
+            'status': 'error',
+            'message': f'未找到任务: {job_id}'
+        }), 404
+    
+    return jsonify({
+        'status': 'success',
+        'data': job
+    })
+
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """
+    以事件流推送后台任务的状态变化（?format=sse|ndjson，默认sse）
+    
+    每次状态变化推送一个 status 事件（内容同 /api/jobs/<job_id>），任务完成或失败后结束
+    """
+    if not job_service.get(job_id):
+        return jsonify({
+            'status': 'error',
+            'message': f'未找到任务: {job_id}'
+        }), 404
+    
+    ndjson = request.args.get('format', 'sse').lower() == 'ndjson'
+    
+    def generate():
+        version = -1
+        while True:
+            job = job_service.wait(job_id, version, timeout=1)
+            if job is None:
+                yield encode_stream_event('error', {'message': f'任务已过期: {job_id}'}, ndjson)
+                return
+            
+            if job['version'] == version:
+                # 心跳，以便及时发现客户端断开
+                yield '\n' if ndjson else ': keep-alive\n\n'
+                continue
+            
+            version = job['version']
+            yield encode_stream_event('status', job, ndjson)
+            if job['status'] in ('done', 'failed'):
+                return
+    
+    response = Response(generate(), mimetype='application/x-ndjson' if ndjson else 'text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@app.route('/api/ai/status', methods=['GET'])
+def ai_status():
+    """AI供应商链的状态（每个供应商的模型和熔断器状态）"""
+    if not ai_service:
+        return jsonify({
+            'status': 'error',
+            'message': 'AI服务未配置'
+        }), 503
+    
+    return jsonify({
+        'status': 'success',
+        'data': {
+            'providers': ai_service.provider_status(),
+            'local_fallback': ai_service.local_fallback
+        }
+    })
+
+
 @app.route('/api/cache/stats', methods=['GET'])
 def cache_stats():
     """获取缓存统计信息"""
@@ -348,6 +993,67 @@ def cache_stats():
     })
 
 
+@app.route('/api/cache/metrics', methods=['GET'])
+def cache_metrics():
+    """以 Prometheus 文本格式导出缓存指标（按命名空间的命中/未命中/淘汰计数和读写耗时直方图）"""
+    return Response(cache_service.metrics.export_prometheus(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/api/cache/sweep', methods=['POST'])
+def sweep_cache():
+    """立即执行一轮缓存清理（删除过期条目并按容量淘汰），返回清理报告"""
+    report = cache_service.sweep(app.config.get('CACHE_SWEEP_BATCH_SIZE', 500))
+    
+    return jsonify({
+        'status': 'error' if report['error'] else 'success',
+        'message': f"清理了 {report['expired']} 个过期条目，淘汰了 {report['evicted']} 个条目",
+        'data': report
+    }), 500 if report['error'] else 200
+
+
+@app.route('/api/cache/invalidate', methods=['POST'])
+def invalidate_cache():
+    """
+    按标签、键前缀或命名空间版本失效缓存，不影响其他缓存
+    
+    请求体 (JSON):
+        - tags: 标签列表 (可选)，如 ["model:qwen3/free:QwQ-32B", "query:llm"]
+        - prefix: 键前缀 (可选)，如 "search:" 或 "paper:2401."
+        - namespaces: 需要递增版本的命名空间列表 (可选)，如 ["search"]，旧条目立即不可见并由后台清理回收
+    """
+    data = request.get_json(silent=True) or {}
+    tags = data.get('tags') or []
+    prefix = data.get('prefix')
+    namespaces = data.get('namespaces') or []
+    
+    if not isinstance(tags, list) or not isinstance(namespaces, list) or not (tags or prefix or namespaces):
+        return jsonify({
+            'status': 'error',
+            'message': '请提供 tags、prefix 或 namespaces'
+        }), 400
+    
+    result = {
+        'tags': {tag: cache_service.invalidate_tag(str(tag)) for tag in tags},
+        'prefix': cache_service.invalidate_prefix(str(prefix)) if prefix else None,
+        'namespaces': {}
+    }
+    
+    try:
+        for namespace in namespaces:
+            result['namespaces'][namespace] = cache_service.bump_namespace(str(namespace))
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'递增命名空间版本失败: {str(e)}'
+        }), 500
+    
+    return jsonify({
+        'status': 'success',
+        'message': '缓存已失效',
+        'data': result
+    })
+
+
 @app.route('/api/cache/clear', methods=['POST'])
 def clear_cache():
     """清空所有缓存"""
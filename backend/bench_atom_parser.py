@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark: streaming Atom parser vs. the previous feedparser ingest path
+Generates a synthetic arXiv feed and compares parse time and peak memory
+"""
+
+import argparse
+import io
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import feedparser
+
+from services.atom_parser import iter_papers
+
+ENTRY_TEMPLATE = """  <entry>
+    <id>http://arxiv.org/abs/2401.{num:05d}v1</id>
+    <updated>2024-01-{day:02d}T12:00:00Z</updated>
+    <published>2024-01-{day:02d}T12:00:00Z</published>
+    <title>A Study of Large Language Models for Task {num}:
+  Methods and Benchmarks</title>
+    <summary>  {abstract}
+</summary>
+    <author><name>Author A{num}</name></author>
+    <author><name>Author B{num}</name></author>
+    <author><name>Author C{num}</name></author>
+    <arxiv:comment>12 pages, 4 figures</arxiv:comment>
+    <arxiv:journal_ref>Proceedings of NeurIPS 2024</arxiv:journal_ref>
+    <link href="http://arxiv.org/abs/2401.{num:05d}v1" rel="alternate" type="text/html"/>
+    <link title="pdf" href="http://arxiv.org/pdf/2401.{num:05d}v1" rel="related" type="application/pdf"/>
+    <arxiv:primary_category term="cs.CL" scheme="http://arxiv.org/schemas/atom"/>
+    <category term="cs.CL" scheme="http://arxiv.org/schemas/atom"/>
+    <category term="cs.AI" scheme="http://arxiv.org/schemas/atom"/>
+  </entry>
+"""
+
+ABSTRACT = ("We study the behaviour of large language models on a broad range of "
+            "reasoning tasks and propose a new training objective. ") * 8
+
+
+def build_feed(count: int) -> bytes:
+    """Build a synthetic arXiv Atom feed with `count` entries"""
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<feed xmlns="http://www.w3.org/2005/Atom" '
+        'xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/" '
+        'xmlns:arxiv="http://arxiv.org/schemas/atom">\n'
+        '  <title type="html">ArXiv Query: benchmark</title>\n'
+        f'  <opensearch:totalResults>{count}</opensearch:totalResults>\n'
+        '  <opensearch:startIndex>0</opensearch:startIndex>\n'
+        f'  <opensearch:itemsPerPage>{count}</opensearch:itemsPerPage>\n'
+    ]
+    for i in range(count):
+        parts.append(ENTRY_TEMPLATE.format(num=i, day=i % 28 + 1, abstract=ABSTRACT))
+    parts.append('</feed>\n')
+    return ''.join(parts).encode('utf-8')
+
+
+def parse_with_feedparser(content: bytes) -> list:
+    """The previous ingest path: feedparser object graph + per-entry dict copy"""
+    feed = feedparser.parse(content)
+    papers = []
+    for entry in feed.entries:
+        arxiv_id = entry.id.split('/abs/')[-1]
+        papers.append({
+            'arxiv_id': arxiv_id,
+            'title': entry.get('title', '').strip(),
+            'authors': [author.name for author in entry.get('authors', [])],
+            'summary': entry.get('summary', '').strip(),
+            'published': entry.get('published', ''),
+            'url': entry.get('id', ''),
+            'pdf_url': f'https://arxiv.org/pdf/{arxiv_id}.pdf',
+            'categories': entry.get('arxiv_primary_category', {}).get('term', ''),
+        })
+    return papers
+
+
+def parse_streaming(content: bytes) -> list:
+    """The streaming path, reading from a file-like object as from response.raw"""
+    return list(iter_papers(io.BytesIO(content)))
+
+
+def measure(func, content: bytes, repeat: int):
+    """Return (best wall time in seconds, peak traced memory in MB, result)"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(content)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    func(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return best, peak / (1024 * 1024), result
+
+
+def check_equivalent(old: list, new: list) -> bool:
+    """Verify that both paths produce the same fields used by the app"""
+    if len(old) != len(new):
+        return False
+    for a, b in zip(old, new):
+        for field, value in a.items():
+            if b.get(field) != value:
+                print(f"[✗] Field mismatch on {a['arxiv_id']}.{field}: {value!r} != {b.get(field)!r}")
+                return False
+    return True
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--entries', type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print("\n⏱  Atom Parser Benchmark\n")
+    print(f"{'entries':>8} {'feed MB':>8} | {'feedparser s':>12} {'peak MB':>8} | "
+          f"{'streaming s':>11} {'peak MB':>8} | {'speedup':>7}")
+    print("-" * 78)
+
+    ok = True
+    for count in args.entries:
+        content = build_feed(count)
+        old_time, old_peak, old_papers = measure(parse_with_feedparser, content, args.repeat)
+        new_time, new_peak, new_papers = measure(parse_streaming, content, args.repeat)
+        ok = check_equivalent(old_papers, new_papers) and ok
+
+        print(f"{count:>8} {len(content) / (1024 * 1024):>8.2f} | {old_time:>12.3f} {old_peak:>8.1f} | "
+              f"{new_time:>11.3f} {new_peak:>8.1f} | {old_time / new_time:>6.1f}x")
+
+    print("\n" + ("✓ Outputs are equivalent" if ok else "✗ Outputs differ"))
+    sys.exit(0 if ok else 1)
@@ -14,9 +14,29 @@ class Config:
         'sqlite:///./arxiv_papers.db'
     )
     
+    # 本地论文库配置（写穿透存储arXiv论文，覆盖范围内的搜索直接从本地回答）
+    PAPER_STORE_ENABLED = os.getenv('PAPER_STORE_ENABLED', 'true').lower() == 'true'
+    PAPER_STORE_GAP_OVERLAP_HOURS = int(os.getenv('PAPER_STORE_GAP_OVERLAP_HOURS', 72))  # 增量补齐时回溯的小时数，覆盖arXiv公告延迟
+    
     # arXiv配置
     ARXIV_SEARCH_DAYS = 365 * 5  # 5年内的论文
     ARXIV_MAX_RESULTS = 100  # 单次查询最大论文数
+    ARXIV_BASE_URL = os.getenv('ARXIV_BASE_URL', 'http://export.arxiv.org/api/query')  # arXiv API地址
+    ARXIV_PAGE_SIZE = int(os.getenv('ARXIV_PAGE_SIZE', 500))  # 分页抓取每页论文数
+    ARXIV_MAX_CONCURRENT_PAGES = int(os.getenv('ARXIV_MAX_CONCURRENT_PAGES', 3))  # 同时进行的分页请求数
+    ARXIV_REQUEST_INTERVAL = float(os.getenv('ARXIV_REQUEST_INTERVAL', 3.0))  # 请求间隔（秒），遵守arXiv礼貌间隔
+    ARXIV_POOL_SIZE = int(os.getenv('ARXIV_POOL_SIZE', 10))  # 长连接池大小
+    ARXIV_MAX_RETRIES = int(os.getenv('ARXIV_MAX_RETRIES', 3))  # 连接错误/429/5xx重试次数
+    ARXIV_RETRY_BACKOFF = float(os.getenv('ARXIV_RETRY_BACKOFF', 1.0))  # 重试退避系数（秒）
+    ARXIV_ID_BATCH_SIZE = int(os.getenv('ARXIV_ID_BATCH_SIZE', 100))  # 每个id_list请求包含的ID数
+    ARXIV_BATCH_MAX_IDS = int(os.getenv('ARXIV_BATCH_MAX_IDS', 1000))  # 批量查询接口单次最多ID数
+    
+    # 增量采集配置
+    HARVEST_ENABLED = os.getenv('HARVEST_ENABLED', 'false').lower() == 'true'  # 是否在应用进程内定时采集
+    HARVEST_CATEGORIES = [c for c in os.getenv('HARVEST_CATEGORIES', '').split(',') if c.strip()]  # 如 cs.CL,cs.LG
+    HARVEST_INTERVAL_HOURS = float(os.getenv('HARVEST_INTERVAL_HOURS', 24))
+    HARVEST_INITIAL_DAYS = int(os.getenv('HARVEST_INITIAL_DAYS', 7))  # 首次采集回溯天数
+    HARVEST_OVERLAP_HOURS = int(os.getenv('HARVEST_OVERLAP_HOURS', 48))  # 每次从水位线回溯的小时数
     
     # AI配置
     AI_PROVIDER = os.getenv('AI_PROVIDER', 'qwen3')  # 默认使用Qwen3
@@ -29,9 +49,60 @@ class Config:
     # Google Gemini API配置（备用）
     GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
     
+    # AI调用并发与限流（按供应商共享）
+    AI_MAX_WORKERS = int(os.getenv('AI_MAX_WORKERS', 4))  # 批量总结的并发数
+    AI_REQUESTS_PER_MINUTE = float(os.getenv('AI_REQUESTS_PER_MINUTE', 60))  # 每分钟请求数上限，0为不限制
+    AI_TOKENS_PER_MINUTE = float(os.getenv('AI_TOKENS_PER_MINUTE', 100000))  # 每分钟token数上限（估算），0为不限制
+    AI_REQUEST_TIMEOUT = float(os.getenv('AI_REQUEST_TIMEOUT', 30))  # 单次请求超时（秒）
+    AI_ITEM_TIMEOUT = float(os.getenv('AI_ITEM_TIMEOUT', 60))  # 批量总结中每篇论文的最长耗时（秒）
+    AI_RESULT_CACHE_DAYS = float(os.getenv('AI_RESULT_CACHE_DAYS', 180))  # AI总结/关键词结果的缓存天数（按内容寻址）
+    AI_PACKED_SUMMARIES = os.getenv('AI_PACKED_SUMMARIES', 'false').lower() == 'true'  # 批量总结时把多篇论文打包进一个请求
+    AI_PACK_TOKEN_BUDGET = int(os.getenv('AI_PACK_TOKEN_BUDGET', 6000))  # 每个打包请求的token预算（提示词+预计输出）
+    AI_PACK_MAX_PAPERS = int(os.getenv('AI_PACK_MAX_PAPERS', 20))  # 每个打包请求最多包含的论文数
+    
+    # AI供应商容错：主供应商失败或熔断时依次尝试备用供应商，都失败时可用摘要节选兜底
+    AI_FALLBACK_PROVIDERS = [p.strip().lower() for p in os.getenv('AI_FALLBACK_PROVIDERS', 'gemini').split(',') if p.strip()]
+    AI_LOCAL_FALLBACK = os.getenv('AI_LOCAL_FALLBACK', 'true').lower() == 'true'
+    QWEN3_MODEL = os.getenv('QWEN3_MODEL', 'free:QwQ-32B')  # Qwen3作为备用供应商时的模型
+    GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-pro')  # Gemini作为备用供应商时的模型
+    AI_MAX_RETRIES = int(os.getenv('AI_MAX_RETRIES', 2))  # 每个供应商的最大重试次数（超时、连接错误、429、5xx）
+    AI_RETRY_BACKOFF = float(os.getenv('AI_RETRY_BACKOFF', 0.5))  # 重试退避基础秒数（指数增长，随机抖动）
+    AI_RETRY_MAX_BACKOFF = float(os.getenv('AI_RETRY_MAX_BACKOFF', 8))  # 重试退避最长秒数
+    AI_BREAKER_FAILURES = int(os.getenv('AI_BREAKER_FAILURES', 5))  # 连续失败多少次后熔断供应商
+    AI_BREAKER_RESET_SECONDS = float(os.getenv('AI_BREAKER_RESET_SECONDS', 60))  # 熔断后多少秒放行探测请求
+    AI_HEDGE_AFTER = float(os.getenv('AI_HEDGE_AFTER', 0))  # 请求超过该秒数未返回时向备用供应商发对冲请求，0为不对冲
+    
+    # 发展脉络：分层模式先并发生成并缓存各季度综述，再归约为发展脉络；flat为按预算放入最新的论文生成一次
+    TRAJECTORY_MODE = os.getenv('TRAJECTORY_MODE', 'hierarchical').lower()
+    TRAJECTORY_MAX_WORKERS = int(os.getenv('TRAJECTORY_MAX_WORKERS', 4))  # 并发生成季度综述的线程数
+    TRAJECTORY_OPEN_QUARTER_TTL_HOURS = float(os.getenv('TRAJECTORY_OPEN_QUARTER_TTL_HOURS', 24))  # 当前季度综述的缓存小时数
+    TRAJECTORY_QUARTER_TOKEN_BUDGET = int(os.getenv('TRAJECTORY_QUARTER_TOKEN_BUDGET', 3000))  # 每个季度综述提示词的论文信息token预算
+    TRAJECTORY_TOKEN_BUDGET = int(os.getenv('TRAJECTORY_TOKEN_BUDGET', 4000))  # 发展脉络提示词的论文信息/季度综述token预算
+    ANALYSIS_MAX_ABSTRACT_TOKENS = int(os.getenv('ANALYSIS_MAX_ABSTRACT_TOKENS', 120))  # 分析提示词中每篇摘要的token上限（去重后截断）
+    
+    # 后台任务：搜索先返回论文和季度数据，发展脉络在后台任务中生成
+    SEARCH_ASYNC_TRAJECTORY = os.getenv('SEARCH_ASYNC_TRAJECTORY', 'true').lower() == 'true'
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))  # 执行后台任务的线程数
+    JOB_RESULT_TTL_MINUTES = float(os.getenv('JOB_RESULT_TTL_MINUTES', 60))  # 已完成任务的保留分钟数
+    
     # 缓存配置
     CACHE_ENABLED = True
     CACHE_EXPIRY_DAYS = 30  # 缓存过期时间
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'sqlite')  # sqlite（单文件索引存储）或 file（每个键一个JSON文件，清理/淘汰/前缀失效需遍历全部文件）
+    CACHE_DIR = os.getenv('CACHE_DIR', './cache')
+    CACHE_MEMORY_MAX_MB = float(os.getenv('CACHE_MEMORY_MAX_MB', 64))  # 进程内内存层容量，0为关闭
+    CACHE_MEMORY_REVALIDATE_SECONDS = float(os.getenv('CACHE_MEMORY_REVALIDATE_SECONDS', 2))  # 内存层条目与存储后端核对的间隔，多进程部署下其他进程的写入在此时间内可见
+    CACHE_CODEC = os.getenv('CACHE_CODEC', 'zlib')  # 缓存压缩算法：zlib、lzma、zstd（需安装zstandard）、none
+    CACHE_CODEC_LEVEL = int(os.getenv('CACHE_CODEC_LEVEL', 6))
+    CACHE_MAX_SIZE_MB = float(os.getenv('CACHE_MAX_SIZE_MB', 1024))  # 缓存容量上限，超出后由后台清理按淘汰策略删除，0为不限制
+    CACHE_EVICTION_POLICY = os.getenv('CACHE_EVICTION_POLICY', 'lru')  # lru（最近最少使用）或 lfu（最不经常使用）
+    CACHE_SWEEP_INTERVAL_MINUTES = float(os.getenv('CACHE_SWEEP_INTERVAL_MINUTES', 10))  # 后台清理间隔，0为关闭
+    CACHE_SWEEP_BATCH_SIZE = int(os.getenv('CACHE_SWEEP_BATCH_SIZE', 500))  # 每个删除事务的条目数
+    SEARCH_CACHE_SOFT_TTL_HOURS = float(os.getenv('SEARCH_CACHE_SOFT_TTL_HOURS', 24))  # 超过后返回陈旧结果并在后台刷新
+    SEARCH_CACHE_HARD_TTL_HOURS = float(os.getenv('SEARCH_CACHE_HARD_TTL_HOURS', 24 * 30))  # 超过后必须同步重新获取
+    CACHE_REFRESH_WORKERS = int(os.getenv('CACHE_REFRESH_WORKERS', 2))  # 后台刷新线程数
+    SINGLEFLIGHT_TIMEOUT = float(os.getenv('SINGLEFLIGHT_TIMEOUT', 120))  # 相同搜索并发时等待首个请求结果的最长秒数
+    SINGLEFLIGHT_LOCK_DIR = os.getenv('SINGLEFLIGHT_LOCK_DIR')  # 跨进程合并的文件锁目录，默认 CACHE_DIR/locks
     
     # 请求超时
     REQUEST_TIMEOUT = 30
@@ -2,13 +2,68 @@
 AI 总结服务模块
 支持多个AI供应商：Google Gemini 和 Free Qwen3 API
 """
+import hashlib
+import json
+import time
+import re
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
 import requests
-from typing import Optional
+
+from services.rate_limiter import get_provider_limiter
+from services.resilience import CircuitBreaker, backoff_delay, get_circuit_breaker, remaining_time
+from services.token_budget import estimate_tokens
+
+
+class AIServiceError(Exception):
+    """AI供应商调用失败（超时、HTTP错误、空响应或限流等待超时）"""
+    
+    def __init__(self, message: str, retryable: bool = True, provider_fault: bool = True):
+        """
+        Args:
+            message: 错误信息
+            retryable: 是否值得重试（超时、连接错误、429、5xx）
+            provider_fault: 是否计入供应商熔断器（限流等待和总耗时超限不计入）
+        """
+        super().__init__(message)
+        self.retryable = retryable
+        self.provider_fault = provider_fault
+
 
 class AIService:
     """AI论文总结服务 - 支持多个AI供应商"""
     
-    def __init__(self, api_key: str, model: str = 'gemini-pro', provider: str = 'gemini', api_endpoint: str = None):
+    # 提示词模板版本，修改模板后递增，旧的缓存结果随之失效
+    SUMMARY_PROMPT_VERSION = 1
+    KEYWORDS_PROMPT_VERSION = 1
+    
+    def __init__(
+        self,
+        api_key: str,
+        model: str = 'gemini-pro',
+        provider: str = 'gemini',
+        api_endpoint: str = None,
+        max_workers: int = 4,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        request_timeout: float = 30,
+        item_timeout: float = 60,
+        result_cache=None,
+        result_cache_ttl: Optional[int] = None,
+        packed: bool = False,
+        pack_token_budget: int = 6000,
+        pack_max_papers: int = 20,
+        fallbacks: Optional[List['AIService']] = None,
+        local_fallback: bool = False,
+        max_retries: int = 2,
+        retry_backoff: float = 0.5,
+        retry_max_backoff: float = 8,
+        breaker_failures: int = 5,
+        breaker_reset_seconds: float = 60,
+        hedge_after: float = 0
+    ):
         """
         初始化AI服务
         
@@ -17,14 +72,56 @@ class AIService:
             model: 使用的模型名称
             provider: AI供应商 ('gemini' 或 'qwen3')
             api_endpoint: API端点（仅供Qwen3使用）
+            max_workers: 批量总结的并发数
+            requests_per_minute: 该供应商每分钟请求数上限，0表示不限制
+            tokens_per_minute: 该供应商每分钟token数上限，0表示不限制
+            request_timeout: 单次HTTP请求超时（秒）
+            item_timeout: 批量总结中每篇论文的最长耗时（秒），包括限流等待
+            result_cache: 持久化的结果缓存（CacheService），相同内容的总结和关键词只生成一次
+            result_cache_ttl: 结果缓存的过期秒数（可选，默认使用缓存服务的过期时间）
+            packed: 批量总结时是否把多篇论文打包进一个请求
+            pack_token_budget: 每个打包请求的token预算（提示词加预计输出）
+            pack_max_papers: 每个打包请求最多包含的论文数
+            fallbacks: 本供应商失败或熔断时依次尝试的备用供应商
+            local_fallback: 所有供应商都失败时是否用摘要的前几句作为总结
+            max_retries: 每个供应商的最大重试次数（只重试超时、连接错误、429和5xx）
+            retry_backoff: 重试退避的基础秒数（指数增长，完全随机抖动）
+            retry_max_backoff: 重试退避的最长秒数
+            breaker_failures: 连续失败多少次后熔断该供应商
+            breaker_reset_seconds: 熔断多少秒后放行一个探测请求
+            hedge_after: 请求超过该秒数仍未返回时，向下一个供应商发出对冲请求，0表示不对冲
         """
         self.api_key = api_key
         self.model = model
         self.provider = provider.lower()
         self.api_endpoint = api_endpoint or 'https://api.suanli.cn/v1'
         self.client = None
+        self.max_workers = max_workers
+        self.request_timeout = request_timeout
+        self.item_timeout = item_timeout
+        self.result_cache = result_cache
+        self.result_cache_ttl = result_cache_ttl
+        self.packed = packed
+        self.pack_token_budget = pack_token_budget
+        self.pack_max_papers = pack_max_papers
+        self.fallbacks = list(fallbacks or [])
+        self.local_fallback = local_fallback
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.retry_max_backoff = retry_max_backoff
+        self.hedge_after = hedge_after
+        self._hedge_executor = None
+        self._gemini_executor = None
+        if hedge_after > 0:
+            self._hedge_executor = ThreadPoolExecutor(max_workers=max(4, max_workers * 2), thread_name_prefix='ai-hedge')
+        
+        # 同一供应商的所有AIService实例共享限额和熔断状态
+        self.limiter = get_provider_limiter(self.provider, requests_per_minute, tokens_per_minute)
+        self.breaker = get_circuit_breaker(self.provider, breaker_failures, breaker_reset_seconds)
         
         if self.provider == 'gemini':
+            # SDK调用本身不支持超时，在单独的线程中执行并限制等待时间
+            self._gemini_executor = ThreadPoolExecutor(max_workers=max(4, max_workers * 2), thread_name_prefix='gemini-call')
             # 配置Google Gemini
             try:
                 import google.generativeai as genai
@@ -48,15 +145,19 @@ class AIService:
         else:
             print(f"[WARNING] Unknown AI provider: {provider}")
     
-    def _call_qwen3(self, prompt: str) -> Optional[str]:
+    def _call_qwen3(self, prompt: str, timeout: Optional[float] = None) -> str:
         """
         调用Qwen3 API
         
         Args:
             prompt: 提示词
+            timeout: 请求超时（秒），默认 request_timeout
             
         Returns:
             API响应文本
+            
+        Raises:
+            AIServiceError: 调用失败或响应为空
         """
         try:
             payload = {
@@ -72,68 +173,325 @@ class AIService:
             response = self.client.post(
                 f'{self.api_endpoint}/chat/completions',
                 json=payload,
-                timeout=30
+                timeout=timeout or self.request_timeout
             )
-            
-            if response.status_code == 200:
-                data = response.json()
-                # 提取响应文本
-                if 'choices' in data and len(data['choices']) > 0:
-                    content = data['choices'][0].get('message', {}).get('content', '')
-                    return content.strip() if content else None
-            else:
-                print(f"[ERROR] Qwen3 API error: {response.status_code} - {response.text}")
-                return None
-                
         except requests.exceptions.Timeout:
-            print("[ERROR] Qwen3 API request timeout")
-            return None
-        except Exception as e:
-            print(f"[ERROR] Qwen3 API call failed: {e}")
-            return None
+            raise AIServiceError('Qwen3 API request timeout')
+        except requests.exceptions.RequestException as e:
+            raise AIServiceError(f'Qwen3 API call failed: {e}')
+        
+        if response.status_code != 200:
+            raise AIServiceError(
+                f'Qwen3 API error: {response.status_code} - {response.text[:200]}',
+                retryable=response.status_code == 429 or response.status_code >= 500
+            )
+        
+        try:
+            data = response.json()
+        except ValueError as e:
+            raise AIServiceError(f'Qwen3 API returned invalid JSON: {e}')
+        
+        # 提取响应文本
+        content = ''
+        if data.get('choices'):
+            content = data['choices'][0].get('message', {}).get('content', '')
+        if not content or not content.strip():
+            raise AIServiceError('Qwen3 API returned an empty response', retryable=False)
+        
+        return content.strip()
     
-    def _call_gemini(self, prompt: str) -> Optional[str]:
+    def _call_gemini(self, prompt: str, timeout: Optional[float] = None) -> str:
         """
         调用Gemini API
         
         Args:
             prompt: 提示词
+            timeout: 请求超时（秒），默认 request_timeout；超时后不再等待（SDK调用在后台线程中自行结束）
             
         Returns:
             API响应文本
+            
+        Raises:
+            AIServiceError: 调用失败或响应为空
+        """
+        if not self.client:
+            raise AIServiceError('Gemini client not available', retryable=False)
+        
+        def call():
+            response = self.client.generate_content(prompt)
+            return response.text if response else None
+        
+        try:
+            text = self._gemini_executor.submit(call).result(timeout=timeout or self.request_timeout)
+        except FutureTimeoutError:
+            raise AIServiceError('Gemini API request timeout')
+        except Exception as e:
+            raise AIServiceError(f'Gemini API call failed: {e}')
+        
+        if not text or not text.strip():
+            raise AIServiceError('Gemini API returned an empty response', retryable=False)
+        
+        return text.strip()
+    
+    def _call_provider(self, prompt: str, deadline: Optional[float]) -> str:
+        """经过限流后调用本供应商一次"""
+        timeout = remaining_time(deadline)
+        if timeout is not None and timeout <= 0:
+            raise AIServiceError('Timed out before the request was sent', retryable=False, provider_fault=False)
+        
+        if not self.limiter.acquire(estimate_tokens(prompt), timeout):
+            raise AIServiceError(
+                f'Timed out waiting for {self.provider} rate limit', retryable=False, provider_fault=False
+            )
+        
+        request_timeout = self.request_timeout
+        timeout = remaining_time(deadline)
+        if timeout is not None:
+            if timeout <= 0:
+                raise AIServiceError('Timed out before the request was sent', retryable=False, provider_fault=False)
+            request_timeout = min(request_timeout, timeout)
+        
+        if self.provider == 'qwen3':
+            text = self._call_qwen3(prompt, request_timeout)
+        elif self.provider == 'gemini':
+            text = self._call_gemini(prompt, request_timeout)
+        else:
+            raise AIServiceError(f'Unknown provider: {self.provider}', retryable=False)
+        
+        self.limiter.record_output(estimate_tokens(text))
+        return text
+    
+    def _call_with_retries(self, prompt: str, deadline: Optional[float], probe_token: Optional[int] = None) -> str:
+        """
+        调用本供应商，可重试的错误按带抖动的指数退避重试
+        
+        每次供应商失败都计入熔断器；熔断器打开或剩余时间不够退避时不再重试。
+        本调用持有半开探测名额（probe_token）时，无论以何种方式结束都会释放，避免熔断器一直停在半开状态；
+        不持有时不会动别的调用正在进行的探测
         """
         try:
-            if not self.client:
-                return None
+            for attempt in range(self.max_retries + 1):
+                try:
+                    text = self._call_provider(prompt, deadline)
+                except AIServiceError as e:
+                    if e.provider_fault:
+                        self.breaker.record_failure()
+                    if not e.retryable or attempt == self.max_retries or self.breaker.state != CircuitBreaker.CLOSED:
+                        raise
+                
+                    delay = backoff_delay(attempt, self.retry_backoff, self.retry_max_backoff)
+                    timeout = remaining_time(deadline)
+                    if timeout is not None and timeout <= delay:
+                        raise
+                
+                    print(f"[WARNING] {self.provider} call failed ({e}), retrying in {delay:.2f}s")
+                    time.sleep(delay)
+                    continue
             
-            response = self.client.generate_content(prompt)
+                self.breaker.record_success()
+                return text
+        finally:
+            if probe_token is not None:
+                self.breaker.release_probe(probe_token)
+    
+    @property
+    def model_tag(self) -> str:
+        """供应商/模型，用于结果缓存键和 model: 缓存标签"""
+        return f'{self.provider}/{self.model}'
+    
+    @property
+    def chain(self) -> List['AIService']:
+        """本供应商和备用供应商，按尝试顺序"""
+        return [self] + self.fallbacks
+    
+    def _generate(self, prompt: str, timeout: Optional[float] = None) -> Tuple[str, 'AIService']:
+        """
+        依次通过本供应商和备用供应商生成内容
+        
+        熔断中的供应商直接跳过；开启对冲时，请求超过 hedge_after 秒未返回就同时向下一个供应商发出，
+        先成功的结果胜出
+        
+        Args:
+            prompt: 提示词
+            timeout: 总耗时上限（秒，包括限流等待和重试），None表示只受单次请求超时限制
             
-            if response and response.text:
-                return response.text.strip()
+        Returns:
+            (生成的内容, 实际生成内容的供应商)
             
-            return None
+        Raises:
+            AIServiceError: 所有供应商都失败、熔断或总耗时超限
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        chain = iter(self.chain)
+        errors = []
+        
+        def next_service():
+            for service in chain:
+                allowed, probe_token = service.breaker.acquire()
+                if allowed:
+                    return service, probe_token
+                errors.append(f'{service.provider}: circuit open')
+            return None, None
+        
+        if self._hedge_executor is None:
+            service, probe_token = next_service()
+            while service is not None:
+                try:
+                    return service._call_with_retries(prompt, deadline, probe_token), service
+                except AIServiceError as e:
+                    errors.append(f'{service.provider}: {e}')
+                    timeout = remaining_time(deadline)
+                    if timeout is not None and timeout <= 0:
+                        break
+                service, probe_token = next_service()
+                if service is not None:
+                    print(f"[WARNING] Falling back to {service.provider}")
+        else:
+            service, probe_token = next_service()
+            futures = {}
+            if service is not None:
+                futures[self._hedge_executor.submit(service._call_with_retries, prompt, deadline, probe_token)] = service
+            hedged = False
             
-        except Exception as e:
-            print(f"[ERROR] Gemini API call failed: {e}")
+            while futures:
+                wait_timeout = remaining_time(deadline) if hedged else self.hedge_after
+                done, _ = wait(futures, timeout=wait_timeout, return_when=FIRST_COMPLETED)
+                
+                if not done:
+                    if hedged:
+                        errors.append('timed out')
+                        break
+                    hedged = True
+                    service, probe_token = next_service()
+                    if service is not None:
+                        print(f"[INFO] Hedging slow request to {service.provider}")
+                        futures[self._hedge_executor.submit(service._call_with_retries, prompt, deadline, probe_token)] = service
+                    continue
+                
+                for future in done:
+                    service = futures.pop(future)
+                    try:
+                        return future.result(), service
+                    except AIServiceError as e:
+                        errors.append(f'{service.provider}: {e}')
+                
+                # 进行中的请求都失败了，按顺序尝试下一个供应商
+                if not futures:
+                    service, probe_token = next_service()
+                    if service is not None:
+                        futures[self._hedge_executor.submit(service._call_with_retries, prompt, deadline, probe_token)] = service
+        
+        raise AIServiceError('; '.join(errors) or 'No AI provider available', retryable=False, provider_fault=False)
+    
+    def provider_status(self) -> List[Dict]:
+        """供应商链中每个供应商的模型和熔断状态"""
+        return [
+            {'provider': service.provider, 'model': service.model, **service.breaker.snapshot()}
+            for service in self.chain
+        ]
+    
+    @staticmethod
+    def _local_summary(abstract: str, max_length: int) -> Optional[str]:
+        """本地兜底：取摘要开头的完整句子，不超过 max_length 个字符"""
+        text = ' '.join((abstract or '').split())
+        if not text:
             return None
+        
+        summary = ''
+        for sentence in re.split(r'(?<=[.!?。！？])\s*', text):
+            if not sentence:
+                continue
+            if len(summary) + len(sentence) + 1 > max_length:
+                break
+            summary = f'{summary} {sentence}'.strip()
+        
+        if not summary:
+            summary = text[:max(1, max_length - 1)] + '…'
+        return summary
     
-    def _generate_content(self, prompt: str) -> Optional[str]:
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> Optional[str]:
         """
-        通过相应的AI供应商生成内容
+        通过供应商链生成内容（与供应商无关的公共入口，经过限流、重试、熔断和备用供应商）
         
         Args:
             prompt: 提示词
+            timeout: 总耗时上限（秒，可选）
             
         Returns:
-            生成的内容
+            去除首尾空白的生成内容，失败返回None
         """
-        if self.provider == 'qwen3':
-            return self._call_qwen3(prompt)
-        elif self.provider == 'gemini':
-            return self._call_gemini(prompt)
-        else:
-            print(f"[ERROR] Unknown provider: {self.provider}")
+        return self.generate_with_model(prompt, timeout)[0]
+    
+    def generate_with_model(self, prompt: str, timeout: Optional[float] = None) -> Tuple[Optional[str], Optional[str]]:
+        """
+        同 generate，同时返回实际生成内容的供应商/模型（可能是备用供应商），调用方按它缓存和标记结果
+        
+        Returns:
+            (生成内容, 供应商/模型)，失败返回 (None, None)
+        """
+        try:
+            text, service = self._generate(prompt, timeout)
+        except AIServiceError as e:
+            print(f"[ERROR] {e}")
+            return None, None
+        return text.strip(), service.model_tag
+    
+    def _result_key(self, kind: str, prompt_version: int, **fields) -> str:
+        """
+        内容寻址的结果缓存键：对供应商、模型、提示词模板版本和输入内容取哈希
+        
+        标题和摘要只合并空白，不改变大小写，内容相同的论文在不同搜索之间共享结果
+        """
+        normalized = {
+            name: ' '.join(value.split()) if isinstance(value, str) else value
+            for name, value in fields.items()
+        }
+        material = json.dumps(
+            [self.provider, self.model, prompt_version, normalized],
+            ensure_ascii=False, sort_keys=True, separators=(',', ':')
+        )
+        return f"{kind}:sha256={hashlib.sha256(material.encode('utf-8')).hexdigest()}"
+    
+    def _summary_key(self, title: str, abstract: str, max_length: int) -> str:
+        return self._result_key(
+            'summary', self.SUMMARY_PROMPT_VERSION, title=title, abstract=abstract, max_length=max_length
+        )
+    
+    def _get_cached_result(self, field: str, key_for: Callable[['AIService'], str]):
+        """
+        按供应商链的顺序查找结果缓存
+        
+        结果以实际生成它的供应商和模型寻址，备用供应商生成的结果同样可以命中
+        
+        Args:
+            field: 结果字段（'summary' 或 'keywords'）
+            key_for: 供应商 -> 该供应商的结果缓存键
+        """
+        if not self.result_cache:
             return None
+        for service in self.chain:
+            cached = self.result_cache.get(key_for(service))
+            if cached and cached.get(field):
+                return cached[field]
+        return None
+    
+    def _cache_result(self, service: 'AIService', key: str, field: str, value):
+        """以生成结果的供应商的键和 model: 标签写入结果缓存"""
+        if self.result_cache and value:
+            self.result_cache.set(
+                key, {field: value}, ttl=self.result_cache_ttl, tags=[f'model:{service.model_tag}']
+            )
+    
+    @staticmethod
+    def _build_summary_prompt(title: str, abstract: str, max_length: int) -> str:
+        return f"""请对以下学术论文进行简洁总结，用中文回答：
+
+论文标题：{title}
+
+论文摘要：
+{abstract}
+
+请用不超过{max_length}个字符的中文总结这篇论文的主要内容、创新点和实际应用意义。"""
     
     def summarize_paper(
         self, 
@@ -152,16 +510,20 @@ class AIService:
         Returns:
             AI生成的总结，失败返回None
         """
-        prompt = f"""请对以下学术论文进行简洁总结，用中文回答：
-
-论文标题：{title}
-
-论文摘要：
-{abstract}
-
-请用不超过{max_length}个字符的中文总结这篇论文的主要内容、创新点和实际应用意义。"""
+        cached = self._get_cached_result('summary', lambda service: service._summary_key(title, abstract, max_length))
+        if cached:
+            return cached
         
-        return self._generate_content(prompt)
+        try:
+            summary, service = self._generate(self._build_summary_prompt(title, abstract, max_length))
+        except AIServiceError as e:
+            print(f"[ERROR] {e}")
+        else:
+            self._cache_result(service, service._summary_key(title, abstract, max_length), 'summary', summary)
+            return summary
+        
+        # 兜底结果不写入缓存，供应商恢复后重新生成
+        return self._local_summary(abstract, max_length) if self.local_fallback else None
     
     def extract_keywords(self, abstract: str) -> Optional[list]:
         """
@@ -173,46 +535,282 @@ class AIService:
         Returns:
             关键词列表
         """
+        def key_for(service: 'AIService') -> str:
+            return service._result_key('keywords', self.KEYWORDS_PROMPT_VERSION, abstract=abstract)
+        
+        cached = self._get_cached_result('keywords', key_for)
+        if cached:
+            return cached
+        
         prompt = f"""请从以下论文摘要中提取5-10个最重要的关键词，用中文回答，以逗号分隔：
 
 {abstract}
 
 只返回关键词列表，不需要其他说明。"""
         
-        response = self._generate_content(prompt)
+        try:
+            response, service = self._generate(prompt)
+        except AIServiceError as e:
+            print(f"[ERROR] {e}")
+            return []
+        
+        keywords = [kw.strip() for kw in response.split('，')]
+        self._cache_result(service, key_for(service), 'keywords', keywords)
+        return keywords
+    
+    def _summarize_item(self, paper: Dict, max_length: int, timeout: Optional[float]) -> Dict:
+        """总结单篇论文，失败时在结果中记录原因而不抛出；开启本地兜底时返回摘要开头的句子"""
+        result = {
+            'arxiv_id': paper.get('arxiv_id', ''), 'summary': None, 'error': None, 'cached': False, 'fallback': False
+        }
+        title, abstract = paper.get('title', ''), paper.get('summary', '')
+        prompt = self._build_summary_prompt(title, abstract, max_length)
+        
+        try:
+            result['summary'], service = self._generate(prompt, timeout)
+            self._cache_result(service, service._summary_key(title, abstract, max_length), 'summary', result['summary'])
+        except AIServiceError as e:
+            print(f"[ERROR] Failed to summarize {result['arxiv_id']}: {e}")
+            result['error'] = str(e)
+        except Exception as e:
+            print(f"[ERROR] Unexpected error summarizing {result['arxiv_id']}: {e}")
+            result['error'] = str(e)
+        
+        if result['error'] and self.local_fallback:
+            # 兜底结果不写入缓存，供应商恢复后重新生成
+            result['summary'] = self._local_summary(abstract, max_length)
+            if result['summary']:
+                result['error'] = None
+                result['fallback'] = True
+        
+        return result
+    
+    @staticmethod
+    def _format_packed_paper(paper: Dict) -> str:
+        return f"""arxiv_id: {paper.get('arxiv_id', '')}
+论文标题：{paper.get('title', '')}
+论文摘要：
+{paper.get('summary', '')}"""
+    
+    def _build_packed_prompt(self, papers: List[Dict], max_length: int) -> str:
+        items = '\n\n---\n\n'.join(self._format_packed_paper(paper) for paper in papers)
+        return f"""请分别对以下{len(papers)}篇学术论文进行简洁总结，用中文回答。
+每篇用不超过{max_length}个字符概括主要内容、创新点和实际应用意义。
+
+{items}
+
+只返回一个JSON数组，不要其他说明，格式为：
+[{{"arxiv_id": "论文的arxiv_id", "summary": "总结"}}]"""
+    
+    def _plan_packs(self, papers: List[Dict], indices: List[int], max_length: int) -> Tuple[List[List[int]], List[int]]:
+        """
+        按token预算把论文依次装进打包请求
+        
+        预算按提示词的token数加上每篇预计的输出（max_length个字符）计算；
+        没有arxiv_id、arxiv_id重复或单篇就超出预算的论文单独请求
+        
+        Returns:
+            (打包的论文下标列表, 单独请求的论文下标)
+        """
+        packs, singles = [], []
+        current, current_tokens = [], 0
+        overhead = estimate_tokens(self._build_packed_prompt([], max_length))
+        seen = set()
+        
+        for index in indices:
+            arxiv_id = papers[index].get('arxiv_id')
+            cost = estimate_tokens(self._format_packed_paper(papers[index])) + max_length
+            if not arxiv_id or arxiv_id in seen or overhead + cost > self.pack_token_budget:
+                singles.append(index)
+                continue
+            seen.add(arxiv_id)
+            
+            if current and (overhead + current_tokens + cost > self.pack_token_budget
+                            or len(current) >= self.pack_max_papers):
+                packs.append(current)
+                current, current_tokens = [], 0
+            current.append(index)
+            current_tokens += cost
+        
+        if current:
+            packs.append(current)
         
-        if response:
-            keywords = [kw.strip() for kw in response.split('，')]
-            return keywords
+        # 只有一篇的包没有打包的意义
+        for pack in [pack for pack in packs if len(pack) == 1]:
+            packs.remove(pack)
+            singles.extend(pack)
         
-        return []
+        return packs, singles
+    
+    @staticmethod
+    def _parse_packed_response(text: str) -> Dict[str, str]:
+        """
+        解析打包请求的响应，返回 arxiv_id -> 总结
+        
+        兼容代码块包裹和数组前后的多余文字；格式不对的条目直接忽略
+        """
+        text = re.sub(r'^```(?:json)?\s*|\s*```$', '', text.strip())
+        start, end = text.find('['), text.rfind(']')
+        if start == -1 or end <= start:
+            return {}
+        
+        try:
+            items = json.loads(text[start:end + 1])
+        except ValueError:
+            return {}
+        
+        results = {}
+        for item in items if isinstance(items, list) else []:
+            if not isinstance(item, dict):
+                continue
+            arxiv_id, summary = item.get('arxiv_id'), item.get('summary')
+            if isinstance(arxiv_id, str) and isinstance(summary, str) and summary.strip():
+                results[arxiv_id.strip()] = summary.strip()
+        return results
+    
+    def _summarize_pack(self, papers: List[Dict], max_length: int, timeout: Optional[float]) -> List[Optional[str]]:
+        """
+        用一个请求总结多篇论文
+        
+        Returns:
+            与 papers 对应的总结，缺失或格式不对的为None（由调用方单独重试）
+        """
+        try:
+            response, service = self._generate(self._build_packed_prompt(papers, max_length), timeout)
+        except AIServiceError as e:
+            print(f"[ERROR] Packed summarization of {len(papers)} papers failed: {e}")
+            return [None] * len(papers)
+        
+        parsed = self._parse_packed_response(response)
+        summaries = []
+        for paper in papers:
+            summary = parsed.get(paper.get('arxiv_id'))
+            if summary:
+                self._cache_result(
+                    service, service._summary_key(paper.get('title', ''), paper.get('summary', ''), max_length),
+                    'summary', summary
+                )
+            summaries.append(summary)
+        
+        missing = summaries.count(None)
+        if missing:
+            print(f"[WARNING] Packed response missing {missing}/{len(papers)} summaries, retrying individually")
+        
+        return summaries
+    
+    def iter_summaries(
+        self,
+        papers: list,
+        max_length: int = 200,
+        max_workers: Optional[int] = None,
+        item_timeout: Optional[float] = None,
+        packed: Optional[bool] = None,
+        cancel_event: Optional[threading.Event] = None
+    ) -> Iterator[Tuple[int, Dict]]:
+        """
+        并发总结多篇论文，按完成顺序逐个产出结果
+        
+        缓存命中的论文最先产出，不占用并发名额；其余论文的处理方式见 batch_summarize。
+        生成器被关闭（如客户端断开）或 cancel_event 被设置时，尚未开始的请求全部取消，
+        不再提交重试，正在进行的请求在各自超时内结束
+        
+        Args:
+            papers: 论文列表
+            max_length: 每个总结的最大字符数
+            max_workers: 并发数（可选）
+            item_timeout: 每篇论文的最长耗时（秒，可选）
+            packed: 是否使用打包模式（可选）
+            cancel_event: 取消信号（可选）
+            
+        Yields:
+            (论文在输入中的下标, 总结结果)
+        """
+        pending = []
+        for index, paper in enumerate(papers):
+            cached = self._get_cached_result(
+                'summary', lambda service: service._summary_key(paper.get('title', ''), paper.get('summary', ''), max_length)
+            )
+            if cached:
+                yield index, {
+                    'arxiv_id': paper.get('arxiv_id', ''), 'summary': cached, 'error': None, 'cached': True, 'fallback': False
+                }
+            else:
+                pending.append(index)
+        
+        if not pending:
+            return
+        
+        timeout = item_timeout or self.item_timeout
+        packs, singles = [], pending
+        if self.packed if packed is None else packed:
+            packs, singles = self._plan_packs(papers, pending, max_length)
+        
+        workers = max(1, min(max_workers or self.max_workers, len(packs) + len(singles)))
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ai-summarize')
+        
+        try:
+            futures = {}
+            for index in singles:
+                futures[executor.submit(self._summarize_item, papers[index], max_length, timeout)] = index
+            for pack in packs:
+                future = executor.submit(self._summarize_pack, [papers[i] for i in pack], max_length, timeout)
+                futures[future] = pack
+            
+            while futures:
+                # 定期醒来检查取消信号
+                done, _ = wait(futures, timeout=0.5, return_when=FIRST_COMPLETED)
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+                
+                for future in done:
+                    target = futures.pop(future)
+                    if not isinstance(target, list):
+                        yield target, future.result()
+                        continue
+                    
+                    for index, summary in zip(target, future.result()):
+                        if summary:
+                            yield index, {
+                                'arxiv_id': papers[index].get('arxiv_id', ''),
+                                'summary': summary,
+                                'error': None,
+                                'cached': False,
+                                'fallback': False
+                            }
+                        else:
+                            retry = executor.submit(self._summarize_item, papers[index], max_length, timeout)
+                            futures[retry] = index
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
     
     def batch_summarize(
         self, 
         papers: list,
-        max_length: int = 200
+        max_length: int = 200,
+        max_workers: Optional[int] = None,
+        item_timeout: Optional[float] = None,
+        packed: Optional[bool] = None
     ) -> list:
         """
-        批量总结多篇论文
+        并发批量总结多篇论文
+        
+        先查结果缓存，命中的论文不占用并发名额；并发数和供应商限流共同决定实际的请求速率；
+        每篇论文的耗时（包括限流等待）不超过 item_timeout，单篇失败不影响其他论文。
+        打包模式下按token预算把多篇论文放进一个请求，要求返回以arxiv_id为键的JSON数组，
+        响应中缺失或格式不对的论文再单独请求
         
         Args:
             papers: 论文列表，每个元素应该包含title和summary字段
             max_length: 每个总结的最大字符数
+            max_workers: 并发数（可选，默认使用初始化时的设置）
+            item_timeout: 每篇论文的最长耗时（秒，可选）
+            packed: 是否使用打包模式（可选，默认使用初始化时的设置）
             
         Returns:
-            总结列表
+            与输入顺序一致的总结列表，每项包含 arxiv_id、summary、error（成功时为None）、cached
+            和 fallback（是否为本地兜底的摘要节选）
         """
-        summaries = []
-        
-        for paper in papers:
-            summary = self.summarize_paper(
-                paper.get('title', ''),
-                paper.get('summary', ''),
-                max_length
-            )
-            summaries.append({
-                'arxiv_id': paper.get('arxiv_id', ''),
-                'summary': summary
-            })
-        
+        summaries = [None] * len(papers)
+        for index, result in self.iter_summaries(papers, max_length, max_workers, item_timeout, packed):
+            summaries[index] = result
         return summaries
@@ -2,21 +2,84 @@
 论文分析和聚合服务
 用于生成发展脉络总结和季度聚合
 """
-from typing import Dict, List, Optional, Tuple
-from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import threading
+
+from services.cache_service import make_cache_key
+from services.paper_index import PaperIndex
+from services.token_budget import fit_papers_to_budget, truncate_to_tokens
 
 class PaperAnalysisService:
     """论文分析和聚合服务"""
     
-    def __init__(self, ai_service=None):
+    # 季度总结和发展脉络（归约）的提示词模板版本，修改模板后递增，使旧的缓存结果失效
+    QUARTER_PROMPT_VERSION = 2
+    TRAJECTORY_PROMPT_VERSION = 2
+    
+    # 分层模式下每个季度综述的最大字符数
+    QUARTER_SUMMARY_LENGTH = 300
+    
+    # 保留最近几个论文列表的索引（一次搜索的发展脉络和季度聚合共用同一个列表）
+    INDEX_CACHE_SIZE = 4
+    
+    def __init__(
+        self,
+        ai_service=None,
+        cache_service=None,
+        hierarchical: bool = True,
+        max_workers: int = 4,
+        closed_quarter_ttl: Optional[int] = None,
+        open_quarter_ttl: Optional[int] = 24 * 3600,
+        quarter_token_budget: int = 3000,
+        trajectory_token_budget: int = 4000,
+        max_abstract_tokens: int = 120
+    ):
         """
         初始化服务
         
         Args:
             ai_service: AI总结服务（可选）
+            cache_service: 季度总结和发展脉络的缓存（可选）
+            hierarchical: 是否按季度分层生成发展脉络（先并发总结各季度，再归约为发展脉络）
+            max_workers: 并发生成季度总结的线程数
+            closed_quarter_ttl: 已结束季度的总结缓存秒数（None为缓存默认过期时间）
+            open_quarter_ttl: 当前季度的总结缓存秒数
+            quarter_token_budget: 每个季度总结提示词中论文信息的token预算
+            trajectory_token_budget: 发展脉络提示词中论文信息或季度综述的token预算
+            max_abstract_tokens: 提示词中每篇摘要的token上限
         """
         self.ai_service = ai_service
+        self.cache_service = cache_service
+        self.hierarchical = hierarchical
+        self.max_workers = max_workers
+        self.closed_quarter_ttl = closed_quarter_ttl
+        self.open_quarter_ttl = open_quarter_ttl
+        self.quarter_token_budget = quarter_token_budget
+        self.trajectory_token_budget = trajectory_token_budget
+        self.max_abstract_tokens = max_abstract_tokens
+        self._indexes = []
+        self._index_lock = threading.Lock()
+    
+    def _index(self, papers: List[Dict]) -> PaperIndex:
+        """
+        获取论文列表的列式索引，同一个列表对象只建立一次
+        
+        缓存中保留对列表的引用，按对象身份和长度判断是否为同一个列表
+        """
+        with self._index_lock:
+            for cached_papers, size, index in self._indexes:
+                if cached_papers is papers and size == len(papers):
+                    return index
+        
+        index = PaperIndex(papers)
+        with self._index_lock:
+            self._indexes = [(papers, len(papers), index)] + self._indexes[:self.INDEX_CACHE_SIZE - 1]
+        return index
     
     def generate_trajectory_summary(
         self,
@@ -26,7 +89,9 @@ class PaperAnalysisService:
         """
         生成论文的发展脉络总结
         
-        对近3年的论文进行综合总结，说明研究方向的发展趋势
+        对近3年的论文进行综合总结，说明研究方向的发展趋势。
+        分层模式下覆盖全部论文：各季度总结并发生成并缓存，再归约为发展脉络；
+        否则按token预算放入尽量多的最新论文，生成一次
         
         Args:
             papers: 论文列表
@@ -38,16 +103,16 @@ class PaperAnalysisService:
         if not papers:
             return None
         
+        if self.hierarchical and self.ai_service:
+            return self._generate_hierarchical_trajectory(papers, max_length)
+        
         # 按发布时间排序，获取最新的论文信息
-        sorted_papers = sorted(
-            papers, 
-            key=lambda p: p.get('published', '0'), 
-            reverse=True
-        )
+        sorted_papers = self._index(papers).newest()
         
-        # 提取关键信息（最新的论文优先）
-        titles = [p.get('title', '') for p in sorted_papers[:25]]  # 取前25篇
-        summaries = [p.get('summary', '')[:150] for p in sorted_papers[:25]]
+        # 提取关键信息（最新的论文优先，去重并按预算截断摘要）
+        entries, omitted = fit_papers_to_budget(
+            sorted_papers, self.trajectory_token_budget, self.max_abstract_tokens
+        )
         
         # 提取发表地点信息用于分析
         venues = []
@@ -67,8 +132,12 @@ class PaperAnalysisService:
 
 顶级论文（按新旧度排序）:
 """
-        for i, (title, summary) in enumerate(zip(titles, summaries), 1):
-            trajectory_text += f"\n{i}. 《{title}》\n   摘要概要：{summary}\n"
+        for i, entry in enumerate(entries, 1):
+            trajectory_text += f"\n{i}. 《{entry['title']}》\n"
+            if entry['abstract']:
+                trajectory_text += f"   摘要概要：{entry['abstract']}\n"
+        if omitted:
+            trajectory_text += f"\n（另有{omitted}篇较早的论文未列出）\n"
         
         trajectory_text += f"""
 请生成一份不超过{max_length}个字符的中文发展脉络分析报告，包含以下要点（以段落形式呈现）：
@@ -82,12 +151,10 @@ class PaperAnalysisService:
         
         # 如果有AI服务，使用AI生成总结
         if self.ai_service:
-            try:
-                response = self.ai_service.client.generate_content(trajectory_text)
-                if response.text:
-                    return response.text.strip()
-            except Exception as e:
-                print(f"[ERROR] Failed to generate trajectory summary: {e}")
+            trajectory = self.ai_service.generate(trajectory_text)
+            if trajectory:
+                return trajectory
+            print("[ERROR] Failed to generate trajectory summary")
         
         # 降级方案：生成基于数据的简单总结
         return self._generate_fallback_trajectory(papers)
@@ -105,27 +172,10 @@ class PaperAnalysisService:
         if not papers:
             return None
         
-        # 统计发表地点
-        venues = defaultdict(int)
-        for paper in papers:
-            venue = paper.get('publication_venue')
-            if venue:
-                venues[venue] += 1
-        
-        # 按频率排序
-        top_venues = sorted(venues.items(), key=lambda x: x[1], reverse=True)[:5]
-        
-        # 分析时间分布
-        date_distribution = defaultdict(int)
-        for paper in papers:
-            published = paper.get('published', '')
-            if published:
-                try:
-                    pub_date = datetime.fromisoformat(published.replace('Z', '+00:00'))
-                    year = pub_date.year
-                    date_distribution[year] += 1
-                except:
-                    pass
+        # 发表地点按频率排序，以及时间分布（都来自同一个索引）
+        index = self._index(papers)
+        top_venues = index.top_venue_counts(5)
+        date_distribution = index.year_counts()
         
         # 生成统计总结
         summary = f"""【研究概览】\n\n"""
@@ -167,28 +217,8 @@ class PaperAnalysisService:
         Returns:
             按季度分组的论文字典，键为 "2024-Q1" 这样的格式
         """
-        quarters = defaultdict(list)
-        
-        for paper in papers:
-            published = paper.get('published', '')
-            if published:
-                try:
-                    pub_date = datetime.fromisoformat(published.replace('Z', '+00:00'))
-                    year = pub_date.year
-                    month = pub_date.month
-                    quarter = (month - 1) // 3 + 1
-                    quarter_key = f"{year}-Q{quarter}"
-                    quarters[quarter_key].append(paper)
-                except:
-                    # 如果解析失败，放在"未知"分类
-                    quarters['Unknown'].append(paper)
-        
-        # 排序季度
-        sorted_quarters = {}
-        for key in sorted(quarters.keys(), reverse=True):
-            sorted_quarters[key] = quarters[key]
-        
-        return sorted_quarters
+        # 季度从新到旧，发布时间解析失败的放在"未知"分类
+        return self._index(papers).quarters()
     
     def generate_quarterly_summaries(
         self,
@@ -206,23 +236,161 @@ class PaperAnalysisService:
             按季度的综述文本字典
         """
         quarters = self.group_papers_by_quarter(papers)
-        summaries = {}
+        quarters.pop('Unknown', None)
+        summaries = self._summarize_quarters(quarters, max_length, self._index(papers))
+        return {quarter_key: summary for quarter_key, (summary, _) in summaries.items()}
+        
+    def _summarize_quarters(
+        self,
+        quarters: Dict[str, List[Dict]],
+        max_length: int,
+        index: PaperIndex
+    ) -> Dict[str, Tuple[str, bool]]:
+        """
+        并发生成各季度的综述，已缓存的季度不再调用AI
+        
+        缓存键由季度和该季度论文arxiv_id集合的哈希组成：已结束季度的论文集合不再变化，
+        总结只生成一次；当前季度有新论文时键随之改变，重新生成
+        
+        Args:
+            quarters: 季度 -> 该季度的论文
+            max_length: 每个综述的最大字符数
+            index: 全部论文的索引（提供各季度的发表地点计数）
         
+        Returns:
+            季度 -> (综述文本, 是否由AI生成)
+        """
+        results = {}
+        pending = []
         for quarter_key, quarter_papers in quarters.items():
-            if quarter_key == 'Unknown':
-                continue
+            cached = self._get_cached(
+                self._quarter_cache_key(quarter_key, quarter_papers, max_length, model) for model in self._model_tags()
+            )
+            if cached:
+                results[quarter_key] = (cached, True)
+            else:
+                pending.append(quarter_key)
             
-            summary = self._generate_quarter_summary(quarter_papers, quarter_key, max_length)
-            summaries[quarter_key] = summary
+        if pending:
+            workers = max(1, min(self.max_workers, len(pending)))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='quarter-summary') as executor:
+                generated = executor.map(
+                    lambda quarter_key: self._generate_quarter_summary(
+                        quarters[quarter_key], quarter_key, max_length, index.top_venues(3, quarter_key)
+                    ),
+                    pending
+                )
+                for quarter_key, summary in zip(pending, generated):
+                    results[quarter_key] = summary
+        
+        return {quarter_key: results[quarter_key] for quarter_key in quarters}
+    
+    @staticmethod
+    def _quarter_is_closed(quarter_key: str, now: Optional[datetime] = None) -> bool:
+        """季度是否已经结束（按UTC）"""
+        year, quarter = quarter_key.split('-Q')
+        end_month = int(quarter) * 3 + 1
+        end = datetime(int(year) + end_month // 13, (end_month - 1) % 12 + 1, 1, tzinfo=timezone.utc)
+        return (now or datetime.now(timezone.utc)) >= end
+    
+    def _model_tags(self) -> List[str]:
+        """
+        供应商链中各模型的 供应商/模型 标签，按尝试顺序
+    
+        综述以实际生成它的模型寻址（主供应商失败时可能是备用供应商），查找缓存时依次尝试
+        """
+        return [service.model_tag for service in self.ai_service.chain] if self.ai_service else []
+    
+    def _quarter_cache_key(self, quarter_key: str, papers: List[Dict], max_length: int, model: str) -> str:
+        arxiv_ids = sorted(p.get('arxiv_id') or p.get('title', '') for p in papers)
+        digest = hashlib.sha256('\n'.join(arxiv_ids).encode('utf-8')).hexdigest()
+        return make_cache_key(
+            'quarter', quarter=quarter_key, papers=digest, max_length=max_length,
+            model=model, v=self.QUARTER_PROMPT_VERSION
+        )
+    
+    def _get_cached(self, keys: Iterable[str]) -> Optional[str]:
+        """依次查找缓存键，返回第一个命中的综述"""
+        if not self.cache_service:
+            return None
+        for key in keys:
+            cached = self.cache_service.get(key)
+            if cached and cached.get('summary'):
+                return cached['summary']
+        return None
+    
+    def _set_cached(self, key: str, summary: str, ttl: Optional[int], model: str):
+        if self.cache_service:
+            self.cache_service.set(key, {'summary': summary}, ttl=ttl, tags=[f'model:{model}'])
+    
+    def _generate_hierarchical_trajectory(self, papers: List[Dict], max_length: int) -> Optional[str]:
+        """
+        分层生成发展脉络：先得到各季度综述（map），再把按时间排列的季度综述归约为发展脉络（reduce）
+        
+        重复搜索时通常只需重新生成当前季度和一次很小的归约调用；
+        所有季度都没有AI综述或归约失败时使用基于统计的降级总结
+        """
+        quarters = self.group_papers_by_quarter(papers)
+        quarters.pop('Unknown', None)
+        quarter_summaries = self._summarize_quarters(quarters, self.QUARTER_SUMMARY_LENGTH, self._index(papers))
+        
+        if not any(generated for _, generated in quarter_summaries.values()):
+            return self._generate_fallback_trajectory(papers)
+        
+        timeline = [
+            (quarter_key, len(quarters[quarter_key]), summary)
+            for quarter_key, (summary, _) in sorted(quarter_summaries.items())
+        ]
+        digest = hashlib.sha256(
+            json.dumps(timeline, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        ).hexdigest()
+        def key_for(model: str) -> str:
+            return make_cache_key(
+                'trajectory', quarters=digest, max_length=max_length, model=model, v=self.TRAJECTORY_PROMPT_VERSION
+            )
+        
+        cached = self._get_cached(key_for(model) for model in self._model_tags())
+        if cached:
+            return cached
+        
+        venue_info = ', '.join(self._index(papers).top_venues(3)) or '多个学术期刊和会议'
+        prompt = f"""请根据以下{len(timeline)}个季度的研究进展总结（共{len(papers)}篇论文，按时间从早到晚排列），用中文生成一份学术领域发展脉络报告。
+        
+主要发表地点：{venue_info}
+
+各季度研究进展:
+"""
+        # 季度很多时按预算平均截断各季度综述
+        per_quarter = max(self.trajectory_token_budget // len(timeline), 32)
+        for quarter_key, count, summary in timeline:
+            prompt += f"\n【{quarter_key}，{count}篇】\n{truncate_to_tokens(summary, per_quarter)}\n"
         
-        return summaries
+        prompt += f"""
+请生成一份不超过{max_length}个字符的中文发展脉络分析报告，包含以下要点（以段落形式呈现）：
+
+1. **研究热点**：该领域当前的主要研究方向和热点问题
+2. **关键进展**：各阶段的重要学术突破和创新
+3. **技术趋势**：正在快速发展的技术方向和方法
+4. **未来展望**：基于当前趋势的可能发展方向
+
+请简洁明了地表述，避免过度学术化，使其易于理解。"""
+
+        trajectory, model = self.ai_service.generate_with_model(prompt)
+        if not trajectory:
+            return self._generate_fallback_trajectory(papers)
+        
+        # 只包含已结束季度时结果不会再变化，可以长期缓存
+        closed = all(self._quarter_is_closed(quarter_key) for quarter_key, _, _ in timeline)
+        self._set_cached(key_for(model), trajectory, self.closed_quarter_ttl if closed else self.open_quarter_ttl, model)
+        return trajectory
     
     def _generate_quarter_summary(
         self,
         papers: List[Dict],
         quarter_key: str,
-        max_length: int
-    ) -> Optional[str]:
+        max_length: int,
+        top_venues: List[str]
+    ) -> Tuple[str, bool]:
         """
         生成单个季度的综述
         
@@ -230,24 +398,12 @@ class PaperAnalysisService:
             papers: 该季度的论文列表
             quarter_key: 季度标识符
             max_length: 最大字符数
+            top_venues: 该季度的主要发表地点
             
         Returns:
-            综述文本或None
+            (综述文本, 是否由AI生成)，AI不可用或失败时为基于统计的简单总结
         """
-        if not papers:
-            return None
-        
-        # 提取该季度的论文信息
-        titles = [p.get('title', '') for p in papers[:15]]  # 取前15篇
-        
-        # 统计发表地点
-        venues = defaultdict(int)
-        for paper in papers:
-            venue = paper.get('publication_venue')
-            if venue:
-                venues[venue] += 1
-        top_venues = sorted(venues.items(), key=lambda x: x[1], reverse=True)[:3]
-        venue_str = ', '.join([v[0] for v in top_venues]) if top_venues else "学术期刊和会议"
+        venue_str = ', '.join(top_venues) if top_venues else "学术期刊和会议"
         
         prompt = f"""请根据以下{len(papers)}篇在{quarter_key}期间发表的论文信息，生成一份简洁的季度研究进展总结。
 
@@ -256,10 +412,16 @@ class PaperAnalysisService:
 - 论文数量：{len(papers)}篇
 - 主要发表地：{venue_str}
 
-论文标题（按重要性排序）:
+论文信息:
 """
-        for i, title in enumerate(titles, 1):
-            prompt += f"{i}. {title}\n"
+        # 按token预算尽量覆盖该季度的全部论文：去重后放入全部标题，剩余预算平均分给摘要
+        entries, omitted = fit_papers_to_budget(papers, self.quarter_token_budget, self.max_abstract_tokens)
+        for i, entry in enumerate(entries, 1):
+            prompt += f"{i}. {entry['title']}\n"
+            if entry['abstract']:
+                prompt += f"   {entry['abstract']}\n"
+        if omitted:
+            prompt += f"（另有{omitted}篇论文未列出）\n"
         
         prompt += f"""
 请生成一份不超过{max_length}个字符的中文季度总结，简洁地描述：
@@ -272,15 +434,15 @@ class PaperAnalysisService:
         
         # 如果有AI服务，使用AI生成
         if self.ai_service:
-            try:
-                response = self.ai_service.client.generate_content(prompt)
-                if response.text:
-                    return response.text.strip()
-            except Exception as e:
-                print(f"[ERROR] Failed to generate quarterly summary: {e}")
-        
-        # 降级方案：返回基于数据的简单总结
-        return f"{quarter_key}: {len(papers)}篇论文，主要发表在{venue_str}"
+            summary, model = self.ai_service.generate_with_model(prompt)
+            if summary:
+                ttl = self.closed_quarter_ttl if self._quarter_is_closed(quarter_key) else self.open_quarter_ttl
+                self._set_cached(self._quarter_cache_key(quarter_key, papers, max_length, model), summary, ttl, model)
+                return summary, True
+            print(f"[ERROR] Failed to generate quarterly summary for {quarter_key}")
+        
+        # 降级方案：返回基于数据的简单总结（不缓存）
+        return f"{quarter_key}: {len(papers)}篇论文，主要发表在{venue_str}", False
     
     def get_quarterly_aggregates(
         self,
@@ -293,34 +455,20 @@ class PaperAnalysisService:
             papers: 论文列表
             
         Returns:
-            季度聚合数据列表
+            季度聚合数据列表，每个季度的论文以 paper_indices（在 papers 中的下标）引用，不重复内嵌论文
         """
-        quarters = self.group_papers_by_quarter(papers)
+        index = self._index(papers)
         aggregates = []
         
-        for quarter_key, quarter_papers in quarters.items():
-            if quarter_key == 'Unknown':
-                continue
-            
+        for quarter_key, indices in index.quarter_indices(include_unknown=False).items():
             aggregate = {
                 'quarter': quarter_key,
-                'paper_count': len(quarter_papers),
-                'papers': quarter_papers,
-                'top_venues': self._extract_top_venues(quarter_papers),
-                'sample_titles': [p.get('title', '') for p in quarter_papers[:3]]
+                'paper_count': len(indices),
+                'paper_indices': indices,
+                'top_venues': index.top_venues(3, quarter_key),
+                'sample_titles': [papers[i].get('title', '') for i in indices[:3]]
             }
             aggregates.append(aggregate)
         
         return aggregates
-    
-    def _extract_top_venues(self, papers: List[Dict]) -> List[str]:
-        """提取该季度论文的主要发表地点"""
-        venues = defaultdict(int)
-        
-        for paper in papers:
-            venue = paper.get('publication_venue')
-            if venue:
-                venues[venue] += 1
-        
-        # 按数量排序，返回前3个
-        return [v for v, _ in sorted(venues.items(), key=lambda x: x[1], reverse=True)[:3]]
+    
\ No newline at end of file
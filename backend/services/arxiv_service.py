@@ -2,33 +2,103 @@
 arXiv API 服务模块
 用于获取和处理arXiv论文数据
 """
-import feedparser
 import requests
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from typing import Iterator, List, Dict, Optional, Tuple
+import re
 import urllib.parse
 
+from services.atom_parser import iter_papers, ParseError
+
 class ArxivService:
     """arXiv数据获取服务"""
     
     BASE_URL = 'http://export.arxiv.org/api/query'
     
-    def __init__(self, max_results: int = 100, timeout: int = 30):
+    # 可重试的响应状态码和请求异常
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+    RETRY_EXCEPTIONS = (
+        requests.exceptions.ConnectionError,
+        requests.exceptions.Timeout,
+        requests.exceptions.ChunkedEncodingError,
+    )
+    
+    def __init__(
+        self,
+        max_results: int = 100,
+        timeout: int = 30,
+        page_size: int = 500,
+        max_concurrent_pages: int = 3,
+        request_interval: float = 3.0,
+        pool_size: int = 10,
+        max_retries: int = 3,
+        retry_backoff: float = 1.0,
+        conditional_cache_size: int = 256,
+        id_batch_size: int = 100,
+        paper_store=None,
+        base_url: Optional[str] = None
+    ):
         """
         初始化arXiv服务
         
         Args:
             max_results: 单次查询最大论文数
             timeout: 请求超时时间（秒）
+            page_size: 分页抓取时每页的论文数
+            max_concurrent_pages: 同时进行中的分页请求数上限
+            request_interval: 相邻两次请求发起的最小间隔（秒），arXiv建议3秒
+            pool_size: 连接池中保持的长连接数
+            max_retries: 连接错误或429/5xx响应的最大重试次数
+            retry_backoff: 重试退避系数（秒）
+            conditional_cache_size: 保存ETag/Last-Modified校验信息的响应条数
+            id_batch_size: 批量按ID查询时每个id_list请求包含的ID数
+            paper_store: 本地论文库（可选），获取到的论文会写入其中
+            base_url: arXiv API地址（可选），默认 BASE_URL，测试时可指向本地服务
         """
         self.max_results = max_results
         self.timeout = timeout
+        self.page_size = max(1, page_size)
+        self.max_concurrent_pages = max(1, max_concurrent_pages)
+        self.request_interval = request_interval
+        self.id_batch_size = max(1, id_batch_size)
+        self.max_retries = max(0, max_retries)
+        self.retry_backoff = retry_backoff
+        self.paper_store = paper_store
+        self.base_url = base_url or self.BASE_URL
+        
+        # 请求节流状态（跨线程共享）
+        self._throttle_lock = threading.Lock()
+        self._next_request_at = 0.0
+        
+        # 共享的长连接池，所有线程复用同一个Session。
+        # 重试由 _fetch_feed 自己完成，每次重试都经过节流器
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=0
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
+        # 条件请求缓存：URL -> (ETag, Last-Modified, 响应内容)
+        self.conditional_cache_size = conditional_cache_size
+        self._conditional_cache = OrderedDict()
+        self._conditional_lock = threading.Lock()
     
     def search_papers(
         self, 
         query: str, 
         days_back: int = 365 * 5,
-        max_results: Optional[int] = None
+        max_results: Optional[int] = None,
+        submitted_after: Optional[datetime] = None,
+        raise_errors: bool = False
     ) -> List[Dict]:
         """
         搜索arXiv上的论文
@@ -37,9 +107,14 @@ class ArxivService:
             query: 搜索关键词
             days_back: 搜索多少天内的论文（默认5年）
             max_results: 返回结果数量
+            submitted_after: 只返回该时间（UTC）之后提交的论文，用于增量补齐
+            raise_errors: 为True时任一分页失败都抛出异常，而不是返回部分结果
             
         Returns:
             论文列表，包含标题、摘要、作者、发布日期等信息
+            
+        Raises:
+            requests.exceptions.RequestException, ParseError: raise_errors为True且请求失败
         """
         max_results = max_results or self.max_results
         
@@ -47,70 +122,284 @@ class ArxivService:
         # 简化查询，直接搜索关键词，不限制日期
         search_query = f'all:{query}'
         
+        if submitted_after:
+            start = submitted_after.strftime('%Y%m%d%H%M')
+            end = datetime.utcnow().strftime('%Y%m%d%H%M')
+            search_query += f' AND submittedDate:[{start} TO {end}]'
+        
         params = {
             'search_query': search_query,
-            'start': 0,
-            'max_results': max_results,
             'sortBy': 'submittedDate',
             'sortOrder': 'descending'
         }
         
+        print(f"[DEBUG] Searching arXiv with query: {search_query}")
+        papers = self._fetch_paginated(params, max_results, raise_errors)
+        print(f"[DEBUG] Found {len(papers)} entries")
+        
+        self._store(papers)
+        
+        return papers
+    
+    def _store(self, papers: List[Dict]):
+        """将获取到的论文写入本地论文库，写入失败不影响返回结果"""
+        if not self.paper_store or not papers:
+            return
+        
         try:
-            print(f"[DEBUG] Searching arXiv with query: {search_query}")
-            response = requests.get(
-                self.BASE_URL,
-                params=params,
-                timeout=self.timeout
-            )
-            print(f"[DEBUG] Response status: {response.status_code}")
-            response.raise_for_status()
-            
-            # 解析RSS feed
-            feed = feedparser.parse(response.content)
-            print(f"[DEBUG] Found {len(feed.entries)} entries")
-            
-            papers = []
-            for entry in feed.entries:
-                paper = self._parse_entry(entry)
-                papers.append(paper)
+            self.paper_store.upsert_papers(papers)
+        except Exception as e:
+            print(f"[ERROR] Failed to store papers: {e}")
+    
+    def _throttle(self):
+        """
+        等待直到允许发起下一次请求
+        
+        保证任意两次请求的发起时间至少相隔 request_interval 秒，
+        多个分页线程共享同一个节流器
+        """
+        with self._throttle_lock:
+            now = time.monotonic()
+            wait = self._next_request_at - now
+            self._next_request_at = max(now, self._next_request_at) + self.request_interval
+        
+        if wait > 0:
+            time.sleep(wait)
+    
+    def _defer(self, seconds: float):
+        """把下一次允许发起请求的时间推迟到至少 seconds 秒之后（所有线程共同遵守）"""
+        with self._throttle_lock:
+            self._next_request_at = max(self._next_request_at, time.monotonic() + seconds)
+    
+    @staticmethod
+    def _retry_after(response) -> Optional[float]:
+        """解析Retry-After响应头（秒数或HTTP日期），没有或无法解析时返回None"""
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+        
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    
+    def _fetch_feed(self, params: Dict) -> Tuple[List[Dict], Optional[int]]:
+        """
+        通过连接池请求并流式解析一个Atom feed，支持ETag/Last-Modified条件请求
+        
+        响应体不整体缓冲，而是边读取边交给iterparse逐条解析。
+        如果之前的响应带有校验信息，则附带If-None-Match/If-Modified-Since，
+        服务端返回304时直接复用本地保存的解析结果。
+        连接错误和429/5xx响应按指数退避重试，每次尝试都经过节流器；
+        响应带Retry-After时，所有线程都推迟到该时间之后再发起请求
+        
+        Args:
+            params: 查询参数
             
-            return papers
+        Returns:
+            (论文列表, feed声明的结果总数)
+            
+        Raises:
+            requests.exceptions.RequestException: 请求失败
+            ParseError: 响应不是合法的Atom feed
+        """
+        url = requests.Request('GET', self.base_url, params=params).prepare().url
+        
+        with self._conditional_lock:
+            cached = self._conditional_cache.get(url)
+        
+        headers = {}
+        if cached:
+            etag, last_modified, _, _ = cached
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+        
+        for attempt in range(self.max_retries + 1):
+            delay = self.retry_backoff * (2 ** attempt)
+            self._throttle()
+            try:
+                with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+                    if response.status_code not in self.RETRY_STATUSES or attempt == self.max_retries:
+                        return self._read_feed(url, response, cached)
+                    
+                    retry_after = self._retry_after(response)
+                    if retry_after is not None:
+                        self._defer(retry_after)
+                    print(f"[WARNING] arXiv returned HTTP {response.status_code}, retrying ({attempt + 1}/{self.max_retries})")
+            except self.RETRY_EXCEPTIONS as e:
+                if attempt == self.max_retries:
+                    raise
+                print(f"[WARNING] arXiv request failed ({e}), retrying ({attempt + 1}/{self.max_retries})")
+            
+            time.sleep(delay)
+    
+    def _read_feed(self, url: str, response, cached) -> Tuple[List[Dict], Optional[int]]:
+        """
+        处理一次请求的响应：304时复用本地保存的解析结果，否则流式解析并保存校验信息
+        
+        Raises:
+            requests.exceptions.RequestException: 响应状态码表示失败
+            ParseError: 响应不是合法的Atom feed
+        """
+        if response.status_code == 304 and cached:
+            with self._conditional_lock:
+                if url in self._conditional_cache:
+                    self._conditional_cache.move_to_end(url)
+            return list(cached[2]), cached[3]
+        
+        response.raise_for_status()
+        
+        # 透明解压gzip等编码后直接从socket流解析
+        response.raw.decode_content = True
+        feed_info = {}
+        papers = list(iter_papers(response.raw, feed_info))
+        total = feed_info.get('total_results')
+        
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        
+        if (etag or last_modified) and self.conditional_cache_size > 0:
+            with self._conditional_lock:
+                self._conditional_cache[url] = (etag, last_modified, tuple(papers), total)
+                self._conditional_cache.move_to_end(url)
+                while len(self._conditional_cache) > self.conditional_cache_size:
+                    self._conditional_cache.popitem(last=False)
+        
+        return papers, total
+    
+    def _fetch_page(self, params: Dict, start: int, size: int) -> Tuple[List[Dict], Optional[int]]:
+        """
+        抓取单个分页
+        
+        Args:
+            params: 基础查询参数（不含start/max_results）
+            start: 起始偏移
+            size: 本页论文数
+            
+        Returns:
+            (本页论文列表, 结果总数)
             
-        except requests.exceptions.RequestException as e:
+        Raises:
+            requests.exceptions.RequestException: 请求失败
+            ParseError: 响应解析失败
+        """
+        papers, total = self._fetch_feed({**params, 'start': start, 'max_results': size})
+        print(f"[DEBUG] Fetched page start={start}: {len(papers)} entries")
+        
+        return papers, total
+    
+    def _fetch_paginated(self, params: Dict, max_results: int, raise_errors: bool = False) -> List[Dict]:
+        """
+        分页抓取查询结果
+        
+        先抓取第一页以获得结果总数，再以有限并发抓取剩余分页，
+        按页序合并并按arxiv_id去重。某个分页失败时停止分页，只返回它之前连续的结果，
+        不返回中间缺页的结果（结果按提交时间排序，缺页会让调用方误以为那段时间没有论文）
+        
+        Args:
+            params: 基础查询参数（不含start/max_results）
+            max_results: 需要的论文总数
+            raise_errors: 为True时任一分页失败都抛出异常
+            
+        Returns:
+            论文列表
+        """
+        page_size = min(self.page_size, max_results)
+        
+        try:
+            first_page, total = self._fetch_page(params, 0, page_size)
+        except (requests.exceptions.RequestException, ParseError) as e:
             print(f"Error fetching from arXiv: {e}")
+            if raise_errors:
+                raise
             return []
+        
+        pages = [first_page]
+        
+        # 根据结果总数确定还需要抓取的分页
+        target = min(max_results, total) if total is not None else max_results
+        starts = list(range(page_size, target, page_size))
+        
+        if starts and len(first_page) >= page_size:
+            with ThreadPoolExecutor(max_workers=self.max_concurrent_pages) as executor:
+                futures = [
+                    executor.submit(
+                        self._fetch_page, params, start, min(page_size, target - start)
+                    )
+                    for start in starts
+                ]
+                
+                for start, future in zip(starts, futures):
+                    try:
+                        pages.append(future.result()[0])
+                    except (requests.exceptions.RequestException, ParseError) as e:
+                        print(f"Error fetching arXiv page start={start}, stopping pagination: {e}")
+                        for pending in futures:
+                            pending.cancel()
+                        if raise_errors:
+                            raise
+                        break
+        
+        # 按页序合并并去重
+        papers = []
+        seen = set()
+        for page in pages:
+            for paper in page:
+                if paper['arxiv_id'] in seen:
+                    continue
+                seen.add(paper['arxiv_id'])
+                papers.append(paper)
+        
+        return papers[:max_results]
     
-    def _parse_entry(self, entry) -> Dict:
+    def iter_pages(
+        self,
+        search_query: str,
+        page_size: Optional[int] = None,
+        sort_order: str = 'ascending'
+    ) -> Iterator[List[Dict]]:
         """
-        解析arXiv feed条目
+        按提交时间顺序逐页抓取查询的全部结果（顺序执行，供增量采集使用）
         
         Args:
-            entry: feedparser的entry对象
+            search_query: arXiv查询表达式
+            page_size: 每页论文数，默认 self.page_size
+            sort_order: 'ascending' 或 'descending'
             
-        Returns:
-            解析后的论文信息字典
-        """
-        # 提取作者
-        authors = [author.name for author in entry.get('authors', [])]
-        
-        # 处理论文ID（从arXiv URL中提取）
-        arxiv_id = entry.id.split('/abs/')[-1]
-        
-        # 发布时间
-        published = entry.get('published', '')
-        
-        paper = {
-            'arxiv_id': arxiv_id,
-            'title': entry.get('title', '').strip(),
-            'authors': authors,
-            'summary': entry.get('summary', '').strip(),
-            'published': published,
-            'url': entry.get('id', ''),
-            'pdf_url': f'https://arxiv.org/pdf/{arxiv_id}.pdf',
-            'categories': entry.get('arxiv_primary_category', {}).get('term', ''),
+        Yields:
+            每页的论文列表
+            
+        Raises:
+            requests.exceptions.RequestException, ParseError: 请求失败
+        """
+        page_size = page_size or self.page_size
+        params = {
+            'search_query': search_query,
+            'sortBy': 'submittedDate',
+            'sortOrder': sort_order
         }
         
-        return paper
+        start = 0
+        while True:
+            papers, total = self._fetch_page(params, start, page_size)
+            if not papers:
+                return
+            
+            yield papers
+            
+            start += page_size
+            if len(papers) < page_size or (total is not None and start >= total):
+                return
     
     def get_paper_by_id(self, arxiv_id: str) -> Optional[Dict]:
         """
@@ -128,20 +417,80 @@ class ArxivService:
         }
         
         try:
-            response = requests.get(
-                self.BASE_URL,
-                params=params,
-                timeout=self.timeout
-            )
-            response.raise_for_status()
-            
-            feed = feedparser.parse(response.content)
+            papers, _ = self._fetch_feed(params)
             
-            if feed.entries:
-                return self._parse_entry(feed.entries[0])
+            if papers:
+                self._store(papers[:1])
+                return papers[0]
             
             return None
             
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, ParseError) as e:
             print(f"Error fetching paper {arxiv_id}: {e}")
             return None
+    
+    @staticmethod
+    def _strip_prefix(arxiv_id: str) -> str:
+        """去掉 'arXiv:' 前缀，例如 arXiv:2301.12345v2 -> 2301.12345v2"""
+        arxiv_id = arxiv_id.strip()
+        if arxiv_id.lower().startswith('arxiv:'):
+            arxiv_id = arxiv_id[6:]
+        return arxiv_id
+    
+    @staticmethod
+    def _base_id(arxiv_id: str) -> str:
+        """去掉版本号，例如 2301.12345v2 -> 2301.12345"""
+        return re.sub(r'v\d+$', '', arxiv_id)
+    
+    def get_papers_by_ids(self, arxiv_ids: List[str]) -> Dict[str, Optional[Dict]]:
+        """
+        根据多个arXiv ID批量获取论文
+        
+        将ID按 id_batch_size 分块，每块一次 id_list 请求，各块以有限并发抓取。
+        不带版本号的ID匹配最新版本，带版本号的ID精确匹配。
+        
+        Args:
+            arxiv_ids: arXiv论文ID列表
+            
+        Returns:
+            请求ID -> 论文信息字典，未找到或抓取失败的ID对应None
+        """
+        requested = list(dict.fromkeys(i.strip() for i in arxiv_ids if i and i.strip()))
+        results = {arxiv_id: None for arxiv_id in requested}
+        
+        if not requested:
+            return results
+        
+        chunks = [
+            requested[i:i + self.id_batch_size]
+            for i in range(0, len(requested), self.id_batch_size)
+        ]
+        
+        def fetch_chunk(chunk):
+            id_list = ','.join(self._strip_prefix(i) for i in chunk)
+            papers, _ = self._fetch_feed({'id_list': id_list, 'max_results': len(chunk)})
+            return papers
+        
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_pages) as executor:
+            futures = [executor.submit(fetch_chunk, chunk) for chunk in chunks]
+            
+            for chunk, future in zip(chunks, futures):
+                try:
+                    papers = future.result()
+                except (requests.exceptions.RequestException, ParseError) as e:
+                    print(f"Error fetching papers {chunk[0]}..{chunk[-1]}: {e}")
+                    continue
+                
+                by_full_id = {p['arxiv_id']: p for p in papers}
+                by_base_id = {self._base_id(p['arxiv_id']): p for p in papers}
+                
+                for arxiv_id in chunk:
+                    key = self._strip_prefix(arxiv_id)
+                    paper = by_full_id.get(key)
+                    if paper is None and key == self._base_id(key):
+                        paper = by_base_id.get(key)
+                    results[arxiv_id] = paper
+        
+        self._store([p for p in results.values() if p])
+        
+        return results
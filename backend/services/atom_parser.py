@@ -0,0 +1,105 @@
+"""
+arXiv Atom 流式解析模块
+基于 iterparse 增量解析arXiv API返回的Atom feed，逐条产出论文记录
+"""
+from typing import Dict, Iterator, Optional
+from xml.etree.ElementTree import iterparse, ParseError
+
+ATOM_NS = '{http://www.w3.org/2005/Atom}'
+ARXIV_NS = '{http://arxiv.org/schemas/atom}'
+OPENSEARCH_NS = '{http://a9.com/-/spec/opensearch/1.1/}'
+
+_ENTRY = f'{ATOM_NS}entry'
+_ID = f'{ATOM_NS}id'
+_TITLE = f'{ATOM_NS}title'
+_SUMMARY = f'{ATOM_NS}summary'
+_PUBLISHED = f'{ATOM_NS}published'
+_AUTHOR = f'{ATOM_NS}author'
+_NAME = f'{ATOM_NS}name'
+_PRIMARY_CATEGORY = f'{ARXIV_NS}primary_category'
+_COMMENT = f'{ARXIV_NS}comment'
+_JOURNAL_REF = f'{ARXIV_NS}journal_ref'
+_TOTAL_RESULTS = f'{OPENSEARCH_NS}totalResults'
+
+
+def _text(elem, tag: str) -> str:
+    """读取子元素文本，缺失时返回空字符串"""
+    child = elem.find(tag)
+    if child is None or child.text is None:
+        return ''
+    return child.text.strip()
+
+
+def _build_paper(entry) -> Optional[Dict]:
+    """
+    将 <entry> 元素转换为论文字典
+
+    Args:
+        entry: Atom entry元素
+
+    Returns:
+        论文信息字典；arXiv错误条目返回None
+    """
+    url = _text(entry, _ID)
+    if '/abs/' not in url:
+        # arXiv以entry形式返回查询错误（id为 .../api/errors#...）
+        print(f"[WARNING] arXiv API error entry: {_text(entry, _SUMMARY)}")
+        return None
+
+    arxiv_id = url.split('/abs/')[-1]
+    primary_category = entry.find(_PRIMARY_CATEGORY)
+
+    return {
+        'arxiv_id': arxiv_id,
+        'title': _text(entry, _TITLE),
+        'authors': [
+            (author.findtext(_NAME) or '').strip()
+            for author in entry.iter(_AUTHOR)
+        ],
+        'summary': _text(entry, _SUMMARY),
+        'published': _text(entry, _PUBLISHED),
+        'url': url,
+        'pdf_url': f'https://arxiv.org/pdf/{arxiv_id}.pdf',
+        'categories': primary_category.get('term', '') if primary_category is not None else '',
+        'comment': _text(entry, _COMMENT) or None,
+        'journal_ref': _text(entry, _JOURNAL_REF) or None,
+    }
+
+
+def iter_papers(source, feed_info: Optional[Dict] = None) -> Iterator[Dict]:
+    """
+    增量解析Atom feed，逐条产出论文记录
+
+    每处理完一个entry即释放其元素，内存占用与单个entry大小相关，
+    而与feed总大小无关
+
+    Args:
+        source: 文件路径或可读的二进制流（如 response.raw）
+        feed_info: 可选字典，解析过程中写入 'total_results'
+
+    Yields:
+        论文信息字典
+
+    Raises:
+        ParseError: XML格式错误或流被截断
+    """
+    root = None
+
+    for event, elem in iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = elem
+            continue
+
+        if elem.tag == _ENTRY:
+            paper = _build_paper(elem)
+            # 释放已处理的entry，避免整棵树常驻内存
+            root.clear()
+            if paper is not None:
+                yield paper
+        elif elem.tag == _TOTAL_RESULTS and feed_info is not None:
+            try:
+                feed_info['total_results'] = int(elem.text)
+            except (TypeError, ValueError):
+                pass
+
@@ -0,0 +1,698 @@
+"""
+缓存存储后端模块
+提供每个键一个JSON文件的文件后端、基于单个SQLite文件的索引后端，
+以及放在它们前面的进程内内存层
+"""
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import struct
+import threading
+import time
+
+from services.cache_codec import CacheCodec
+
+
+# 命名空间版本表中记录失效代数的保留名，失效代数变化时各进程清空自己的内存层
+GENERATION_KEY = '*'
+
+
+def prefix_upper_bound(prefix: str) -> str:
+    """前缀范围查询的上界：key >= prefix AND key < 上界 即为以 prefix 开头的全部键"""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class FileCacheBackend:
+    """
+    文件缓存后端 - 每个键一个文件，文件头记录过期时间，文件修改时间即写入时间
+    
+    没有键和访问时间的索引：按前缀失效、过期清理、容量淘汰和统计都要遍历缓存目录中的全部文件，
+    耗时与条目数成正比（O(n)）。只适合小规模缓存或调试，生产环境使用SQLite后端
+    """
+    
+    name = 'file'
+    
+    # 文件头：MAGIC(2字节) + 过期时间戳(小端double)，其后为编解码器的输出。
+    # 没有文件头的旧文件按 修改时间 + expiry_seconds 过期
+    EXPIRY_MAGIC = b'\xacT'
+    EXPIRY_HEADER = struct.Struct('<2sd')
+    
+    def __init__(self, cache_dir: str, expiry_seconds: int, codec: Optional[CacheCodec] = None):
+        """
+        初始化文件后端
+        
+        Args:
+            cache_dir: 缓存目录
+            expiry_seconds: 缓存过期秒数
+            codec: 数据编解码器
+        """
+        self.cache_dir = cache_dir
+        self.expiry_seconds = expiry_seconds
+        self.codec = codec or CacheCodec()
+        self.tags_dir = os.path.join(cache_dir, '_tags')
+        self.namespaces_path = os.path.join(cache_dir, '_namespaces.meta')
+        os.makedirs(cache_dir, exist_ok=True)
+    
+    def _get_cache_path(self, key: str) -> str:
+        """获取缓存文件路径"""
+        # 将key转换为安全的文件名
+        safe_key = key.replace('/', '_').replace('\\', '_')
+        return os.path.join(self.cache_dir, f'{safe_key}.json')
+    
+    def _split_header(self, content: bytes, mtime: float) -> Tuple[float, bytes]:
+        """拆出文件头，返回 (过期时间戳, 编解码器数据)"""
+        if content.startswith(self.EXPIRY_MAGIC) and len(content) >= self.EXPIRY_HEADER.size:
+            _, expires_at = self.EXPIRY_HEADER.unpack_from(content)
+            return expires_at, content[self.EXPIRY_HEADER.size:]
+        return mtime + self.expiry_seconds, content
+    
+    def _read_expires_at(self, path: str, mtime: float) -> float:
+        """只读取文件头中的过期时间戳"""
+        with open(path, 'rb') as f:
+            return self._split_header(f.read(self.EXPIRY_HEADER.size), mtime)[0]
+    
+    def get(self, key: str) -> Optional[Tuple[Dict, int, float, float]]:
+        """返回 (数据, 未压缩的字节数, 写入时间戳, 过期时间戳)，不存在或已过期返回None"""
+        cache_path = self._get_cache_path(key)
+        
+        try:
+            stat = os.stat(cache_path)
+            with open(cache_path, 'rb') as f:
+                content = f.read()
+        except FileNotFoundError:
+            return None
+        
+        # 检查缓存文件是否过期
+        expires_at, content = self._split_header(content, stat.st_mtime)
+        if expires_at <= time.time():
+            # 缓存已过期，删除文件
+            try:
+                os.remove(cache_path)
+            except FileNotFoundError:
+                pass
+            return None
+        
+        # 解码缓存数据（兼容旧版的纯JSON文件）
+        data, raw_size = self.codec.decode_sized(content)
+        return data, raw_size, stat.st_mtime, expires_at
+    
+    def get_created_at(self, key: str) -> Optional[float]:
+        """只读取条目的写入时间戳（文件修改时间）和文件头，不存在或已过期返回None"""
+        cache_path = self._get_cache_path(key)
+        try:
+            mtime = os.stat(cache_path).st_mtime
+            expires_at = self._read_expires_at(cache_path, mtime)
+        except FileNotFoundError:
+            return None
+        return mtime if expires_at > time.time() else None
+    
+    def _get_tag_path(self, tag: str) -> str:
+        return os.path.join(self.tags_dir, hashlib.sha256(tag.encode('utf-8')).hexdigest())
+    
+    def set(
+        self, key: str, data: Dict, ttl: Optional[int] = None, tags: Iterable[str] = ()
+    ) -> Tuple[int, float, float]:
+        """写入数据，返回 (未压缩的字节数, 写入时间戳, 过期时间戳)"""
+        content, raw_size = self.codec.encode_sized(data)
+        expires_at = time.time() + (ttl if ttl is not None else self.expiry_seconds)
+        cache_path = self._get_cache_path(key)
+        with open(cache_path, 'wb') as f:
+            f.write(self.EXPIRY_HEADER.pack(self.EXPIRY_MAGIC, expires_at))
+            f.write(content)
+        # 写入时间戳取文件修改时间，与 get()/get_created_at() 返回的一致
+        created_at = os.stat(cache_path).st_mtime
+        
+        # 每个标签一个索引文件，逐行记录打过该标签的键（可能包含已删除的键，失效时忽略即可）
+        if tags:
+            os.makedirs(self.tags_dir, exist_ok=True)
+            for tag in tags:
+                with open(self._get_tag_path(tag), 'a', encoding='utf-8') as f:
+                    f.write(key + '\n')
+        
+        return raw_size, created_at, expires_at
+    
+    def delete(self, key: str):
+        cache_path = self._get_cache_path(key)
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+    
+    def clear(self):
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith('.json'):
+                os.remove(os.path.join(self.cache_dir, filename))
+        shutil.rmtree(self.tags_dir, ignore_errors=True)
+    
+    def delete_tag(self, tag: str) -> List[str]:
+        """
+        删除打了该标签的全部条目，返回实际删除的键
+        
+        标签索引文件中可能记录着已被删除（如按前缀失效）的键，这些键不计入结果，与SQLite后端一致
+        """
+        tag_path = self._get_tag_path(tag)
+        try:
+            with open(tag_path, 'r', encoding='utf-8') as f:
+                keys = list(dict.fromkeys(line.rstrip('\n') for line in f if line.strip()))
+        except FileNotFoundError:
+            return []
+        
+        deleted = []
+        for key in keys:
+            try:
+                os.remove(self._get_cache_path(key))
+            except FileNotFoundError:
+                continue
+            deleted.append(key)
+        os.remove(tag_path)
+        return deleted
+    
+    def delete_prefix(self, prefix: str, exclude: Optional[str] = None, limit: Optional[int] = None) -> int:
+        """
+        删除以 prefix 开头（且不以 exclude 开头）的条目
+        
+        文件后端只能遍历文件名（不读取文件内容），SQLite后端为主键范围删除
+        """
+        safe_prefix = prefix.replace('/', '_').replace('\\', '_')
+        safe_exclude = exclude.replace('/', '_').replace('\\', '_') if exclude else None
+        removed = 0
+        for entry in os.scandir(self.cache_dir):
+            if limit is not None and removed >= limit:
+                break
+            name = entry.name
+            if not name.endswith('.json') or not name.startswith(safe_prefix):
+                continue
+            if safe_exclude and name.startswith(safe_exclude):
+                continue
+            try:
+                os.remove(entry.path)
+                removed += 1
+            except FileNotFoundError:
+                continue
+        return removed
+    
+    def get_namespace_versions(self) -> Dict[str, int]:
+        try:
+            with open(self.namespaces_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+    
+    def bump_namespace(self, namespace: str) -> int:
+        """命名空间版本加一并返回新版本（文件后端不保证多进程同时递增的原子性）"""
+        versions = self.get_namespace_versions()
+        versions[namespace] = versions.get(namespace, 0) + 1
+        tmp_path = self.namespaces_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(versions, f)
+        os.replace(tmp_path, self.namespaces_path)
+        return versions[namespace]
+    
+    def purge_expired(self, limit: Optional[int] = None) -> int:
+        """删除已过期的条目（每个文件都要读取文件头）"""
+        removed = 0
+        now = time.time()
+        for entry in os.scandir(self.cache_dir):
+            if limit is not None and removed >= limit:
+                break
+            if not entry.name.endswith('.json'):
+                continue
+            try:
+                if self._read_expires_at(entry.path, entry.stat().st_mtime) <= now:
+                    os.remove(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                continue
+        return removed
+    
+    def record_access(self, accesses: Dict[str, Tuple[float, int]]):
+        """
+        记录访问时间，供容量淘汰使用
+        
+        文件后端把最近访问时间写入文件的atime（mtime用于判断过期，保持不变），不记录访问次数
+        """
+        for key, (accessed_at, _) in accesses.items():
+            cache_path = self._get_cache_path(key)
+            try:
+                # 纳秒精度保留mtime：mtime是条目的写入时间，内存层用它判断条目是否被其他进程改写
+                os.utime(cache_path, ns=(int(accessed_at * 1e9), os.stat(cache_path).st_mtime_ns))
+            except FileNotFoundError:
+                continue
+    
+    def evict(self, max_bytes: int, policy: str = 'lru', batch_size: int = 500) -> List[Tuple[str, int]]:
+        """
+        按最近访问时间淘汰条目直到总大小不超过 max_bytes
+        
+        文件后端没有访问次数，policy 为 lfu 时同样按LRU淘汰
+        
+        Returns:
+            被淘汰的 (键, 字节数) 列表
+        """
+        entries = []
+        total_size = 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.json'):
+                stat = entry.stat()
+                entries.append((stat.st_atime, entry.name[:-len('.json')], entry.path, stat.st_size))
+                total_size += stat.st_size
+        
+        evicted = []
+        if total_size <= max_bytes:
+            return evicted
+        
+        entries.sort()
+        for _, key, path, size in entries:
+            if total_size <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            total_size -= size
+            evicted.append((key, size))
+        
+        return evicted
+    
+    def stats(self) -> Dict:
+        total_size = 0
+        file_count = 0
+        
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.json'):
+                file_count += 1
+                total_size += entry.stat().st_size
+        
+        return {'entry_count': file_count, 'total_size': total_size}
+
+
+class SQLiteCacheBackend:
+    """
+    SQLite缓存后端 - 所有键存放在单个WAL模式的数据库文件中
+    
+    过期时间单独成列并建索引，过期清理是一次索引范围删除；
+    条目数和总字节数由触发器维护在统计表中，统计查询为O(1)；
+    最近访问时间和访问次数用于按LRU/LFU策略淘汰；
+    标签单独成表并按标签建索引，按标签或键前缀失效都是索引查询，不需要扫描全表
+    """
+    
+    name = 'sqlite'
+    
+    SCHEMA = [
+        """CREATE TABLE IF NOT EXISTS cache_entries (
+            key TEXT PRIMARY KEY,
+            value BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            expires_at REAL NOT NULL,
+            accessed_at REAL NOT NULL DEFAULT 0,
+            hits INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID""",
+        "CREATE INDEX IF NOT EXISTS ix_cache_entries_expires_at ON cache_entries (expires_at)",
+        "CREATE INDEX IF NOT EXISTS ix_cache_entries_accessed_at ON cache_entries (accessed_at)",
+        "CREATE INDEX IF NOT EXISTS ix_cache_entries_hits ON cache_entries (hits, accessed_at)",
+        """CREATE TABLE IF NOT EXISTS cache_stats (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            entry_count INTEGER NOT NULL,
+            total_size INTEGER NOT NULL
+        )""",
+        "INSERT OR IGNORE INTO cache_stats (id, entry_count, total_size) VALUES (0, 0, 0)",
+        """CREATE TRIGGER IF NOT EXISTS cache_entries_ai AFTER INSERT ON cache_entries BEGIN
+            UPDATE cache_stats SET entry_count = entry_count + 1, total_size = total_size + new.size WHERE id = 0;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS cache_entries_ad AFTER DELETE ON cache_entries BEGIN
+            UPDATE cache_stats SET entry_count = entry_count - 1, total_size = total_size - old.size WHERE id = 0;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS cache_entries_au AFTER UPDATE OF size ON cache_entries BEGIN
+            UPDATE cache_stats SET total_size = total_size - old.size + new.size WHERE id = 0;
+        END""",
+        """CREATE TABLE IF NOT EXISTS cache_tags (
+            key TEXT NOT NULL,
+            tag TEXT NOT NULL,
+            PRIMARY KEY (key, tag)
+        ) WITHOUT ROWID""",
+        "CREATE INDEX IF NOT EXISTS ix_cache_tags_tag ON cache_tags (tag)",
+        """CREATE TRIGGER IF NOT EXISTS cache_entries_tags_ad AFTER DELETE ON cache_entries BEGIN
+            DELETE FROM cache_tags WHERE key = old.key;
+        END""",
+        """CREATE TABLE IF NOT EXISTS cache_namespaces (
+            namespace TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        )""",
+    ]
+    
+    # 旧版数据库缺少的列
+    MIGRATIONS = {
+        'accessed_at': 'ALTER TABLE cache_entries ADD COLUMN accessed_at REAL NOT NULL DEFAULT 0',
+        'hits': 'ALTER TABLE cache_entries ADD COLUMN hits INTEGER NOT NULL DEFAULT 0',
+    }
+    
+    # 淘汰顺序：LRU按最近访问时间，LFU按访问次数（相同时按最近访问时间）
+    EVICTION_ORDER = {
+        'lru': 'accessed_at',
+        'lfu': 'hits, accessed_at',
+    }
+    
+    def __init__(self, db_path: str, expiry_seconds: int, codec: Optional[CacheCodec] = None):
+        """
+        初始化SQLite后端
+        
+        Args:
+            db_path: 数据库文件路径
+            expiry_seconds: 默认缓存过期秒数
+            codec: 数据编解码器
+        """
+        self.db_path = db_path
+        self.expiry_seconds = expiry_seconds
+        self.codec = codec or CacheCodec()
+        self._local = threading.local()
+        
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        conn = self._conn()
+        with conn:
+            conn.execute(self.SCHEMA[0])
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(cache_entries)')}
+            for column, statement in self.MIGRATIONS.items():
+                if column not in columns:
+                    conn.execute(statement)
+            for statement in self.SCHEMA[1:]:
+                conn.execute(statement)
+    
+    def _conn(self) -> sqlite3.Connection:
+        """每个线程一个连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+    
+    def get(self, key: str) -> Optional[Tuple[Dict, int, float, float]]:
+        """返回 (数据, 未压缩的字节数, 写入时间戳, 过期时间戳)，不存在或已过期返回None"""
+        conn = self._conn()
+        row = conn.execute(
+            'SELECT value, size, created_at, expires_at FROM cache_entries WHERE key = ?', (key,)
+        ).fetchone()
+        
+        if row is None:
+            return None
+        
+        value, size, created_at, expires_at = row
+        if expires_at <= time.time():
+            with conn:
+                conn.execute('DELETE FROM cache_entries WHERE key = ? AND expires_at <= ?', (key, time.time()))
+            return None
+        
+        data, raw_size = self.codec.decode_sized(value)
+        return data, raw_size, created_at, expires_at
+    
+    def get_created_at(self, key: str) -> Optional[float]:
+        """只读取条目的写入时间戳（主键查询，不读取数据列），不存在或已过期返回None"""
+        row = self._conn().execute(
+            'SELECT created_at FROM cache_entries WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+    
+    def set(
+        self, key: str, data: Dict, ttl: Optional[int] = None, tags: Iterable[str] = ()
+    ) -> Tuple[int, float, float]:
+        """
+        写入数据，返回 (未压缩的字节数, 写入时间戳, 过期时间戳)
+        
+        size 列记录压缩后的大小（磁盘占用，用于容量淘汰），返回值用于内存层的容量计算
+        """
+        value, raw_size = self.codec.encode_sized(data)
+        now = time.time()
+        expires_at = now + (ttl if ttl is not None else self.expiry_seconds)
+        
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                """INSERT INTO cache_entries (key, value, size, created_at, expires_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    value = excluded.value,
+                    size = excluded.size,
+                    created_at = excluded.created_at,
+                    expires_at = excluded.expires_at,
+                    accessed_at = excluded.accessed_at""",
+                (key, value, len(value), now, expires_at, now)
+            )
+            # 覆盖写入时替换原有标签
+            conn.execute('DELETE FROM cache_tags WHERE key = ?', (key,))
+            if tags:
+                conn.executemany(
+                    'INSERT OR IGNORE INTO cache_tags (key, tag) VALUES (?, ?)',
+                    [(key, tag) for tag in tags]
+                )
+        
+        return raw_size, now, expires_at
+    
+    def delete(self, key: str):
+        conn = self._conn()
+        with conn:
+            conn.execute('DELETE FROM cache_entries WHERE key = ?', (key,))
+    
+    def clear(self):
+        conn = self._conn()
+        with conn:
+            conn.execute('DELETE FROM cache_entries')
+    
+    def purge_expired(self, limit: Optional[int] = None) -> int:
+        conn = self._conn()
+        with conn:
+            if limit is None:
+                cursor = conn.execute('DELETE FROM cache_entries WHERE expires_at <= ?', (time.time(),))
+            else:
+                cursor = conn.execute(
+                    """DELETE FROM cache_entries WHERE key IN (
+                        SELECT key FROM cache_entries WHERE expires_at <= ? LIMIT ?
+                    )""",
+                    (time.time(), limit)
+                )
+        return cursor.rowcount
+    
+    def delete_tag(self, tag: str) -> List[str]:
+        """删除打了该标签的全部条目，返回这些键"""
+        conn = self._conn()
+        with conn:
+            keys = [row[0] for row in conn.execute('SELECT key FROM cache_tags WHERE tag = ?', (tag,))]
+            conn.execute(
+                'DELETE FROM cache_entries WHERE key IN (SELECT key FROM cache_tags WHERE tag = ?)', (tag,)
+            )
+        return keys
+    
+    def delete_prefix(self, prefix: str, exclude: Optional[str] = None, limit: Optional[int] = None) -> int:
+        """
+        删除以 prefix 开头（且不以 exclude 开头）的条目，为主键上的范围删除
+        
+        Args:
+            prefix: 键前缀
+            exclude: 需要保留的更长前缀（如当前版本的命名空间前缀）
+            limit: 最多删除的条目数，None表示全部
+            
+        Returns:
+            删除的条目数
+        """
+        conditions = 'key >= ? AND key < ?'
+        params = [prefix, prefix_upper_bound(prefix)]
+        if exclude:
+            conditions += ' AND NOT (key >= ? AND key < ?)'
+            params += [exclude, prefix_upper_bound(exclude)]
+        
+        conn = self._conn()
+        with conn:
+            if limit is None:
+                cursor = conn.execute(f'DELETE FROM cache_entries WHERE {conditions}', params)
+            else:
+                cursor = conn.execute(
+                    f'DELETE FROM cache_entries WHERE key IN (SELECT key FROM cache_entries WHERE {conditions} LIMIT ?)',
+                    params + [limit]
+                )
+        return cursor.rowcount
+    
+    def get_namespace_versions(self) -> Dict[str, int]:
+        return dict(self._conn().execute('SELECT namespace, version FROM cache_namespaces'))
+    
+    def bump_namespace(self, namespace: str) -> int:
+        """命名空间版本加一并返回新版本"""
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                """INSERT INTO cache_namespaces (namespace, version) VALUES (?, 1)
+                ON CONFLICT(namespace) DO UPDATE SET version = version + 1""",
+                (namespace,)
+            )
+            return conn.execute(
+                'SELECT version FROM cache_namespaces WHERE namespace = ?', (namespace,)
+            ).fetchone()[0]
+    
+    def record_access(self, accesses: Dict[str, Tuple[float, int]]):
+        """
+        批量记录访问
+        
+        Args:
+            accesses: 键 -> (最近访问时间戳, 新增访问次数)
+        """
+        if not accesses:
+            return
+        
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                """UPDATE cache_entries SET accessed_at = MAX(accessed_at, ?), hits = hits + ?
+                WHERE key = ?""",
+                [(accessed_at, hits, key) for key, (accessed_at, hits) in accesses.items()]
+            )
+    
+    def evict(self, max_bytes: int, policy: str = 'lru', batch_size: int = 500) -> List[Tuple[str, int]]:
+        """
+        按淘汰策略分批删除条目直到总大小不超过 max_bytes
+        
+        每批是一个短事务，沿访问时间/次数索引顺序读取，不需要全表排序
+        
+        Args:
+            max_bytes: 容量上限（字节）
+            policy: 'lru' 或 'lfu'
+            batch_size: 每批最多删除的条目数
+            
+        Returns:
+            被淘汰的 (键, 字节数) 列表
+        """
+        order = self.EVICTION_ORDER.get(policy)
+        if order is None:
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        
+        conn = self._conn()
+        evicted = []
+        
+        while True:
+            total_size = self.stats()['total_size']
+            if total_size <= max_bytes:
+                break
+            
+            victims = []
+            excess = total_size - max_bytes
+            for key, size in conn.execute(
+                f'SELECT key, size FROM cache_entries ORDER BY {order} LIMIT ?', (batch_size,)
+            ):
+                victims.append((key, size))
+                excess -= size
+                if excess <= 0:
+                    break
+            
+            if not victims:
+                break
+            
+            with conn:
+                conn.executemany('DELETE FROM cache_entries WHERE key = ?', [(key,) for key, _ in victims])
+            evicted.extend(victims)
+        
+        return evicted
+    
+    def stats(self) -> Dict:
+        entry_count, total_size = self._conn().execute(
+            'SELECT entry_count, total_size FROM cache_stats WHERE id = 0'
+        ).fetchone()
+        return {'entry_count': entry_count, 'total_size': total_size}
+
+
+class MemoryCacheTier:
+    """
+    进程内LRU内存层 - 按字节数（序列化后的大小）限制容量
+    
+    保存已解码的对象，命中时无需读盘和反序列化；
+    返回的对象与缓存共享，调用方不应修改。
+    每个条目记录最近一次与存储后端核对的时间，由 CacheService 决定何时重新核对
+    """
+    
+    def __init__(self, max_bytes: int):
+        """
+        初始化内存层
+        
+        Args:
+            max_bytes: 容量上限（字节）
+        """
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries = OrderedDict()  # key -> (数据, 字节数, 写入时间戳, 过期时间戳, 核对时间 monotonic)
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[Tuple[Dict, float, float]]:
+        """返回 (数据, 写入时间戳, 最近核对时间)，不存在或已过期返回None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            
+            if entry[3] <= time.time():
+                self._remove(key)
+                return None
+            
+            self._entries.move_to_end(key)
+            return entry[0], entry[2], entry[4]
+    
+    def set(self, key: str, data: Dict, size: int, created_at: float, expires_at: float):
+        # 单个条目超过容量上限时不进入内存层
+        if size > self.max_bytes:
+            self.delete(key)
+            return
+        
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (data, size, created_at, expires_at, time.monotonic())
+            self.current_bytes += size
+            
+            # 淘汰最久未使用的条目直到满足容量
+            while self.current_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+    
+    def mark_validated(self, key: str, created_at: float):
+        """条目已与存储后端核对一致（写入时间戳未变）时更新核对时间"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] == created_at:
+                self._entries[key] = entry[:4] + (time.monotonic(),)
+    
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry[1]
+    
+    def delete(self, key: str):
+        with self._lock:
+            self._remove(key)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+    
+    def delete_prefix(self, prefix: str) -> int:
+        with self._lock:
+            matched = [key for key in self._entries if key.startswith(prefix)]
+            for key in matched:
+                self._remove(key)
+        return len(matched)
+    
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [key for key, entry in self._entries.items() if entry[3] <= now]
+            for key in expired:
+                self._remove(key)
+        return len(expired)
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'entry_count': len(self._entries),
+                'total_size': self.current_bytes,
+                'max_size': self.max_bytes
+            }
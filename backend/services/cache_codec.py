@@ -0,0 +1,127 @@
+"""
+缓存数据编码模块
+将缓存数据编码为紧凑的压缩格式，并兼容读取旧版的JSON格式
+"""
+from typing import Any, Tuple
+import json
+import lzma
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class CacheCodec:
+    """
+    缓存数据编解码器
+    
+    编码格式: MAGIC(2字节) + 格式版本(1字节) + 压缩算法ID(1字节) + 压缩后的紧凑JSON。
+    不以MAGIC开头的数据视为旧版的纯JSON文本，解码时透明兼容
+    """
+    
+    MAGIC = b'\xacC'
+    VERSION = 1
+    
+    # 压缩算法ID一经使用不可更改，否则无法解码已有数据
+    CODEC_IDS = {
+        'none': 0,
+        'zlib': 1,
+        'lzma': 2,
+        'zstd': 3,
+    }
+    
+    def __init__(self, codec: str = 'zlib', level: int = 6):
+        """
+        初始化编解码器
+        
+        Args:
+            codec: 压缩算法，'zlib'、'lzma'、'zstd'（需安装zstandard）或 'none'
+            level: 压缩级别
+        """
+        codec = codec.lower()
+        if codec not in self.CODEC_IDS:
+            raise ValueError(f"Unknown cache codec: {codec}")
+        if codec == 'zstd' and zstandard is None:
+            print("[WARNING] zstandard not installed, falling back to zlib cache codec")
+            codec = 'zlib'
+            # zstd 的级别范围（1-22）大于 zlib（0-9），超出范围时 zlib.compress 会报错
+            level = min(max(level, 0), 9)
+        
+        self.codec = codec
+        self.level = level
+        self._header = self.MAGIC + bytes([self.VERSION, self.CODEC_IDS[codec]])
+    
+    def _compress(self, codec_id: int, raw: bytes) -> bytes:
+        if codec_id == 1:
+            return zlib.compress(raw, self.level)
+        if codec_id == 2:
+            return lzma.compress(raw, preset=min(self.level, 9))
+        if codec_id == 3:
+            return zstandard.ZstdCompressor(level=self.level).compress(raw)
+        return raw
+    
+    @staticmethod
+    def _decompress(codec_id: int, payload: bytes) -> bytes:
+        if codec_id == 0:
+            return payload
+        if codec_id == 1:
+            return zlib.decompress(payload)
+        if codec_id == 2:
+            return lzma.decompress(payload)
+        if codec_id == 3:
+            if zstandard is None:
+                raise ValueError('zstd-encoded cache entry but zstandard is not installed')
+            return zstandard.ZstdDecompressor().decompress(payload)
+        raise ValueError(f'Unknown cache codec id: {codec_id}')
+    
+    def encode(self, data: Any) -> bytes:
+        """将数据编码为紧凑的压缩字节串"""
+        return self.encode_sized(data)[0]
+    
+    def encode_sized(self, data: Any) -> Tuple[bytes, int]:
+        """
+        编码数据，同时返回未压缩JSON的字节数
+        
+        压缩后的大小只反映磁盘占用；内存层保存解码后的对象，按未压缩的大小计算占用
+        
+        Returns:
+            (编码结果, 未压缩JSON的字节数)
+        """
+        raw = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        return self._header + self._compress(self._header[3], raw), len(raw)
+    
+    def decode(self, blob) -> Any:
+        """
+        解码缓存数据
+        
+        Args:
+            blob: encode() 的结果，或旧版的JSON文本/字节
+        
+        Returns:
+            原始数据
+        """
+        return self.decode_sized(blob)[0]
+    
+    def decode_sized(self, blob) -> Tuple[Any, int]:
+        """
+        解码缓存数据，同时返回未压缩JSON的字节数
+        
+        Returns:
+            (原始数据, 未压缩JSON的字节数)
+        """
+        if isinstance(blob, str):
+            blob = blob.encode('utf-8')
+        
+        blob = bytes(blob)
+        if not blob.startswith(self.MAGIC):
+            # 旧版条目：未压缩的JSON
+            raw = blob
+        else:
+            version, codec_id = blob[2], blob[3]
+            if version != self.VERSION:
+                raise ValueError(f'Unsupported cache format version: {version}')
+            raw = self._decompress(codec_id, blob[4:])
+        
+        return json.loads(raw.decode('utf-8')), len(raw)
@@ -0,0 +1,179 @@
+"""
+缓存指标模块
+在内存中按键的命名空间统计命中、未命中、陈旧命中、淘汰和写入失败次数，
+以及读写耗时的分桶直方图，可导出为 Prometheus 文本格式
+"""
+from typing import Dict, List
+import threading
+
+
+# 耗时直方图的桶上界（毫秒），最后一个桶为 +Inf
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+COUNTERS = ('hits', 'memory_hits', 'misses', 'stale_hits', 'sets', 'write_failures', 'evictions')
+
+
+def key_namespace(key: str) -> str:
+    """缓存键的命名空间，即第一个冒号之前的部分，如 'search'"""
+    namespace, sep, _ = key.partition(':')
+    return namespace if sep else 'other'
+
+
+class LatencyHistogram:
+    """固定分桶的耗时直方图（非线程安全，由 CacheMetrics 加锁）"""
+    
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+    
+    def observe(self, ms: float):
+        index = len(LATENCY_BUCKETS_MS)
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if ms <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum_ms += ms
+    
+    def quantile(self, q: float):
+        """按桶上界估计分位数（毫秒），落在 +Inf 桶时返回最大的有限上界"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return LATENCY_BUCKETS_MS[min(i, len(LATENCY_BUCKETS_MS) - 1)]
+        return LATENCY_BUCKETS_MS[-1]
+    
+    def snapshot(self) -> Dict:
+        return {
+            'count': self.count,
+            'avg_ms': round(self.sum_ms / self.count, 3) if self.count else None,
+            'p50_ms': self.quantile(0.5),
+            'p95_ms': self.quantile(0.95),
+            'p99_ms': self.quantile(0.99),
+        }
+
+
+class _NamespaceMetrics:
+    def __init__(self):
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.get_latency = LatencyHistogram()
+        self.set_latency = LatencyHistogram()
+
+
+class CacheMetrics:
+    """
+    缓存指标收集器
+    
+    每次记录只在一把锁内做几次整数加法，开销可以忽略；
+    指标只保存在当前进程内存中，进程重启后清零
+    """
+    
+    def __init__(self):
+        self._namespaces: Dict[str, _NamespaceMetrics] = {}
+        self._lock = threading.Lock()
+        self.expired = 0
+    
+    def _ns(self, key: str) -> _NamespaceMetrics:
+        namespace = key_namespace(key)
+        metrics = self._namespaces.get(namespace)
+        if metrics is None:
+            metrics = self._namespaces[namespace] = _NamespaceMetrics()
+        return metrics
+    
+    def record_get(self, key: str, hit: bool, elapsed_ms: float, memory: bool = False):
+        with self._lock:
+            metrics = self._ns(key)
+            if hit:
+                metrics.counters['hits'] += 1
+                if memory:
+                    metrics.counters['memory_hits'] += 1
+            else:
+                metrics.counters['misses'] += 1
+            metrics.get_latency.observe(elapsed_ms)
+    
+    def record_stale_hit(self, key: str):
+        with self._lock:
+            self._ns(key).counters['stale_hits'] += 1
+    
+    def record_set(self, key: str, ok: bool, elapsed_ms: float):
+        with self._lock:
+            metrics = self._ns(key)
+            metrics.counters['sets' if ok else 'write_failures'] += 1
+            metrics.set_latency.observe(elapsed_ms)
+    
+    def record_evictions(self, keys: List[str]):
+        with self._lock:
+            for key in keys:
+                self._ns(key).counters['evictions'] += 1
+    
+    def record_expired(self, count: int):
+        with self._lock:
+            self.expired += count
+    
+    def reset(self):
+        with self._lock:
+            self._namespaces.clear()
+            self.expired = 0
+    
+    @staticmethod
+    def _summarize(counters: Dict) -> Dict:
+        lookups = counters['hits'] + counters['misses']
+        summary = dict(counters)
+        summary['hit_ratio'] = round(counters['hits'] / lookups, 4) if lookups else None
+        summary['stale_ratio'] = round(counters['stale_hits'] / counters['hits'], 4) if counters['hits'] else None
+        return summary
+    
+    def snapshot(self) -> Dict:
+        """
+        获取指标快照
+        
+        Returns:
+            {'total': 汇总指标, 'expired': 清理删除的过期条目数, 'namespaces': {命名空间: 指标}}
+        """
+        with self._lock:
+            totals = dict.fromkeys(COUNTERS, 0)
+            namespaces = {}
+            for namespace, metrics in sorted(self._namespaces.items()):
+                for name, value in metrics.counters.items():
+                    totals[name] += value
+                namespaces[namespace] = self._summarize(metrics.counters)
+                namespaces[namespace]['get_latency'] = metrics.get_latency.snapshot()
+                namespaces[namespace]['set_latency'] = metrics.set_latency.snapshot()
+            
+            return {
+                'total': self._summarize(totals),
+                'expired': self.expired,
+                'namespaces': namespaces,
+            }
+    
+    def export_prometheus(self, prefix: str = 'arxiv_tracker_cache') -> str:
+        """导出为 Prometheus 文本格式"""
+        lines = []
+        with self._lock:
+            for name in COUNTERS:
+                lines.append(f'# TYPE {prefix}_{name}_total counter')
+                for namespace, metrics in sorted(self._namespaces.items()):
+                    lines.append(f'{prefix}_{name}_total{{namespace="{namespace}"}} {metrics.counters[name]}')
+            
+            lines.append(f'# TYPE {prefix}_expired_total counter')
+            lines.append(f'{prefix}_expired_total {self.expired}')
+            
+            for operation in ('get', 'set'):
+                metric = f'{prefix}_{operation}_latency_ms'
+                lines.append(f'# TYPE {metric} histogram')
+                for namespace, metrics in sorted(self._namespaces.items()):
+                    histogram = getattr(metrics, f'{operation}_latency')
+                    cumulative = 0
+                    for bound, bucket_count in zip(LATENCY_BUCKETS_MS + ('+Inf',), histogram.counts):
+                        cumulative += bucket_count
+                        lines.append(f'{metric}_bucket{{namespace="{namespace}",le="{bound}"}} {cumulative}')
+                    lines.append(f'{metric}_sum{{namespace="{namespace}"}} {round(histogram.sum_ms, 3)}')
+                    lines.append(f'{metric}_count{{namespace="{namespace}"}} {histogram.count}')
+        
+        return '\n'.join(lines) + '\n'
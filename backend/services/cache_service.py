@@ -2,92 +2,293 @@
 缓存服务模块
 用于缓存论文数据，减少API调用
 """
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
-import json
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlencode
+import hashlib
 import os
+import threading
+import time
+
+from services.cache_backends import GENERATION_KEY, FileCacheBackend, MemoryCacheTier, SQLiteCacheBackend
+from services.cache_codec import CacheCodec
+from services.cache_metrics import CacheMetrics
+
+
+# 规范化后的键超过该长度时对参数部分取哈希，避免文件名/主键过长
+MAX_KEY_LENGTH = 200
+
+
+def make_cache_key(namespace: str, **params) -> str:
+    """
+    由规范化的查询参数生成缓存键
+    
+    字符串参数去除首尾空白、合并连续空白并转为小写，参数按名称排序，
+    因此大小写、空白或参数顺序不同的同一查询得到相同的键
+    
+    Args:
+        namespace: 键的命名空间，如 'search'
+        **params: 影响结果的全部参数
+        
+    Returns:
+        形如 'search:days_back=1095&max_results=100&query=machine+learning' 的缓存键
+    """
+    normalized = {}
+    for name, value in params.items():
+        if value is None:
+            continue
+        if isinstance(value, str):
+            value = ' '.join(value.split()).lower()
+        normalized[name] = value
+    
+    key = f'{namespace}:{urlencode(sorted(normalized.items()))}'
+    
+    if len(key) > MAX_KEY_LENGTH:
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        key = f'{namespace}:sha256={digest}'
+    
+    return key
+
 
 class CacheService:
-    """论文数据缓存服务"""
+    """
+    论文数据缓存服务
+    
+    键的命名空间（第一个冒号之前的部分）带有版本号：版本为0时存储键与传入的键相同，
+    版本递增后存储键变为 'search:v1:...'，旧版本的条目立即不可见，由 sweep() 逐步回收
+    """
     
-    def __init__(self, cache_dir: str = './cache', expiry_days: int = 30):
+    def __init__(
+        self,
+        cache_dir: str = './cache',
+        expiry_days: int = 30,
+        backend: str = 'sqlite',
+        memory_max_mb: float = 64,
+        codec: str = 'zlib',
+        codec_level: int = 6,
+        max_size_mb: float = 0,
+        eviction_policy: str = 'lru',
+        namespace_refresh_seconds: float = 2,
+        memory_revalidate_seconds: float = 2
+    ):
         """
         初始化缓存服务
         
         Args:
             cache_dir: 缓存目录
             expiry_days: 缓存过期天数
+            backend: 存储后端，'sqlite'（单文件索引存储）或 'file'（每个键一个JSON文件）
+            memory_max_mb: 进程内内存层容量（MB），0表示不启用
+            codec: 数据压缩算法（'zlib'、'lzma'、'zstd'、'none'），旧数据可透明读取
+            codec_level: 压缩级别
+            max_size_mb: 存储后端的容量上限（MB），由 sweep() 按淘汰策略执行，0表示不限制
+            eviction_policy: 超出容量时的淘汰策略，'lru'（最近最少使用）或 'lfu'（最不经常使用）
+            namespace_refresh_seconds: 重新读取命名空间版本的间隔（秒），其他进程的版本递增和失效在此间隔内生效
+            memory_revalidate_seconds: 内存层条目与存储后端核对写入时间的间隔（秒），其他进程的覆盖写入和删除在此间隔内生效
         """
         self.cache_dir = cache_dir
         self.expiry_days = expiry_days
         self.expiry_seconds = expiry_days * 24 * 3600
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.eviction_policy = eviction_policy.lower()
+        
+        if self.eviction_policy not in ('lru', 'lfu'):
+            raise ValueError(f"Unknown eviction policy: {eviction_policy}")
         
         # 确保缓存目录存在
         os.makedirs(cache_dir, exist_ok=True)
+        
+        self.codec = CacheCodec(codec, codec_level)
+        
+        if backend == 'sqlite':
+            self.backend = SQLiteCacheBackend(
+                os.path.join(cache_dir, 'cache.db'), self.expiry_seconds, self.codec
+            )
+        elif backend == 'file':
+            self.backend = FileCacheBackend(cache_dir, self.expiry_seconds, self.codec)
+        else:
+            raise ValueError(f"Unknown cache backend: {backend}")
+        
+        # 内存层放在存储后端前面：读命中时提升到内存，写入同时写两层
+        self.memory = None
+        if memory_max_mb > 0:
+            self.memory = MemoryCacheTier(int(memory_max_mb * 1024 * 1024))
+        self.memory_revalidate_seconds = memory_revalidate_seconds
+        
+        # 命中记录先累积在内存中，由 sweep() 批量写入存储后端，避免每次读取都写盘
+        self._accesses: Dict[str, Tuple[float, int]] = {}
+        self._accesses_lock = threading.Lock()
+        self.last_sweep = None
+        self.metrics = CacheMetrics()
+        
+        self.namespace_refresh_seconds = namespace_refresh_seconds
+        self._namespace_versions: Dict[str, int] = {}
+        self._namespaces_loaded_at = 0.0
+        self._namespaces_lock = threading.Lock()
+    
+    def _load_namespace_versions(self, force: bool = False) -> Dict[str, int]:
+        """读取命名空间版本（按间隔缓存）；失效代数变化说明其他进程做过失效，清空本进程的内存层"""
+        with self._namespaces_lock:
+            if not force and time.monotonic() - self._namespaces_loaded_at < self.namespace_refresh_seconds:
+                return self._namespace_versions
+            
+            try:
+                versions = self.backend.get_namespace_versions()
+            except Exception as e:
+                print(f"Error reading cache namespace versions: {e}")
+                return self._namespace_versions
+            
+            if self.memory and versions.get(GENERATION_KEY, 0) != self._namespace_versions.get(GENERATION_KEY, 0):
+                self.memory.clear()
+            
+            self._namespace_versions = versions
+            self._namespaces_loaded_at = time.monotonic()
+            return versions
+    
+    def namespace_version(self, namespace: str) -> int:
+        """命名空间的当前版本"""
+        return self._load_namespace_versions().get(namespace, 0)
     
-    def _get_cache_path(self, key: str) -> str:
-        """获取缓存文件路径"""
-        # 将key转换为安全的文件名
-        safe_key = key.replace('/', '_').replace('\\', '_')
-        return os.path.join(self.cache_dir, f'{safe_key}.json')
+    def _physical_key(self, key: str) -> str:
+        """带命名空间版本的存储键"""
+        namespace, sep, rest = key.partition(':')
+        if not sep:
+            return key
+        
+        version = self.namespace_version(namespace)
+        return key if version == 0 else f'{namespace}:v{version}:{rest}'
+    
+    def _record_access(self, key: str):
+        now = time.time()
+        with self._accesses_lock:
+            _, hits = self._accesses.get(key, (now, 0))
+            self._accesses[key] = (now, hits + 1)
     
-    def get(self, key: str) -> Optional[Dict]:
+    def _memory_entry_current(self, physical_key: str, created_at: float, validated_at: float, revalidate: bool) -> bool:
+        """
+        内存层条目是否仍与存储后端一致
+        
+        内存层只随本进程的写入更新。超过 memory_revalidate_seconds 未核对的条目（或 revalidate 为真时）
+        向存储后端查询写入时间戳（只读元数据，不读取和解码数据）：未变化时继续使用，
+        被其他进程覆盖、删除或已过期时丢弃内存中的副本
+        """
+        if not revalidate and time.monotonic() - validated_at < self.memory_revalidate_seconds:
+            return True
+        
+        try:
+            current = self.backend.get_created_at(physical_key)
+        except Exception as e:
+            # 存储后端暂时不可用时继续使用内存中的副本
+            print(f"Error validating cache {physical_key}: {e}")
+            return True
+        
+        if current == created_at:
+            self.memory.mark_validated(physical_key, created_at)
+            return True
+        
+        self.memory.delete(physical_key)
+        return False
+    
+    def _get_entry(self, key: str, revalidate: bool = False) -> Optional[Tuple[Dict, float]]:
+        """返回 (数据, 写入时间戳)，不存在或已过期返回None；revalidate 为真时内存层命中必须先与存储后端核对"""
+        started = time.perf_counter()
+        physical_key = self._physical_key(key)
+        
+        if self.memory:
+            entry = self.memory.get(physical_key)
+            if entry is not None and self._memory_entry_current(physical_key, entry[1], entry[2], revalidate):
+                self._record_access(physical_key)
+                self.metrics.record_get(key, True, (time.perf_counter() - started) * 1000, memory=True)
+                return entry[0], entry[1]
+        
+        try:
+            entry = self.backend.get(physical_key)
+        except Exception as e:
+            print(f"Error reading cache {key}: {e}")
+            entry = None
+        
+        if entry is None:
+            self.metrics.record_get(key, False, (time.perf_counter() - started) * 1000)
+            return None
+        
+        data, size, created_at, expires_at = entry
+        if self.memory:
+            self.memory.set(physical_key, data, size, created_at, expires_at)
+        
+        self._record_access(physical_key)
+        self.metrics.record_get(key, True, (time.perf_counter() - started) * 1000)
+        return data, created_at
+    
+    def get(self, key: str, revalidate: bool = False) -> Optional[Dict]:
         """
         从缓存获取数据
         
         Args:
             key: 缓存键
+            revalidate: 是否必须读到存储后端的最新值（内存层命中时先核对写入时间，用于跨进程协调）
             
         Returns:
             缓存数据，如果不存在或已过期返回None
         """
-        cache_path = self._get_cache_path(key)
+        entry = self._get_entry(key, revalidate)
+        return entry[0] if entry else None
+    
+    def get_with_staleness(self, key: str, soft_ttl: float, revalidate: bool = False) -> Tuple[Optional[Dict], bool]:
+        """
+        从缓存获取数据，并判断是否已超过软过期时间
         
-        if not os.path.exists(cache_path):
-            return None
+        条目在写入 soft_ttl 秒后变为"陈旧"但仍可返回，直到硬过期（写入时的ttl）才被删除
         
-        try:
-            # 检查缓存文件是否过期
-            file_time = os.path.getmtime(cache_path)
-            current_time = datetime.now().timestamp()
-            
-            if current_time - file_time > self.expiry_seconds:
-                # 缓存已过期，删除文件
-                os.remove(cache_path)
-                return None
-            
-            # 读取缓存数据
-            with open(cache_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            return data
+        Args:
+            key: 缓存键
+            soft_ttl: 软过期秒数
+            revalidate: 是否必须读到存储后端的最新值（见 get）
             
-        except Exception as e:
-            print(f"Error reading cache {key}: {e}")
-            return None
+        Returns:
+            (缓存数据, 是否陈旧)，不存在或已硬过期时为 (None, False)
+        """
+        entry = self._get_entry(key, revalidate)
+        if entry is None:
+            return None, False
+        
+        data, created_at = entry
+        stale = time.time() - created_at > soft_ttl
+        if stale:
+            self.metrics.record_stale_hit(key)
+        
+        return data, stale
     
-    def set(self, key: str, data: Dict) -> bool:
+    def set(self, key: str, data: Dict, ttl: Optional[int] = None, tags: Optional[Iterable[str]] = None) -> bool:
         """
         将数据写入缓存
         
         Args:
             key: 缓存键
             data: 要缓存的数据
+            ttl: 过期秒数（可选，默认 expiry_days）
+            tags: 标签（如 'model:gemini-pro'），可用 invalidate_tag() 批量失效
             
         Returns:
             是否成功
         """
-        cache_path = self._get_cache_path(key)
-        
+        started = time.perf_counter()
+        physical_key = self._physical_key(key)
         try:
-            with open(cache_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            
-            return True
-            
+            size, created_at, expires_at = self.backend.set(physical_key, data, ttl, tags=tuple(tags or ()))
         except Exception as e:
             print(f"Error writing cache {key}: {e}")
+            self.metrics.record_set(key, False, (time.perf_counter() - started) * 1000)
+            # 存储层写入失败时不保留内存中的旧值
+            if self.memory:
+                self.memory.delete(physical_key)
             return False
+        
+        if self.memory:
+            self.memory.set(physical_key, data, size, created_at, expires_at)
+        
+        self.metrics.record_set(key, True, (time.perf_counter() - started) * 1000)
+        return True
     
     def delete(self, key: str) -> bool:
         """
@@ -99,11 +300,12 @@ class CacheService:
         Returns:
             是否成功
         """
-        cache_path = self._get_cache_path(key)
+        physical_key = self._physical_key(key)
+        if self.memory:
+            self.memory.delete(physical_key)
         
         try:
-            if os.path.exists(cache_path):
-                os.remove(cache_path)
+            self.backend.delete(physical_key)
             return True
         except Exception as e:
             print(f"Error deleting cache {key}: {e}")
@@ -116,36 +318,319 @@ class CacheService:
         Returns:
             是否成功
         """
+        if self.memory:
+            self.memory.clear()
+        
         try:
-            for filename in os.listdir(self.cache_dir):
-                if filename.endswith('.json'):
-                    os.remove(os.path.join(self.cache_dir, filename))
+            self.backend.clear()
             return True
         except Exception as e:
             print(f"Error clearing cache: {e}")
             return False
     
+    def _bump_generation(self):
+        """通知其他进程清空内存层"""
+        generation = self.backend.bump_namespace(GENERATION_KEY)
+        with self._namespaces_lock:
+            self._namespace_versions[GENERATION_KEY] = generation
+    
+    def invalidate_tag(self, tag: str) -> int:
+        """
+        删除打了该标签的全部条目（标签索引查询，不扫描全部缓存）
+        
+        Args:
+            tag: 写入时指定的标签
+            
+        Returns:
+            删除的条目数
+        """
+        try:
+            keys = self.backend.delete_tag(tag)
+            if self.memory:
+                for key in keys:
+                    self.memory.delete(key)
+            self._bump_generation()
+            return len(keys)
+        except Exception as e:
+            print(f"Error invalidating cache tag {tag}: {e}")
+            return 0
+    
+    def invalidate_prefix(self, prefix: str) -> int:
+        """
+        删除以 prefix 开头的全部条目（SQLite后端为主键范围删除）
+        
+        Args:
+            prefix: 键前缀，如 'search:days_back=30'；不含冒号时匹配该命名空间所有版本的条目
+            
+        Returns:
+            删除的条目数
+        """
+        physical_prefix = self._physical_key(prefix) if ':' in prefix else prefix
+        
+        try:
+            if self.memory:
+                self.memory.delete_prefix(physical_prefix)
+            removed = self.backend.delete_prefix(physical_prefix)
+            self._bump_generation()
+            return removed
+        except Exception as e:
+            print(f"Error invalidating cache prefix {prefix}: {e}")
+            return 0
+    
+    def bump_namespace(self, namespace: str) -> int:
+        """
+        递增命名空间版本，该命名空间的现有条目立即不可见，由 sweep() 回收
+        
+        Args:
+            namespace: 命名空间，如 'search'
+            
+        Returns:
+            新版本号
+        """
+        version = self.backend.bump_namespace(namespace)
+        self._load_namespace_versions(force=True)
+        return version
+    
+    def purge_expired(self) -> int:
+        """
+        删除所有已过期的缓存
+        
+        Returns:
+            删除的条目数
+        """
+        if self.memory:
+            self.memory.purge_expired()
+        
+        try:
+            return self.backend.purge_expired()
+        except Exception as e:
+            print(f"Error purging expired cache: {e}")
+            return 0
+    
+    def sweep(self, batch_size: int = 500, report_limit: int = 100) -> Dict:
+        """
+        执行一轮清理：写入累积的访问记录，分批删除已过期条目，再按淘汰策略把存储控制在容量上限内
+        
+        Args:
+            batch_size: 每个删除事务最多处理的条目数
+            report_limit: 报告中最多列出的被淘汰键数
+            
+        Returns:
+            清理报告
+        """
+        started = time.time()
+        report = {
+            'expired': 0,
+            'old_versions': 0,
+            'evicted': 0,
+            'evicted_mb': 0,
+            'evicted_keys': [],
+            'policy': self.eviction_policy,
+            'max_size_mb': round(self.max_bytes / (1024 * 1024), 2),
+            'error': None,
+        }
+        
+        with self._accesses_lock:
+            accesses, self._accesses = self._accesses, {}
+        
+        try:
+            self.backend.record_access(accesses)
+            
+            if self.memory:
+                self.memory.purge_expired()
+            
+            while True:
+                removed = self.backend.purge_expired(limit=batch_size)
+                report['expired'] += removed
+                self.metrics.record_expired(removed)
+                if removed < batch_size:
+                    break
+            
+            # 回收旧版本命名空间的条目：删除 'ns:' 开头但不属于当前版本前缀的键
+            for namespace, version in self._load_namespace_versions(force=True).items():
+                if namespace == GENERATION_KEY or version == 0:
+                    continue
+                while True:
+                    removed = self.backend.delete_prefix(
+                        f'{namespace}:', exclude=f'{namespace}:v{version}:', limit=batch_size
+                    )
+                    report['old_versions'] += removed
+                    if removed < batch_size:
+                        break
+            
+            if self.max_bytes > 0:
+                evicted = self.backend.evict(self.max_bytes, self.eviction_policy, batch_size)
+                self.metrics.record_evictions([key for key, _ in evicted])
+                for key, size in evicted:
+                    if self.memory:
+                        self.memory.delete(key)
+                report['evicted'] = len(evicted)
+                report['evicted_mb'] = round(sum(size for _, size in evicted) / (1024 * 1024), 2)
+                report['evicted_keys'] = [key for key, _ in evicted[:report_limit]]
+        except Exception as e:
+            print(f"[ERROR] Cache sweep failed: {e}")
+            report['error'] = str(e)
+        
+        report['duration_ms'] = round((time.time() - started) * 1000, 1)
+        report['finished_at'] = datetime.now().isoformat()
+        self.last_sweep = report
+        
+        if report['expired'] or report['old_versions'] or report['evicted']:
+            print(
+                f"[INFO] Cache sweep: {report['expired']} expired, {report['old_versions']} old versions, "
+                f"{report['evicted']} evicted ({report['evicted_mb']} MB)"
+            )
+        
+        return report
+    
     def get_cache_stats(self) -> Dict:
         """
         获取缓存统计信息
         
         Returns:
-            包含缓存大小和文件数量的字典
+            包含缓存大小和条目数量的字典
         """
         try:
-            total_size = 0
-            file_count = 0
+            stats = self.backend.stats()
             
-            for filename in os.listdir(self.cache_dir):
-                if filename.endswith('.json'):
-                    file_count += 1
-                    filepath = os.path.join(self.cache_dir, filename)
-                    total_size += os.path.getsize(filepath)
+            result = {
+                'backend': self.backend.name,
+                'entry_count': stats['entry_count'],
+                'file_count': stats['entry_count'],
+                'total_size_mb': round(stats['total_size'] / (1024 * 1024), 2)
+            }
             
-            return {
-                'file_count': file_count,
-                'total_size_mb': round(total_size / (1024 * 1024), 2)
+            if self.memory:
+                memory_stats = self.memory.stats()
+                result['memory'] = {
+                    'entry_count': memory_stats['entry_count'],
+                    'size_mb': round(memory_stats['total_size'] / (1024 * 1024), 2),
+                    'max_size_mb': round(memory_stats['max_size'] / (1024 * 1024), 2)
+                }
+            
+            result['max_size_mb'] = round(self.max_bytes / (1024 * 1024), 2)
+            result['eviction_policy'] = self.eviction_policy
+            result['last_sweep'] = self.last_sweep
+            result['namespace_versions'] = {
+                namespace: version
+                for namespace, version in self._load_namespace_versions().items()
+                if namespace != GENERATION_KEY
             }
+            result['metrics'] = self.metrics.snapshot()
+            
+            return result
         except Exception as e:
             print(f"Error getting cache stats: {e}")
-            return {'file_count': 0, 'total_size_mb': 0}
+            return {
+                'backend': self.backend.name,
+                'entry_count': 0,
+                'file_count': 0,
+                'total_size_mb': 0,
+                'metrics': self.metrics.snapshot()
+            }
+
+
+class CacheRefresher:
+    """
+    后台缓存刷新器 - 用于陈旧数据的异步重新计算（stale-while-revalidate）
+    
+    同一个键同时只会有一个刷新任务，重复的刷新请求直接忽略
+    """
+    
+    def __init__(self, cache_service: CacheService, max_workers: int = 2):
+        """
+        初始化刷新器
+        
+        Args:
+            cache_service: 缓存服务
+            max_workers: 后台刷新线程数
+        """
+        self.cache_service = cache_service
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='cache-refresh')
+        self._in_flight = set()
+        self._lock = threading.Lock()
+    
+    def schedule(self, key: str, compute: Callable[[], Optional[Dict]], ttl: Optional[int] = None) -> bool:
+        """
+        在后台重新计算并写入缓存
+        
+        Args:
+            key: 缓存键
+            compute: 计算新数据的函数，返回None时保留原有缓存
+            ttl: 写入时的过期秒数（硬过期）
+            
+        Returns:
+            是否提交了新的刷新任务（该键已在刷新中时返回False）
+        """
+        with self._lock:
+            if key in self._in_flight:
+                return False
+            self._in_flight.add(key)
+        
+        try:
+            self._executor.submit(self._refresh, key, compute, ttl)
+        except RuntimeError as e:
+            # 线程池已关闭（进程退出中）
+            print(f"[ERROR] Could not schedule cache refresh for {key}: {e}")
+            with self._lock:
+                self._in_flight.discard(key)
+            return False
+        
+        return True
+    
+    def is_refreshing(self, key: str) -> bool:
+        with self._lock:
+            return key in self._in_flight
+    
+    def _refresh(self, key: str, compute: Callable[[], Optional[Dict]], ttl: Optional[int]):
+        try:
+            data = compute()
+            if data is not None:
+                self.cache_service.set(key, data, ttl)
+        except Exception as e:
+            # 刷新失败时保留陈旧数据，下次请求会再次尝试
+            print(f"[ERROR] Background refresh of {key} failed: {e}")
+        finally:
+            with self._lock:
+                self._in_flight.discard(key)
+
+
+class CacheSweeper:
+    """后台缓存清理线程，定期执行 CacheService.sweep()"""
+    
+    def __init__(self, cache_service: CacheService, interval_seconds: float = 600, batch_size: int = 500):
+        """
+        初始化清理器
+        
+        Args:
+            cache_service: 缓存服务
+            interval_seconds: 清理间隔（秒）
+            batch_size: 每个删除事务最多处理的条目数
+        """
+        self.cache_service = cache_service
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self._stop_event = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        """启动后台清理线程"""
+        if self._thread and self._thread.is_alive():
+            return
+        
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='cache-sweeper', daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout: Optional[float] = None):
+        """停止后台清理线程"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+    
+    def _run(self):
+        while not self._stop_event.wait(self.interval_seconds):
+            try:
+                self.cache_service.sweep(self.batch_size)
+            except Exception as e:
+                print(f"[ERROR] Scheduled cache sweep failed: {e}")
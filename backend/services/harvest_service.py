@@ -0,0 +1,146 @@
+"""
+arXiv 增量采集服务模块
+按分类维护水位线，只抓取水位线之后提交的新论文并写入本地论文库
+"""
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import requests
+
+from services.atom_parser import ParseError
+
+
+class HarvestService:
+    """arXiv增量采集服务"""
+    
+    def __init__(
+        self,
+        arxiv_service,
+        paper_store,
+        initial_days: int = 7,
+        overlap_hours: int = 48,
+        page_size: Optional[int] = None
+    ):
+        """
+        初始化采集服务
+        
+        Args:
+            arxiv_service: arXiv数据获取服务
+            paper_store: 本地论文库
+            initial_days: 首次采集某分类时回溯的天数
+            overlap_hours: 每次从水位线往前回溯的小时数，用于补上arXiv延迟公告的论文
+            page_size: 每页论文数，默认使用arxiv_service的分页大小
+        """
+        self.arxiv_service = arxiv_service
+        self.paper_store = paper_store
+        self.initial_days = initial_days
+        self.overlap_hours = overlap_hours
+        self.page_size = page_size
+    
+    def harvest_category(self, category: str) -> Dict:
+        """
+        采集单个分类自水位线以来的新论文
+        
+        按提交时间升序逐页抓取，每页写入后立即推进水位线，
+        中途失败时已写入的页不会丢失，下次从新的水位线继续
+        
+        Args:
+            category: arXiv分类，如 cs.CL
+        
+        Returns:
+            采集结果统计
+        """
+        now = datetime.utcnow()
+        watermark = self.paper_store.get_watermark(category)
+        
+        if watermark is None:
+            since = now - timedelta(days=self.initial_days)
+        else:
+            since = watermark - timedelta(hours=self.overlap_hours)
+        
+        search_query = (
+            f'cat:{category} AND submittedDate:'
+            f'[{since.strftime("%Y%m%d%H%M")} TO {now.strftime("%Y%m%d%H%M")}]'
+        )
+        
+        result = {
+            'category': category,
+            'since': since.isoformat(),
+            'fetched': 0,
+            'pages': 0,
+            'watermark': watermark.isoformat() if watermark else None,
+            'error': None,
+        }
+        
+        print(f"[INFO] Harvesting {category} since {since.isoformat()}")
+        
+        try:
+            for papers in self.arxiv_service.iter_pages(search_query, self.page_size):
+                new_watermark = self.paper_store.ingest_harvest_page(category, papers)
+                result['fetched'] += len(papers)
+                result['pages'] += 1
+                result['watermark'] = new_watermark.isoformat() if new_watermark else None
+        except (requests.exceptions.RequestException, ParseError) as e:
+            print(f"[ERROR] Harvest of {category} stopped: {e}")
+            result['error'] = str(e)
+        
+        print(f"[INFO] Harvested {result['fetched']} papers for {category}")
+        
+        return result
+    
+    def harvest(self, categories: List[str]) -> List[Dict]:
+        """
+        依次采集多个分类
+        
+        Args:
+            categories: arXiv分类列表
+        
+        Returns:
+            每个分类的采集结果
+        """
+        return [self.harvest_category(category) for category in categories]
+
+
+class HarvestScheduler:
+    """进程内定时采集调度器（后台守护线程）"""
+    
+    def __init__(self, harvest_service: HarvestService, categories: List[str], interval_hours: float = 24):
+        """
+        初始化调度器
+        
+        Args:
+            harvest_service: 采集服务
+            categories: 需要采集的分类
+            interval_hours: 采集间隔（小时）
+        """
+        self.harvest_service = harvest_service
+        self.categories = categories
+        self.interval_seconds = interval_hours * 3600
+        self.last_results = []
+        self._stop_event = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        """启动后台采集线程，立即执行一次"""
+        if self._thread and self._thread.is_alive():
+            return
+        
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='arxiv-harvester', daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout: Optional[float] = None):
+        """停止后台采集线程"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+    
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.last_results = self.harvest_service.harvest(self.categories)
+            except Exception as e:
+                print(f"[ERROR] Scheduled harvest failed: {e}")
+            
+            self._stop_event.wait(self.interval_seconds)
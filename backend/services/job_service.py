@@ -0,0 +1,226 @@
+"""
+后台任务模块
+把耗时的计算（如AI生成发展脉络）放到本地线程池中执行，接口先返回任务ID，
+客户端通过轮询或事件流获取结果
+"""
+from typing import Any, Callable, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import threading
+import time
+import uuid
+
+
+class Job:
+    """一个后台任务的状态"""
+    
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    
+    def __init__(self, kind: str, key: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.status = self.QUEUED
+        self.result = None
+        self.error = None
+        self.created_at = datetime.now().isoformat()
+        self.started_at = None
+        self.finished_at = None
+        # 每次状态变化递增，供等待者判断是否有新状态
+        self.version = 0
+        self.finished_monotonic = None
+    
+    @property
+    def finished(self) -> bool:
+        return self.status in (self.DONE, self.FAILED)
+    
+    def snapshot(self) -> Dict:
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'version': self.version,
+        }
+
+
+class JobService:
+    """
+    后台任务服务
+    
+    任务在本进程的线程池中执行，排队由线程池的本地队列完成；相同 key 的任务在进行中时不重复提交。
+    配置了 result_store（缓存服务）时，任务状态同时写入缓存，其他工作进程也能查到任务结果
+    """
+    
+    def __init__(
+        self,
+        max_workers: int = 2,
+        result_store=None,
+        result_ttl: int = 3600,
+        max_jobs: int = 1000
+    ):
+        """
+        初始化任务服务
+        
+        Args:
+            max_workers: 执行任务的线程数
+            result_store: 跨进程共享任务状态的缓存服务（可选）
+            result_ttl: 已完成任务的保留秒数
+            max_jobs: 内存中最多保留的任务数，超出时先删除最早完成的任务
+        """
+        self.result_store = result_store
+        self.result_ttl = result_ttl
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job-worker')
+        self._jobs: Dict[str, Job] = {}
+        self._active_keys: Dict[str, str] = {}
+        self._changed = threading.Condition()
+    
+    def submit(self, kind: str, fn: Callable[[], Any], key: Optional[str] = None) -> str:
+        """
+        提交后台任务
+        
+        Args:
+            kind: 任务类型，如 'trajectory'
+            fn: 任务函数，返回值需可JSON序列化
+            key: 去重键（可选），相同键的任务排队或执行中时直接返回已有任务的ID
+        
+        Returns:
+            任务ID
+        """
+        with self._changed:
+            if key is not None and key in self._active_keys:
+                return self._active_keys[key]
+            
+            job = Job(kind, key)
+            self._jobs[job.id] = job
+            if key is not None:
+                self._active_keys[key] = job.id
+            self._prune()
+        
+        self._publish(job)
+        
+        try:
+            self._executor.submit(self._run, job, fn)
+        except RuntimeError as e:
+            # 线程池已关闭（进程退出中）
+            self._finish(job, error=f'Could not schedule job: {e}')
+        
+        return job.id
+    
+    def get(self, job_id: str) -> Optional[Dict]:
+        """
+        获取任务状态
+        
+        Returns:
+            任务快照（id、kind、status、result、error、时间和版本），不存在时返回None
+        """
+        with self._changed:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return job.snapshot()
+        
+        if self.result_store:
+            return self.result_store.get(self._store_key(job_id))
+        return None
+    
+    def wait(self, job_id: str, after_version: int = -1, timeout: float = 1.0) -> Optional[Dict]:
+        """
+        等待任务状态变化
+        
+        Args:
+            job_id: 任务ID
+            after_version: 调用方已看到的版本，状态版本大于它或任务结束时立即返回
+            timeout: 最长等待秒数
+        
+        Returns:
+            任务快照（超时时为当前状态），不存在时返回None
+        """
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                while job.version <= after_version and not job.finished:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._changed.wait(remaining)
+                return job.snapshot()
+        
+        # 其他进程中的任务：只能读取共享状态
+        snapshot = self.get(job_id)
+        if snapshot and snapshot['version'] <= after_version and snapshot['status'] not in (Job.DONE, Job.FAILED):
+            time.sleep(timeout)
+            snapshot = self.get(job_id)
+        return snapshot
+    
+    def stats(self) -> Dict:
+        with self._changed:
+            counts = dict.fromkeys((Job.QUEUED, Job.RUNNING, Job.DONE, Job.FAILED), 0)
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return counts
+    
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _run(self, job: Job, fn: Callable[[], Any]):
+        with self._changed:
+            job.status = Job.RUNNING
+            job.started_at = datetime.now().isoformat()
+            job.version += 1
+            self._changed.notify_all()
+        self._publish(job)
+        
+        try:
+            result = fn()
+        except Exception as e:
+            print(f"[ERROR] {job.kind} job {job.id} failed: {e}")
+            self._finish(job, error=str(e))
+        else:
+            self._finish(job, result=result)
+    
+    def _finish(self, job: Job, result: Any = None, error: Optional[str] = None):
+        with self._changed:
+            job.status = Job.FAILED if error else Job.DONE
+            job.result = result
+            job.error = error
+            job.finished_at = datetime.now().isoformat()
+            job.finished_monotonic = time.monotonic()
+            job.version += 1
+            if job.key is not None and self._active_keys.get(job.key) == job.id:
+                del self._active_keys[job.key]
+            self._changed.notify_all()
+        self._publish(job)
+    
+    def _publish(self, job: Job):
+        if not self.result_store:
+            return
+        try:
+            self.result_store.set(self._store_key(job.id), job.snapshot(), ttl=self.result_ttl)
+        except Exception as e:
+            print(f"[ERROR] Could not publish job {job.id}: {e}")
+    
+    @staticmethod
+    def _store_key(job_id: str) -> str:
+        return f'job:{job_id}'
+    
+    def _prune(self):
+        """删除过期的已完成任务，超出数量上限时再删除最早完成的任务（调用方持有锁）"""
+        now = time.monotonic()
+        finished = sorted(
+            (job for job in self._jobs.values() if job.finished),
+            key=lambda job: job.finished_monotonic
+        )
+        excess = len(self._jobs) - self.max_jobs
+        for job in finished:
+            if now - job.finished_monotonic > self.result_ttl or excess > 0:
+                del self._jobs[job.id]
+                excess -= 1
@@ -0,0 +1,163 @@
+"""
+论文列表的列式索引模块
+一次遍历解析发布时间、计算年份/季度分桶和发表地点计数，并排好新旧顺序，
+供发展脉络、季度聚合和降级总结共用，避免每个视图各自重新解析和排序
+"""
+from typing import Dict, List, Optional
+from array import array
+from datetime import datetime
+import re
+
+
+# 季度编号 = 年份 * 4 + (季度 - 1)；以下两个值表示没有发布时间和无法解析
+NO_DATE = -2
+UNPARSEABLE = -1
+
+_YEAR_MONTH = re.compile(r'(\d{4})-(\d{2})-\d{2}')
+
+
+def quarter_key(quarter_id: int) -> str:
+    """季度编号转为 '2024-Q1' 格式，无法解析的为 'Unknown'"""
+    if quarter_id < 0:
+        return 'Unknown'
+    return f'{quarter_id // 4}-Q{quarter_id % 4 + 1}'
+
+
+class PaperIndex:
+    """
+    论文列表的只读列式索引
+    
+    每篇论文的季度编号和发表地点编号存放在紧凑的整数数组中，按下标对应原列表。
+    解析结果按日期前缀（YYYY-MM-DD）缓存，同一天发布的论文只解析一次
+    """
+    
+    def __init__(self, papers: List[Dict]):
+        """
+        一次遍历建立索引
+        
+        Args:
+            papers: 论文列表（不会被修改）
+        """
+        self.papers = papers
+        self.quarter_ids = array('i', bytes(4 * len(papers)))
+        self.venue_ids = array('i', bytes(4 * len(papers)))
+        self.venues: List[str] = []
+        # 季度编号 -> 论文下标（按原顺序），以及季度内各发表地点的计数（按首次出现顺序）
+        self.quarter_members: Dict[int, array] = {}
+        self.quarter_venue_counts: Dict[int, Dict[int, int]] = {}
+        self.venue_counts: Dict[int, int] = {}
+        
+        venue_lookup: Dict[str, int] = {}
+        parsed: Dict[str, int] = {}
+        
+        for i, paper in enumerate(papers):
+            published = paper.get('published') or ''
+            if not published:
+                quarter_id = NO_DATE
+            else:
+                prefix = published[:10]
+                quarter_id = parsed.get(prefix)
+                if quarter_id is None:
+                    quarter_id = parsed[prefix] = self._parse_quarter(published)
+            
+            venue = paper.get('publication_venue')
+            venue_id = -1
+            if venue:
+                venue_id = venue_lookup.get(venue)
+                if venue_id is None:
+                    venue_id = venue_lookup[venue] = len(self.venues)
+                    self.venues.append(venue)
+                self.venue_counts[venue_id] = self.venue_counts.get(venue_id, 0) + 1
+            
+            self.quarter_ids[i] = quarter_id
+            self.venue_ids[i] = venue_id
+            
+            if quarter_id != NO_DATE:
+                members = self.quarter_members.get(quarter_id)
+                if members is None:
+                    members = self.quarter_members[quarter_id] = array('i')
+                    self.quarter_venue_counts[quarter_id] = {}
+                members.append(i)
+                if venue_id >= 0:
+                    counts = self.quarter_venue_counts[quarter_id]
+                    counts[venue_id] = counts.get(venue_id, 0) + 1
+        
+        # 按发布时间从新到旧（ISO时间字符串可直接比较），没有发布时间的排在最后
+        self.order = sorted(range(len(papers)), key=lambda i: papers[i].get('published') or '0', reverse=True)
+    
+    @staticmethod
+    def _parse_quarter(published: str) -> int:
+        match = _YEAR_MONTH.match(published)
+        if match:
+            year, month = int(match.group(1)), int(match.group(2))
+        else:
+            try:
+                pub_date = datetime.fromisoformat(published.replace('Z', '+00:00'))
+            except ValueError:
+                return UNPARSEABLE
+            year, month = pub_date.year, pub_date.month
+        
+        if not 1 <= month <= 12:
+            return UNPARSEABLE
+        return year * 4 + (month - 1) // 3
+    
+    def quarter_indices(self, include_unknown: bool = True) -> Dict[str, List[int]]:
+        """
+        按季度分组的论文下标，季度从新到旧，'Unknown' 排在最前（与按字符串倒序一致）
+        
+        Args:
+            include_unknown: 是否包含发布时间无法解析的 'Unknown' 分组
+        """
+        grouped = {}
+        if include_unknown and UNPARSEABLE in self.quarter_members:
+            grouped['Unknown'] = self.quarter_members[UNPARSEABLE].tolist()
+        for quarter_id in sorted((q for q in self.quarter_members if q >= 0), reverse=True):
+            grouped[quarter_key(quarter_id)] = self.quarter_members[quarter_id].tolist()
+        return grouped
+    
+    def quarters(self, include_unknown: bool = True) -> Dict[str, List[Dict]]:
+        """按季度分组的论文，顺序同 quarter_indices"""
+        return {
+            key: [self.papers[i] for i in indices]
+            for key, indices in self.quarter_indices(include_unknown).items()
+        }
+    
+    def top_venues(self, limit: int = 3, quarter: Optional[str] = None) -> List[str]:
+        """
+        出现最多的发表地点，数量相同时按首次出现的顺序
+        
+        Args:
+            limit: 返回的数量
+            quarter: 季度（如 '2024-Q1'），None表示全部论文
+        """
+        if quarter is None:
+            counts = self.venue_counts
+        else:
+            counts = self.quarter_venue_counts.get(self._quarter_id(quarter), {})
+        ranked = sorted(counts.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [self.venues[venue_id] for venue_id, _ in ranked]
+    
+    def top_venue_counts(self, limit: int = 5) -> List[tuple]:
+        """全部论文中出现最多的发表地点及篇数"""
+        ranked = sorted(self.venue_counts.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [(self.venues[venue_id], count) for venue_id, count in ranked]
+    
+    def year_counts(self) -> Dict[int, int]:
+        """每年的论文数（按年份升序，不含没有或无法解析发布时间的论文）"""
+        counts: Dict[int, int] = {}
+        for quarter_id, members in self.quarter_members.items():
+            if quarter_id >= 0:
+                counts[quarter_id // 4] = counts.get(quarter_id // 4, 0) + len(members)
+        return dict(sorted(counts.items()))
+    
+    def newest(self, limit: Optional[int] = None) -> List[Dict]:
+        """按发布时间从新到旧的论文"""
+        order = self.order if limit is None else self.order[:limit]
+        return [self.papers[i] for i in order]
+    
+    @staticmethod
+    def _quarter_id(quarter: str) -> int:
+        if quarter == 'Unknown':
+            return UNPARSEABLE
+        year, number = quarter.split('-Q')
+        return int(year) * 4 + int(number) - 1
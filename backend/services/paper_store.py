@@ -0,0 +1,482 @@
+"""
+本地论文库服务模块
+将从arXiv获取的论文写入数据库，并在覆盖范围内直接回答搜索
+"""
+import json
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import DateTime, bindparam, event, select, func, text
+from sqlalchemy.exc import OperationalError
+
+from database.models import HarvestState, Paper, SearchHistory, SearchResult, init_db
+
+
+class PaperStore:
+    """本地论文库 - arXiv数据的写穿透存储"""
+    
+    # 单条 INSERT 语句包含的最大行数（受SQLite变量数上限约束）
+    BATCH_SIZE = 500
+    
+    # BM25列权重：title, summary, authors, categories
+    BM25_WEIGHTS = (10.0, 1.0, 3.0, 2.0)
+    
+    # FTS5外部内容表及同步触发器，papers表的增删改自动同步到索引
+    FTS_SCHEMA = [
+        """CREATE VIRTUAL TABLE papers_fts USING fts5(
+            title, summary, authors, categories,
+            content='papers', content_rowid='id',
+            tokenize='porter unicode61'
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS papers_fts_ai AFTER INSERT ON papers BEGIN
+            INSERT INTO papers_fts(rowid, title, summary, authors, categories)
+            VALUES (new.id, new.title, new.summary, new.authors, new.categories);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS papers_fts_ad AFTER DELETE ON papers BEGIN
+            INSERT INTO papers_fts(papers_fts, rowid, title, summary, authors, categories)
+            VALUES ('delete', old.id, old.title, old.summary, old.authors, old.categories);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS papers_fts_au AFTER UPDATE OF title, summary, authors, categories ON papers
+        WHEN old.title IS NOT new.title OR old.summary IS NOT new.summary
+            OR old.authors IS NOT new.authors OR old.categories IS NOT new.categories
+        BEGIN
+            INSERT INTO papers_fts(papers_fts, rowid, title, summary, authors, categories)
+            VALUES ('delete', old.id, old.title, old.summary, old.authors, old.categories);
+            INSERT INTO papers_fts(rowid, title, summary, authors, categories)
+            VALUES (new.id, new.title, new.summary, new.authors, new.categories);
+        END""",
+    ]
+    
+    def __init__(self, database_url: str = 'sqlite:///./arxiv_papers.db'):
+        """
+        初始化论文库
+        
+        Args:
+            database_url: 数据库连接字符串
+        """
+        self.database_url = database_url
+        self.engine, self.Session = init_db(database_url)
+        self.dialect = self.engine.dialect.name
+        
+        self.fts_enabled = False
+        
+        if self.dialect == 'sqlite':
+            # WAL模式允许读写并发，避免Flask多线程下的锁等待
+            event.listen(self.engine, 'connect', self._set_sqlite_pragmas)
+            self._init_fts()
+    
+    def _init_fts(self):
+        """创建FTS5全文索引；已有论文数据时重建索引"""
+        try:
+            with self.engine.begin() as conn:
+                exists = conn.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'papers_fts'"
+                )).first()
+                
+                if not exists:
+                    conn.execute(text(self.FTS_SCHEMA[0]))
+                for statement in self.FTS_SCHEMA[1:]:
+                    conn.execute(text(statement))
+                if not exists:
+                    conn.execute(text("INSERT INTO papers_fts(papers_fts) VALUES ('rebuild')"))
+            
+            self.fts_enabled = True
+        except OperationalError as e:
+            # SQLite未编译FTS5时退化为仅存储
+            print(f"[WARNING] FTS5 full-text index unavailable: {e}")
+    
+    @staticmethod
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.close()
+    
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """规范化查询词（小写、合并空白），使大小写和空白不同的查询共享结果"""
+        return ' '.join(query.lower().split())
+    
+    @staticmethod
+    def _parse_published(published: str) -> Optional[datetime]:
+        """将arXiv时间字符串解析为UTC naive datetime"""
+        if not published:
+            return None
+        try:
+            value = datetime.fromisoformat(published.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+    
+    def _to_row(self, paper: Dict) -> Optional[Dict]:
+        """论文字典 -> papers表的一行"""
+        published = self._parse_published(paper.get('published', ''))
+        if not paper.get('arxiv_id') or published is None:
+            return None
+        
+        return {
+            'arxiv_id': paper['arxiv_id'],
+            'title': (paper.get('title') or '')[:500],
+            'authors': json.dumps(paper.get('authors') or [], ensure_ascii=False),
+            'summary': paper.get('summary'),
+            'published': published,
+            'url': paper.get('url'),
+            'pdf_url': paper.get('pdf_url'),
+            'categories': paper.get('categories'),
+            'comment': paper.get('comment'),
+            'journal_ref': paper.get('journal_ref'),
+            'updated_at': datetime.utcnow(),
+        }
+    
+    @staticmethod
+    def _to_paper(row: Paper) -> Dict:
+        """papers表的一行 -> 与ArxivService一致的论文字典"""
+        try:
+            authors = json.loads(row.authors) if row.authors else []
+        except ValueError:
+            authors = []
+        
+        return {
+            'arxiv_id': row.arxiv_id,
+            'title': row.title,
+            'authors': authors,
+            'summary': row.summary or '',
+            'published': row.published.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'url': row.url or '',
+            'pdf_url': row.pdf_url or '',
+            'categories': row.categories or '',
+            'comment': row.comment,
+            'journal_ref': row.journal_ref,
+        }
+    
+    def _upsert(self, session, model, rows: List[Dict], index_elements: List[str], update_columns: List[str]):
+        """按方言执行批量 INSERT ... ON CONFLICT，其他数据库逐行merge"""
+        if not rows:
+            return
+        
+        if self.dialect in ('sqlite', 'postgresql'):
+            if self.dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            
+            for i in range(0, len(rows), self.BATCH_SIZE):
+                stmt = insert(model).values(rows[i:i + self.BATCH_SIZE])
+                if update_columns:
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=index_elements,
+                        set_={col: stmt.excluded[col] for col in update_columns}
+                    )
+                else:
+                    stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+                session.execute(stmt)
+        else:
+            for row in rows:
+                existing = session.execute(
+                    select(model).filter_by(**{k: row[k] for k in index_elements})
+                ).scalar_one_or_none()
+                if existing is None:
+                    session.add(model(**row))
+                else:
+                    for col in update_columns:
+                        setattr(existing, col, row[col])
+    
+    def upsert_papers(self, papers: List[Dict]) -> int:
+        """
+        批量写入/更新论文
+        
+        只更新arXiv来源的字段，保留收藏、笔记、AI总结等本地字段
+        
+        Args:
+            papers: 论文列表
+        
+        Returns:
+            写入的论文数
+        """
+        with self.Session() as session:
+            count = self._upsert_papers(session, papers)
+            session.commit()
+        
+        return count
+    
+    def _upsert_papers(self, session, papers: List[Dict]) -> int:
+        """在给定会话中批量写入论文，不提交"""
+        rows = {}
+        for paper in papers:
+            row = self._to_row(paper)
+            if row:
+                rows[row['arxiv_id']] = row
+        
+        if not rows:
+            return 0
+        
+        update_columns = [c for c in next(iter(rows.values())) if c != 'arxiv_id']
+        self._upsert(session, Paper, list(rows.values()), ['arxiv_id'], update_columns)
+        
+        return len(rows)
+    
+    def get_watermark(self, category: str) -> Optional[datetime]:
+        """
+        获取分类的采集水位线
+        
+        Args:
+            category: arXiv分类，如 cs.CL
+        
+        Returns:
+            已采集论文的最新提交时间（UTC），从未采集返回None
+        """
+        with self.Session() as session:
+            state = session.get(HarvestState, category)
+            return state.watermark if state else None
+    
+    def ingest_harvest_page(self, category: str, papers: List[Dict]) -> Optional[datetime]:
+        """
+        写入一页采集结果并推进水位线
+        
+        论文与水位线在同一事务中提交，进程崩溃后从水位线续采不会遗漏；
+        重复抓取的论文由upsert去重
+        
+        Args:
+            category: arXiv分类
+            papers: 本页论文
+        
+        Returns:
+            推进后的水位线
+        """
+        published = [p for p in (self._parse_published(x.get('published', '')) for x in papers) if p]
+        
+        with self.Session() as session:
+            count = self._upsert_papers(session, papers)
+            
+            state = session.get(HarvestState, category)
+            if state is None:
+                state = HarvestState(category=category, watermark=datetime.min, harvested_count=0)
+                session.add(state)
+            
+            if published:
+                state.watermark = max(state.watermark, max(published))
+            state.harvested_count = (state.harvested_count or 0) + count
+            state.last_run_at = datetime.utcnow()
+            watermark = state.watermark
+            
+            session.commit()
+        
+        return watermark
+    
+    def get_coverage(self, query: str, days_back: int, max_results: int) -> Optional[SearchHistory]:
+        """
+        查询本地库是否覆盖该搜索
+        
+        满足以下条件视为覆盖：之前对同一规范化查询做过arXiv搜索，
+        时间范围不小于本次，且请求数量不小于本次（或之前的结果已取尽）
+        
+        Args:
+            query: 搜索关键词
+            days_back: 时间范围（天）
+            max_results: 需要的论文数
+        
+        Returns:
+            覆盖本次搜索的最近一条搜索记录，未覆盖返回None
+        """
+        normalized = self.normalize_query(query)
+        
+        with self.Session() as session:
+            history = session.execute(
+                select(SearchHistory)
+                .where(SearchHistory.query == normalized)
+                .where(SearchHistory.days_back >= days_back)
+                .where(
+                    (SearchHistory.max_results >= max_results)
+                    | (SearchHistory.result_count < SearchHistory.max_results)
+                )
+                .order_by(SearchHistory.searched_at.desc())
+                .limit(1)
+            ).scalar_one_or_none()
+            
+            if history is not None:
+                session.expunge(history)
+            
+            return history
+    
+    def record_search(
+        self,
+        query: str,
+        days_back: int,
+        max_results: int,
+        papers: List[Dict],
+        searched_at: datetime
+    ) -> int:
+        """
+        记录一次arXiv搜索：关联查询与论文，并追加搜索历史作为覆盖记录
+        
+        Args:
+            query: 搜索关键词
+            days_back: 时间范围（天）
+            max_results: 向arXiv请求的论文数
+            papers: arXiv返回的论文
+            searched_at: 本次arXiv请求开始的时间（UTC）
+        
+        Returns:
+            该查询在本地库中关联的论文总数
+        """
+        normalized = self.normalize_query(query)
+        links = {}
+        for paper in papers:
+            published = self._parse_published(paper.get('published', ''))
+            if paper.get('arxiv_id') and published is not None:
+                links[paper['arxiv_id']] = {
+                    'query': normalized,
+                    'arxiv_id': paper['arxiv_id'],
+                    'published': published,
+                }
+        
+        with self.Session() as session:
+            self._upsert(session, SearchResult, list(links.values()), ['query', 'arxiv_id'], [])
+            
+            total = session.execute(
+                select(func.count()).select_from(SearchResult).where(SearchResult.query == normalized)
+            ).scalar_one()
+            
+            session.add(SearchHistory(
+                query=normalized,
+                result_count=total,
+                days_back=days_back,
+                max_results=max_results,
+                searched_at=searched_at
+            ))
+            session.commit()
+        
+        return total
+    
+    def get_query_papers(self, query: str, max_results: int) -> List[Dict]:
+        """
+        按发布时间倒序返回本地库中该查询的论文
+        
+        Args:
+            query: 搜索关键词
+            max_results: 返回数量
+        
+        Returns:
+            论文列表
+        """
+        normalized = self.normalize_query(query)
+        
+        with self.Session() as session:
+            rows = session.execute(
+                select(Paper)
+                .join(SearchResult, SearchResult.arxiv_id == Paper.arxiv_id)
+                .where(SearchResult.query == normalized)
+                .order_by(SearchResult.published.desc())
+                .limit(max_results)
+            ).scalars().all()
+            
+            return [self._to_paper(row) for row in rows]
+    
+    @staticmethod
+    def build_fts_query(query: str) -> str:
+        """
+        将用户查询转换为FTS5查询表达式
+        
+        支持 "短语"、前缀 word*、以及大写的 AND/OR/NOT 运算符，
+        其余词语作为独立词项（隐式AND）并加引号，避免特殊字符造成语法错误
+        
+        Args:
+            query: 用户输入
+        
+        Returns:
+            FTS5 MATCH表达式，无有效词项时返回空字符串
+        """
+        terms = []
+        for token in re.findall(r'"[^"]*"|\S+', query):
+            if token in ('AND', 'OR', 'NOT'):
+                if terms and terms[-1] not in ('AND', 'OR', 'NOT'):
+                    terms.append(token)
+                continue
+            
+            is_prefix = token.endswith('*')
+            word = token.strip('"*').replace('"', ' ').strip()
+            if not word:
+                continue
+            
+            terms.append(f'"{word}"*' if is_prefix else f'"{word}"')
+        
+        while terms and terms[-1] in ('AND', 'OR', 'NOT'):
+            terms.pop()
+        
+        return ' '.join(terms)
+    
+    def search_local(
+        self,
+        query: str,
+        max_results: int = 100,
+        days_back: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        在本地论文库中全文搜索，按BM25相关度排序
+        
+        Args:
+            query: 搜索关键词，支持 "短语"、前缀 word* 和 AND/OR/NOT
+            max_results: 返回数量
+            days_back: 只搜索最近多少天发布的论文（可选）
+        
+        Returns:
+            论文列表，每篇附带 score（BM25，越小越相关）和 snippet（摘要高亮片段）
+        
+        Raises:
+            RuntimeError: 当前数据库不支持全文索引
+            ValueError: 查询语法错误
+        """
+        if not self.fts_enabled:
+            raise RuntimeError('本地全文搜索仅支持启用FTS5的SQLite数据库')
+        
+        match = self.build_fts_query(query)
+        if not match:
+            return []
+        
+        weights = ', '.join(str(w) for w in self.BM25_WEIGHTS)
+        params = {'match': match, 'limit': max_results}
+        
+        # 先在索引内取出最相关的rowid，再按主键回表，避免对所有匹配行做join。
+        # 日期过滤只对匹配到的行按主键查 published，而不是先列出时间窗口内的全部论文
+        date_join = date_filter = ''
+        if days_back:
+            date_join = 'JOIN papers ON papers.id = papers_fts.rowid'
+            date_filter = 'AND papers.published >= :cutoff'
+            params['cutoff'] = datetime.utcnow() - timedelta(days=days_back)
+        
+        sql = text(f"""
+            SELECT papers_fts.rowid AS rowid,
+                   bm25(papers_fts, {weights}) AS score,
+                   snippet(papers_fts, 1, '<mark>', '</mark>', '…', 32) AS snippet
+            FROM papers_fts {date_join}
+            WHERE papers_fts MATCH :match {date_filter}
+            ORDER BY score
+            LIMIT :limit
+        """)
+        if days_back:
+            sql = sql.bindparams(bindparam('cutoff', type_=DateTime))
+        
+        try:
+            with self.Session() as session:
+                hits = session.execute(sql, params).all()
+                rows = session.execute(
+                    select(Paper).where(Paper.id.in_([hit.rowid for hit in hits]))
+                ).scalars().all()
+                by_id = {row.id: row for row in rows}
+                
+                papers = []
+                for hit in hits:
+                    row = by_id.get(hit.rowid)
+                    if row is None:
+                        continue
+                    paper = self._to_paper(row)
+                    paper['score'] = round(hit.score, 4)
+                    paper['snippet'] = hit.snippet
+                    papers.append(paper)
+        except OperationalError as e:
+            raise ValueError(f'查询语法错误: {e.orig}') from e
+        
+        return papers
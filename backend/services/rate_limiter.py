@@ -0,0 +1,144 @@
+"""
+AI供应商限流模块
+按供应商用令牌桶同时限制每分钟请求数和每分钟token数，同一供应商的所有调用共享限额
+"""
+from typing import Dict, Optional
+import threading
+import time
+
+
+class TokenBucket:
+    """令牌桶：容量为每分钟限额，令牌按速率连续补充"""
+    
+    def __init__(self, per_minute: float):
+        """
+        初始化令牌桶
+        
+        Args:
+            per_minute: 每分钟补充的令牌数（也是桶的容量）
+        """
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+    
+    def acquire(self, amount: float = 1, timeout: Optional[float] = None) -> bool:
+        """
+        取出令牌，不足时等待补充
+        
+        Args:
+            amount: 令牌数，超过容量时按容量计算（否则永远无法满足）
+            timeout: 最长等待秒数，None表示一直等待
+        
+        Returns:
+            是否取到令牌（超时返回False）
+        """
+        amount = min(amount, self.capacity)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return True
+                wait = (amount - self.tokens) / self.rate
+            
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            
+            time.sleep(wait)
+    
+    def refund(self, amount: float):
+        """退还取出但未使用的令牌（不超过容量）"""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+    
+    def consume(self, amount: float):
+        """直接扣除令牌（允许欠账），用于请求完成后按实际用量补扣"""
+        with self._lock:
+            self._refill()
+            self.tokens -= amount
+
+
+class ProviderRateLimiter:
+    """单个供应商的请求数和token数限流"""
+    
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0):
+        """
+        初始化限流器
+        
+        Args:
+            requests_per_minute: 每分钟请求数上限，0表示不限制
+            tokens_per_minute: 每分钟token数上限，0表示不限制
+        """
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+    
+    def acquire(self, tokens: int, timeout: Optional[float] = None) -> bool:
+        """
+        为一次请求取得限额
+        
+        Args:
+            tokens: 预计的提示词token数
+            timeout: 最长等待秒数
+        
+        Returns:
+            是否取得限额（失败时不占用任何限额）
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        
+        if self.requests and not self.requests.acquire(1, timeout):
+            return False
+        
+        if self.tokens:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not self.tokens.acquire(tokens, remaining):
+                # 请求没有发出，退还已取出的请求数令牌
+                if self.requests:
+                    self.requests.refund(1)
+                return False
+        
+        return True
+    
+    def record_output(self, tokens: int):
+        """按响应的token数补扣"""
+        if self.tokens and tokens:
+            self.tokens.consume(tokens)
+
+
+_limiters: Dict[str, ProviderRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_provider_limiter(
+    provider: str,
+    requests_per_minute: float = 0,
+    tokens_per_minute: float = 0
+) -> ProviderRateLimiter:
+    """
+    获取供应商的共享限流器，同一供应商只在第一次调用时按参数创建
+    
+    Args:
+        provider: 供应商名称
+        requests_per_minute: 每分钟请求数上限
+        tokens_per_minute: 每分钟token数上限
+    
+    Returns:
+        限流器
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            limiter = _limiters[provider] = ProviderRateLimiter(requests_per_minute, tokens_per_minute)
+        return limiter
@@ -0,0 +1,143 @@
+"""
+外部调用容错模块
+提供熔断器和带随机抖动的指数退避，用于AI供应商等不稳定的外部服务
+"""
+from typing import Dict, Optional, Tuple
+import random
+import threading
+import time
+
+
+class CircuitBreaker:
+    """
+    熔断器
+    
+    连续失败达到阈值后打开，打开期间直接拒绝调用；reset_timeout 秒后进入半开状态，
+    只放行一个探测调用，成功则关闭，失败则重新打开
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60):
+        """
+        初始化熔断器
+        
+        Args:
+            failure_threshold: 连续失败多少次后打开
+            reset_timeout: 打开后多少秒进入半开状态
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._probe_token = 0
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+    
+    def _state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+    
+    def acquire(self) -> Tuple[bool, Optional[int]]:
+        """
+        申请本次调用（半开状态下只允许一个探测调用）
+        
+        Returns:
+            (是否允许, 探测令牌)，只有获得半开探测名额的调用拿到令牌，其余情况令牌为None
+        """
+        with self._lock:
+            state = self._state()
+            if state == self.CLOSED:
+                return True, None
+            if state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                self._probe_token += 1
+                return True, self._probe_token
+            return False, None
+    
+    def allow(self) -> bool:
+        """是否允许本次调用（半开状态下只允许一个探测调用）"""
+        return self.acquire()[0]
+    
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    print(f"[WARNING] Circuit opened after {self.failures} consecutive failures")
+                self.opened_at = time.monotonic()
+            self._probing = False
+    
+    def release_probe(self, token: Optional[int]):
+        """
+        放弃半开状态下的探测调用（因限流等待或总耗时超限等非供应商原因结束，不计成功也不计失败），下一个调用可以重新探测
+        
+        Args:
+            token: acquire() 返回的探测令牌；不是当前探测的令牌时（None、探测已结束或已被别的调用重新获得）不做任何事
+        """
+        with self._lock:
+            if self._probing and token == self._probe_token:
+                self._probing = False
+    
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {'state': self._state(), 'consecutive_failures': self.failures}
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 8.0) -> float:
+    """
+    带完全随机抖动的指数退避时间
+    
+    Args:
+        attempt: 第几次重试（从0开始）
+        base: 基础等待秒数
+        cap: 最长等待秒数
+    
+    Returns:
+        在 [0, min(cap, base * 2^attempt)] 内均匀随机的等待秒数
+    """
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str, failure_threshold: int = 5, reset_timeout: float = 60) -> CircuitBreaker:
+    """
+    获取共享的熔断器，同一名称只在第一次调用时按参数创建
+    
+    Args:
+        name: 熔断器名称（如供应商名称）
+        failure_threshold: 连续失败阈值
+        reset_timeout: 打开后进入半开状态的秒数
+    
+    Returns:
+        熔断器
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(failure_threshold, reset_timeout)
+        return breaker
+
+
+def remaining_time(deadline: Optional[float]) -> Optional[float]:
+    """距离截止时间（time.monotonic()）的剩余秒数，None表示没有截止时间"""
+    return None if deadline is None else deadline - time.monotonic()
@@ -0,0 +1,189 @@
+"""
+单飞（single-flight）请求合并模块
+相同键的并发计算只执行一次，其余调用方等待并共享同一个结果。
+进程内通过线程事件合并，同一主机的多个工作进程之间通过文件锁合并
+"""
+from typing import Any, Callable, Dict, Optional
+import hashlib
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # Windows 下没有 fcntl，只做进程内合并
+    fcntl = None
+
+
+class SingleFlightError(Exception):
+    """其他进程中的计算失败"""
+
+
+class SingleFlightTimeout(TimeoutError):
+    """等待其他调用方的计算结果超时"""
+
+
+class _Call:
+    """一次进行中的计算"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    单飞请求合并器
+    
+    同一进程内，第一个调用方（leader）执行计算，并发的调用方等待它的结果或异常。
+    配置了锁目录时，leader 在计算前还要获取该键的文件锁：拿不到锁说明其他进程正在计算，
+    等锁释放后先调用 check() 读取对方写入的结果（通常是查缓存），读不到才自己计算
+    """
+    
+    # 锁文件按键的哈希分片，数量固定，不随查询数增长
+    LOCK_STRIPES = 1024
+    
+    def __init__(self, lock_dir: Optional[str] = None, timeout: float = 120, poll_interval: float = 0.1):
+        """
+        初始化合并器
+        
+        Args:
+            lock_dir: 跨进程文件锁目录，None表示只在进程内合并
+            timeout: 等待其他调用方结果的最长秒数
+            poll_interval: 等待文件锁时的轮询间隔（秒）
+        """
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.lock_dir = lock_dir if fcntl else None
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        
+        if lock_dir and not fcntl:
+            print("[WARNING] fcntl not available, single-flight only coalesces within this process")
+        if self.lock_dir:
+            os.makedirs(self.lock_dir, exist_ok=True)
+    
+    def do(self, key: str, fn: Callable[[], Any], check: Optional[Callable[[], Any]] = None) -> Any:
+        """
+        执行或等待键对应的计算
+        
+        Args:
+            key: 合并键（通常是规范化的缓存键）
+            fn: 计算函数
+            check: 等到其他进程释放锁后调用，返回非None时作为结果，不再计算
+        
+        Returns:
+            计算结果
+        
+        Raises:
+            SingleFlightTimeout: 等待超时
+            SingleFlightError: 其他进程中的计算失败
+            以及 fn 自身抛出的异常（所有等待者都会收到同一个异常）
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+        
+        if not leader:
+            if not call.done.wait(self.timeout):
+                raise SingleFlightTimeout(f'Timed out waiting for in-flight computation of {key}')
+            if call.error is not None:
+                raise call.error
+            return call.result
+        
+        try:
+            call.result = self._run(key, fn, check)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        
+        return call.result
+    
+    def in_flight(self) -> int:
+        """进程内正在进行的计算数"""
+        with self._lock:
+            return len(self._calls)
+    
+    def _run(self, key: str, fn: Callable[[], Any], check: Optional[Callable[[], Any]]) -> Any:
+        if not self.lock_dir:
+            return fn()
+        
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        stripe = int(digest[:8], 16) % self.LOCK_STRIPES
+        lock_path = os.path.join(self.lock_dir, f'{stripe:04d}.lock')
+        error_path = os.path.join(self.lock_dir, f'{digest}.err')
+        
+        with open(lock_path, 'a') as lock_file:
+            waited_since = self._acquire(lock_file, key)
+            try:
+                if waited_since is not None:
+                    # 其他进程刚刚完成了同一个计算（或同一分片上的其他计算）
+                    self._raise_remote_error(error_path, waited_since)
+                    if check:
+                        result = check()
+                        if result is not None:
+                            return result
+                
+                self._remove(error_path)
+                try:
+                    return fn()
+                except Exception as e:
+                    # 记录失败，让正在等锁的其他进程收到同样的错误而不是各自重试
+                    self._write_error(error_path, e)
+                    raise
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    def _acquire(self, lock_file, key: str) -> Optional[float]:
+        """获取文件锁，立即拿到返回None，否则返回开始等待的时间"""
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return None
+        except BlockingIOError:
+            pass
+        
+        waited_since = time.time()
+        deadline = time.monotonic() + self.timeout
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return waited_since
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    raise SingleFlightTimeout(f'Timed out waiting for another process computing {key}')
+    
+    @staticmethod
+    def _raise_remote_error(error_path: str, waited_since: float):
+        try:
+            if os.path.getmtime(error_path) < waited_since:
+                return
+            with open(error_path, 'r', encoding='utf-8') as f:
+                message = f.read()
+        except OSError:
+            return
+        raise SingleFlightError(message)
+    
+    @staticmethod
+    def _write_error(error_path: str, error: Exception):
+        try:
+            with open(error_path, 'w', encoding='utf-8') as f:
+                f.write(f'{type(error).__name__}: {error}')
+        except OSError as e:
+            print(f"[ERROR] Could not record single-flight failure: {e}")
+    
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,139 @@
+"""
+提示词token估算模块
+不依赖具体供应商的分词器，按字符类别粗略估算token数，用于限流和控制提示词长度；
+并提供按预算截断、去重论文摘要的工具
+"""
+from typing import Dict, List, Tuple
+import re
+
+
+# 中日韩字符大约每个字一个token，其余文本大约每4个字符一个token
+_CJK_PATTERN = re.compile(r'[\u3000-\u303f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]')
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    估算文本的token数
+    
+    Args:
+        text: 文本
+    
+    Returns:
+        估算的token数（偏保守）
+    """
+    if not text:
+        return 0
+    
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int, ellipsis: str = '…') -> str:
+    """
+    把文本截断到不超过 max_tokens 个token
+    
+    尽量在句子或单词边界处截断，截断时在末尾加上省略号
+    
+    Args:
+        text: 文本
+        max_tokens: token上限
+        ellipsis: 截断标记
+        
+    Returns:
+        截断后的文本（未超出时原样返回）
+    """
+    text = ' '.join((text or '').split())
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    if max_tokens <= estimate_tokens(ellipsis):
+        return ''
+    
+    # 二分查找不超出预算的最长前缀
+    limit = max_tokens - estimate_tokens(ellipsis)
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(text[:mid]) <= limit:
+            low = mid
+        else:
+            high = mid - 1
+    
+    prefix = text[:low]
+    # 边界离截断点不远时退回到边界，避免截断在单词中间
+    boundary = max(prefix.rfind(mark) for mark in ('. ', '。', '；', '; ', ', ', '，', ' '))
+    if boundary >= low * 0.8:
+        prefix = prefix[:boundary + 1]
+    return prefix.rstrip(' ,;，；') + ellipsis
+
+
+def _fingerprint(text: str) -> str:
+    """去掉大小写、标点和空白差异后的文本，用于识别重复内容"""
+    return ' '.join(re.findall(r'\w+', (text or '').lower()))
+
+
+def fit_papers_to_budget(
+    papers: List[Dict],
+    budget: int,
+    max_abstract_tokens: int = 200,
+    min_abstract_tokens: int = 12
+) -> Tuple[List[Dict], int]:
+    """
+    在token预算内放入尽量多的论文标题和摘要
+    
+    先按arxiv_id（忽略版本号）、标题和摘要去重；标题按顺序优先放入，放不下的论文计为省略；
+    剩余预算在摘要之间平均分配（短摘要用不完的份额让给其他摘要），
+    每篇不超过 max_abstract_tokens，分到的预算少于 min_abstract_tokens 时只保留标题
+    
+    Args:
+        papers: 论文列表（按重要性排序），使用 arxiv_id、title 和 summary 字段
+        budget: 标题和摘要的总token预算
+        max_abstract_tokens: 每篇摘要的token上限
+        min_abstract_tokens: 摘要的最小token数
+        
+    Returns:
+        ([{'title': 标题, 'abstract': 截断后的摘要（可能为空）}], 因预算不足省略的论文数)
+    """
+    unique = []
+    seen = set()
+    for paper in papers:
+        title = ' '.join(paper.get('title', '').split())
+        abstract = paper.get('summary', '')
+        keys = {('title', _fingerprint(title)), ('abstract', _fingerprint(abstract))}
+        arxiv_id = re.sub(r'v\d+$', '', paper.get('arxiv_id') or '')
+        if arxiv_id:
+            keys.add(('id', arxiv_id))
+        keys = {key for key in keys if key[1]}
+        if keys & seen:
+            continue
+        seen |= keys
+        unique.append((title, abstract))
+    
+    # 标题按顺序放入，每条再预留几个token给编号和换行
+    entries, remaining = [], budget
+    for title, abstract in unique:
+        cost = estimate_tokens(title) + 4
+        if cost > remaining:
+            break
+        remaining -= cost
+        entries.append((title, abstract))
+    omitted = len(unique) - len(entries)
+    
+    # 摘要按需要从少到多分配，需要少的先拿满，剩余的再平均分给其他摘要
+    needs = [min(estimate_tokens(abstract) + 2, max_abstract_tokens) for _, abstract in entries]
+    allocation = [0] * len(entries)
+    left = len(entries)
+    for index in sorted(range(len(entries)), key=lambda i: needs[i]):
+        share = min(needs[index], remaining // left)
+        allocation[index] = share
+        remaining -= share
+        left -= 1
+    
+    fitted = []
+    for (title, abstract), tokens in zip(entries, allocation):
+        if tokens >= min_abstract_tokens:
+            abstract = truncate_to_tokens(abstract, tokens - 2)
+        else:
+            abstract = ''
+        fitted.append({'title': title, 'abstract': abstract})
+    
+    return fitted, omitted
@@ -50,7 +50,7 @@ def test_qwen3_basic():
         # Test simple prompt
         print("\n[INFO] Testing simple API call...")
         test_prompt = "请用一句话用中文解释什么是机器学习。"
-        response = service._generate_content(test_prompt)
+        response = service.generate(test_prompt)
         
         if response:
             print(f"[✓] API call successful!")
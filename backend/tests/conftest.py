@@ -0,0 +1,141 @@
+"""
+测试公共配置：把 backend 目录和项目根目录（database 包）加入导入路径，与应用中的导入方式一致；
+模拟arXiv API的本地Atom feed服务，以及使用临时目录的 Flask 应用
+"""
+import importlib
+import os
+import re
+import sys
+import threading
+import urllib.parse
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(BACKEND_DIR))
+
+
+FEED_HEAD = """<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom"
+      xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/"
+      xmlns:arxiv="http://arxiv.org/schemas/atom">
+  <opensearch:totalResults>{total}</opensearch:totalResults>
+"""
+
+ENTRY = """  <entry>
+    <id>http://arxiv.org/abs/{arxiv_id}</id>
+    <published>{published}</published>
+    <title>Paper {arxiv_id}</title>
+    <summary>Abstract of {arxiv_id}.</summary>
+    <author><name>A. Author</name></author>
+    <arxiv:primary_category term="cs.CL"/>
+  </entry>
+"""
+
+
+class FeedServer:
+    """按 search_query 中的 submittedDate 范围和 start/max_results 分页返回论文的本地arXiv API"""
+    
+    def __init__(self):
+        self.papers = []
+        self.fail_starts = set()
+        self.flaky = {}  # start -> 依次返回的 (状态码, Retry-After) 列表，用完后正常返回
+        self.requests = []
+        
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                params = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(self.path).query))
+                server.requests.append(params)
+                start = int(params.get('start', 0))
+                if start in server.fail_starts:
+                    self.send_error(500)
+                    return
+                if server.flaky.get(start):
+                    status, retry_after = server.flaky[start].pop(0)
+                    self.send_response(status)
+                    if retry_after is not None:
+                        self.send_header('Retry-After', retry_after)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                
+                body = server.render(params.get('search_query', ''), start, int(params.get('max_results', 10)))
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/atom+xml')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, *args):
+                pass
+        
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_address[1]}/api/query'
+    
+    def render(self, search_query: str, start: int, size: int) -> bytes:
+        since = re.search(r'submittedDate:\[(\d{12}) TO', search_query)
+        matched = [
+            (arxiv_id, published) for arxiv_id, published in self.papers
+            if since is None or published.strftime('%Y%m%d%H%M') >= since.group(1)
+        ]
+        entries = ''.join(
+            ENTRY.format(arxiv_id=arxiv_id, published=published.strftime('%Y-%m-%dT%H:%M:%SZ'))
+            for arxiv_id, published in matched[start:start + size]
+        )
+        return (FEED_HEAD.format(total=len(matched)) + entries + '</feed>\n').encode('utf-8')
+    
+    def add_papers(self, count: int):
+        """追加 count 篇按提交时间升序、间隔3小时的论文"""
+        now = datetime.utcnow().replace(second=0, microsecond=0)
+        offset = len(self.papers)
+        for i in range(offset, offset + count):
+            self.papers.append((f'2401.{i:05d}v1', now - timedelta(hours=3 * (40 - i))))
+
+
+@pytest.fixture
+def feed_server():
+    server = FeedServer()
+    thread = threading.Thread(target=server.httpd.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.httpd.shutdown()
+    server.httpd.server_close()
+
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch, feed_server):
+    """
+    重新导入 app 模块：缓存和数据库放在临时目录，arXiv API 指向本地feed服务，
+    不启动后台清理和采集，只配置一个不重试的 qwen3 供应商（测试中替换 _call_provider）
+    """
+    env = {
+        'CACHE_DIR': str(tmp_path / 'cache'),
+        'DATABASE_URL': f"sqlite:///{tmp_path / 'papers.db'}",
+        'ARXIV_BASE_URL': feed_server.url,
+        'ARXIV_REQUEST_INTERVAL': '0',
+        'ARXIV_MAX_RETRIES': '0',
+        'CACHE_SWEEP_INTERVAL_MINUTES': '0',
+        'HARVEST_ENABLED': 'false',
+        'AI_PROVIDER': 'qwen3',
+        'QWEN3_API_KEY': 'test',
+        'AI_FALLBACK_PROVIDERS': '',
+        'AI_LOCAL_FALLBACK': 'false',
+        'AI_MAX_RETRIES': '0',
+        'AI_REQUESTS_PER_MINUTE': '0',
+        'AI_TOKENS_PER_MINUTE': '0',
+    }
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    for name in ('app', 'config'):
+        sys.modules.pop(name, None)
+    
+    module = importlib.import_module('app')
+    yield module
+    
+    for name in ('app', 'config'):
+        sys.modules.pop(name, None)
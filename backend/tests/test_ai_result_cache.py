@@ -0,0 +1,149 @@
+"""
+AI结果缓存测试：结果按实际生成它的供应商/模型寻址和标记
+"""
+import pytest
+
+from services.ai_service import AIService, AIServiceError
+from services.analysis_service import PaperAnalysisService
+from services.cache_service import CacheService
+from services.resilience import CircuitBreaker
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return CacheService(cache_dir=str(tmp_path), memory_max_mb=0)
+
+
+def make_chain(cache, monkeypatch, primary_up=False):
+    """主供应商 qwen3（默认不可用）和备用供应商 gemini"""
+    fallback = AIService(api_key='test', model='gemini-test', provider='gemini', result_cache=cache, max_retries=0)
+    service = AIService(
+        api_key='test', model='qwen3-test', provider='qwen3', result_cache=cache, max_retries=0, fallbacks=[fallback]
+    )
+    for chained in service.chain:
+        chained.breaker = CircuitBreaker(failure_threshold=100, reset_timeout=60)
+    
+    calls = []
+    
+    def primary(prompt, deadline):
+        calls.append('qwen3')
+        if not primary_up:
+            raise AIServiceError('HTTP 503')
+        return 'primary summary'
+    
+    def secondary(prompt, deadline):
+        calls.append('gemini')
+        return 'fallback summary'
+    
+    monkeypatch.setattr(service, '_call_provider', primary)
+    monkeypatch.setattr(fallback, '_call_provider', secondary)
+    return service, fallback, calls
+
+
+def test_fallback_result_is_keyed_by_serving_model(cache, monkeypatch):
+    service, fallback, calls = make_chain(cache, monkeypatch)
+    
+    assert service.summarize_paper('Title', 'Abstract.') == 'fallback summary'
+    assert cache.get(service._summary_key('Title', 'Abstract.', 200)) is None
+    assert cache.get(fallback._summary_key('Title', 'Abstract.', 200)) == {'summary': 'fallback summary'}
+    
+    # 备用供应商的结果同样可以命中，不再调用AI
+    calls.clear()
+    assert service.summarize_paper('Title', 'Abstract.') == 'fallback summary'
+    assert calls == []
+    
+    # 按实际生成结果的模型失效
+    assert cache.invalidate_tag('model:gemini/gemini-test') == 1
+    assert cache.invalidate_tag('model:qwen3/qwen3-test') == 0
+
+
+def test_batch_results_tagged_by_serving_model(cache, monkeypatch):
+    service, fallback, _ = make_chain(cache, monkeypatch)
+    papers = [{'arxiv_id': '2401.00001', 'title': 'A', 'summary': 'First.'}]
+    
+    results = service.batch_summarize(papers)
+    assert results[0]['summary'] == 'fallback summary'
+    assert cache.get(fallback._summary_key('A', 'First.', 200)) is not None
+    assert cache.get(service._summary_key('A', 'First.', 200)) is None
+
+
+def test_primary_result_preferred(cache, monkeypatch):
+    service, _, calls = make_chain(cache, monkeypatch, primary_up=True)
+    assert service.summarize_paper('Title', 'Abstract.') == 'primary summary'
+    assert calls == ['qwen3']
+    assert cache.invalidate_tag('model:qwen3/qwen3-test') == 1
+
+
+def test_local_fallback_is_not_cached(cache, monkeypatch):
+    service, fallback, _ = make_chain(cache, monkeypatch)
+    service.local_fallback = True
+    
+    def down(prompt, deadline):
+        raise AIServiceError('HTTP 503')
+    
+    monkeypatch.setattr(fallback, '_call_provider', down)
+    abstract = 'First sentence. Second sentence.'
+    
+    assert service.summarize_paper('Title', abstract, 20) == 'First sentence.'
+    for chained in service.chain:
+        assert cache.get(chained._summary_key('Title', abstract, 20)) is None
+
+
+def test_quarter_summary_keyed_by_serving_model(cache, monkeypatch):
+    service, _, calls = make_chain(cache, monkeypatch)
+    analysis = PaperAnalysisService(ai_service=service, cache_service=cache)
+    papers = [{'arxiv_id': '2301.00001', 'title': 'A', 'summary': 'x', 'published': '2023-02-01T00:00:00'}]
+    
+    assert analysis.generate_quarterly_summaries(papers) == {'2023-Q1': 'fallback summary'}
+    assert cache.invalidate_tag('model:qwen3/qwen3-test') == 0
+    
+    calls.clear()
+    assert analysis.generate_quarterly_summaries(papers) == {'2023-Q1': 'fallback summary'}
+    assert calls == []
+    
+    assert cache.invalidate_tag('model:gemini/gemini-test') == 1
+
+
+class TestContentAddressing:
+
+    def test_key_ignores_whitespace_but_not_case(self):
+        service = AIService(api_key='test', model='m', provider='qwen3')
+        key = service._summary_key('A  Title', 'Some\n abstract.', 200)
+        
+        assert key == service._summary_key(' A Title ', 'Some abstract.', 200)
+        assert key != service._summary_key('a title', 'Some abstract.', 200)
+        assert key != service._summary_key('A Title', 'Some abstract.', 100)
+    
+    def test_key_depends_on_model_and_prompt_version(self, monkeypatch):
+        service = AIService(api_key='test', model='m', provider='qwen3')
+        other_model = AIService(api_key='test', model='m2', provider='qwen3')
+        key = service._summary_key('T', 'A', 200)
+        
+        assert key != other_model._summary_key('T', 'A', 200)
+        monkeypatch.setattr(AIService, 'SUMMARY_PROMPT_VERSION', AIService.SUMMARY_PROMPT_VERSION + 1)
+        assert key != service._summary_key('T', 'A', 200)
+    
+    def test_batch_reuses_cached_summaries(self, cache, monkeypatch):
+        service, _, calls = make_chain(cache, monkeypatch, primary_up=True)
+        papers = [
+            {'arxiv_id': '2401.00001', 'title': 'A', 'summary': 'First.'},
+            {'arxiv_id': '2401.00002', 'title': 'B', 'summary': 'Second.'},
+        ]
+        
+        first = service.batch_summarize(papers)
+        assert [result['cached'] for result in first] == [False, False]
+        assert len(calls) == 2
+        
+        # 同一篇论文出现在另一次搜索中（版本号不同）也命中缓存
+        calls.clear()
+        second = service.batch_summarize([{**papers[0], 'arxiv_id': '2401.00001v2'}, papers[1]])
+        assert [result['cached'] for result in second] == [True, True]
+        assert [result['summary'] for result in second] == ['primary summary', 'primary summary']
+        assert calls == []
+    
+    def test_keywords_are_cached(self, cache, monkeypatch):
+        service, _, calls = make_chain(cache, monkeypatch, primary_up=True)
+        
+        assert service.extract_keywords('Abstract.') == ['primary summary']
+        assert service.extract_keywords('Abstract.') == ['primary summary']
+        assert calls == ['qwen3']
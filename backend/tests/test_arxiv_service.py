@@ -0,0 +1,69 @@
+"""
+arXiv服务测试：请求重试（经过节流器、遵守Retry-After）和分页失败处理
+"""
+import time
+
+import pytest
+import requests
+
+from services.arxiv_service import ArxivService
+
+
+def make_service(feed_server, **options):
+    options.setdefault('request_interval', 0)
+    options.setdefault('retry_backoff', 0.01)
+    return ArxivService(base_url=feed_server.url, page_size=2, timeout=5, **options)
+
+
+def test_retries_server_errors(feed_server):
+    feed_server.add_papers(2)
+    feed_server.flaky[0] = [(503, None), (502, None)]
+    
+    papers = make_service(feed_server, max_retries=2).search_papers('llm', max_results=2)
+    
+    assert len(papers) == 2
+    assert len(feed_server.requests) == 3
+
+
+def test_gives_up_after_max_retries(feed_server):
+    feed_server.add_papers(2)
+    feed_server.fail_starts.add(0)
+    
+    with pytest.raises(requests.exceptions.HTTPError):
+        make_service(feed_server, max_retries=1).search_papers('llm', max_results=2, raise_errors=True)
+    assert len(feed_server.requests) == 2
+
+
+def test_retry_honours_retry_after(feed_server):
+    feed_server.add_papers(2)
+    feed_server.flaky[0] = [(429, '0.3')]
+    
+    started = time.monotonic()
+    papers = make_service(feed_server, max_retries=1).search_papers('llm', max_results=2)
+    
+    assert len(papers) == 2
+    assert time.monotonic() - started >= 0.3
+
+
+def test_retry_goes_through_throttle(feed_server):
+    feed_server.add_papers(2)
+    feed_server.flaky[0] = [(503, None)]
+    service = make_service(feed_server, max_retries=1, retry_backoff=0, request_interval=0.3)
+    
+    started = time.monotonic()
+    service.search_papers('llm', max_results=2)
+    
+    assert time.monotonic() - started >= 0.3
+
+
+def test_failed_middle_page_stops_pagination(feed_server):
+    feed_server.add_papers(6)
+    feed_server.fail_starts.add(2)
+    service = make_service(feed_server, max_retries=0, max_concurrent_pages=1)
+    
+    # 第二页失败：不返回跳过缺页后的第三页
+    papers = service.search_papers('llm', max_results=6)
+    assert [paper['arxiv_id'] for paper in papers] == [arxiv_id for arxiv_id, _ in feed_server.papers[:2]]
+    
+    with pytest.raises(requests.exceptions.HTTPError):
+        service.search_papers('llm', max_results=6, raise_errors=True)
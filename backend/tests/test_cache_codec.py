@@ -0,0 +1,38 @@
+"""
+缓存编解码测试：压缩格式往返、旧版JSON兼容以及 zstd 不可用时的回退
+"""
+import json
+
+import pytest
+
+from services import cache_codec
+from services.cache_codec import CacheCodec
+
+
+DATA = {'papers': [{'title': 'Graph Neural Networks', 'abstract': 'message passing ' * 50}]}
+
+
+@pytest.mark.parametrize('codec', ['none', 'zlib', 'lzma'])
+def test_round_trip(codec):
+    blob = CacheCodec(codec).encode(DATA)
+    
+    assert blob.startswith(CacheCodec.MAGIC)
+    assert CacheCodec(codec).decode(blob) == DATA
+
+
+def test_decodes_legacy_json():
+    codec = CacheCodec()
+    
+    assert codec.decode(json.dumps(DATA)) == DATA
+    assert codec.decode(json.dumps(DATA).encode('utf-8')) == DATA
+
+
+def test_zstd_fallback_clamps_level(monkeypatch, capsys):
+    monkeypatch.setattr(cache_codec, 'zstandard', None)
+    
+    codec = CacheCodec('zstd', 19)
+    
+    assert codec.codec == 'zlib'
+    assert codec.level == 9
+    assert '[WARNING]' in capsys.readouterr().out
+    assert codec.decode(codec.encode(DATA)) == DATA
@@ -0,0 +1,73 @@
+"""
+缓存失效测试：标签、键前缀和命名空间版本，两种存储后端行为一致
+"""
+import pytest
+
+from services.cache_service import CacheService
+
+
+@pytest.fixture(params=['sqlite', 'file'])
+def cache(request, tmp_path):
+    return CacheService(cache_dir=str(tmp_path), backend=request.param, memory_max_mb=1)
+
+
+def fill(cache):
+    cache.set('search:query=llm&days=30', {'n': 1}, tags=['query:llm', 'model:a'])
+    cache.set('search:query=llm&days=90', {'n': 2}, tags=['query:llm', 'model:b'])
+    cache.set('search:query=rag&days=30', {'n': 3}, tags=['query:rag', 'model:a'])
+    cache.set('paper:2401.00001', {'n': 4})
+
+
+def test_invalidate_tag(cache):
+    fill(cache)
+    
+    assert cache.invalidate_tag('model:a') == 2
+    assert cache.get('search:query=llm&days=30') is None
+    assert cache.get('search:query=rag&days=30') is None
+    assert cache.get('search:query=llm&days=90') == {'n': 2}
+    assert cache.invalidate_tag('model:a') == 0
+    assert cache.invalidate_tag('unknown') == 0
+
+
+def test_invalidate_prefix(cache):
+    fill(cache)
+    
+    assert cache.invalidate_prefix('search:query=llm') == 2
+    assert cache.get('search:query=llm&days=30') is None
+    assert cache.get('search:query=rag&days=30') == {'n': 3}
+    assert cache.get('paper:2401.00001') == {'n': 4}
+
+
+def test_tag_count_after_prefix_invalidation(cache):
+    fill(cache)
+    
+    cache.invalidate_prefix('search:query=llm')
+    assert cache.invalidate_tag('query:llm') == 0
+    assert cache.invalidate_tag('model:a') == 1
+
+
+def test_bump_namespace_hides_entries_and_sweep_reclaims(cache):
+    fill(cache)
+    
+    assert cache.bump_namespace('search') == 1
+    assert cache.get('search:query=llm&days=30') is None
+    assert cache.get('paper:2401.00001') == {'n': 4}
+    
+    cache.set('search:query=llm&days=30', {'n': 5})
+    assert cache.get('search:query=llm&days=30') == {'n': 5}
+    
+    report = cache.sweep()
+    assert report['error'] is None
+    assert report['old_versions'] == 3
+    assert cache.get('search:query=llm&days=30') == {'n': 5}
+
+
+def test_invalidation_clears_other_process_memory_tier(tmp_path):
+    worker_a = CacheService(cache_dir=str(tmp_path), memory_max_mb=1, namespace_refresh_seconds=0)
+    worker_b = CacheService(cache_dir=str(tmp_path), memory_max_mb=1, namespace_refresh_seconds=0)
+    
+    worker_a.set('search:query=llm', {'n': 1}, tags=['query:llm'])
+    assert worker_a.get('search:query=llm') == {'n': 1}
+    
+    assert worker_b.invalidate_tag('query:llm') == 1
+    assert worker_a.get('search:query=llm') is None
@@ -0,0 +1,162 @@
+"""
+缓存服务测试：存储后端、内存层以及多个进程（多个 CacheService 实例）共享同一存储时的一致性
+"""
+import json
+import os
+import time
+
+import pytest
+
+from services.cache_service import CacheService, make_cache_key
+
+
+@pytest.fixture(params=['sqlite', 'file'])
+def backend(request):
+    return request.param
+
+
+def make_cache(tmp_path, backend, **options):
+    return CacheService(cache_dir=str(tmp_path), backend=backend, **options)
+
+
+def test_make_cache_key_is_canonical():
+    assert make_cache_key('search', query='  Machine   Learning ', days=30) == \
+        make_cache_key('search', days=30, query='machine learning')
+    assert make_cache_key('search', query='x' * 500).startswith('search:sha256=')
+
+
+@pytest.mark.parametrize('memory_max_mb', [0, 1])
+def test_set_get_delete(tmp_path, backend, memory_max_mb):
+    cache = make_cache(tmp_path, backend, memory_max_mb=memory_max_mb)
+    
+    assert cache.get('search:q=a') is None
+    assert cache.set('search:q=a', {'papers': [1, 2]})
+    assert cache.get('search:q=a') == {'papers': [1, 2]}
+    
+    assert cache.delete('search:q=a')
+    assert cache.get('search:q=a') is None
+
+
+def test_memory_tier_serves_hits(tmp_path, backend):
+    cache = make_cache(tmp_path, backend, memory_max_mb=1)
+    cache.set('search:q=a', {'n': 1})
+    
+    assert cache.get('search:q=a') == {'n': 1}
+    namespace = cache.metrics.snapshot()['namespaces']['search']
+    assert namespace['memory_hits'] == 1
+
+
+def test_ttl_expiry(tmp_path, backend):
+    cache = make_cache(tmp_path, backend, memory_max_mb=1)
+    cache.set('search:q=a', {'n': 1}, ttl=0)
+    cache.set('search:q=b', {'n': 2}, ttl=3600)
+    assert cache.get('search:q=a') is None
+    assert cache.get('search:q=b') == {'n': 2}
+
+
+def test_ttl_survives_other_process(tmp_path, backend):
+    # 单独的ttl随条目持久化，另一个实例读取或清理时同样生效
+    make_cache(tmp_path, backend).set('search:q=a', {'n': 1}, ttl=0.05)
+    reader = make_cache(tmp_path, backend)
+    assert reader.backend.get_created_at(reader._physical_key('search:q=a')) is not None
+    
+    time.sleep(0.06)
+    assert reader.get('search:q=a') is None
+    
+    make_cache(tmp_path, backend).set('search:q=b', {'n': 2}, ttl=0.05)
+    time.sleep(0.06)
+    assert reader.backend.purge_expired() == 1
+
+
+def test_file_backend_reads_legacy_entries(tmp_path):
+    cache = make_cache(tmp_path, 'file')
+    path = cache.backend._get_cache_path(cache._physical_key('search:q=a'))
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'n': 1}, f)
+    
+    assert cache.get('search:q=a') == {'n': 1}
+
+
+def test_file_backend_access_keeps_mtime(tmp_path):
+    cache = make_cache(tmp_path, 'file')
+    cache.set('search:q=a', {'n': 1})
+    key = cache._physical_key('search:q=a')
+    path = cache.backend._get_cache_path(key)
+    mtime_ns = os.stat(path).st_mtime_ns
+    
+    cache.backend.record_access({key: (time.time() + 10, 1)})
+    
+    assert os.stat(path).st_mtime_ns == mtime_ns
+    assert cache.backend.get_created_at(key) == os.stat(path).st_mtime
+
+
+def test_staleness(tmp_path, backend):
+    cache = make_cache(tmp_path, backend)
+    cache.set('search:q=a', {'n': 1})
+    
+    assert cache.get_with_staleness('search:q=a', soft_ttl=3600) == ({'n': 1}, False)
+    time.sleep(0.02)
+    assert cache.get_with_staleness('search:q=a', soft_ttl=0.01) == ({'n': 1}, True)
+    assert cache.get_with_staleness('search:q=missing', soft_ttl=0.01) == (None, False)
+
+
+def test_memory_tier_charged_uncompressed_size(tmp_path, backend):
+    data = {'papers': [{'title': 'Attention Is All You Need', 'abstract': 'transformer ' * 200}] * 5}
+    raw_size = len(json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+    
+    writer = make_cache(tmp_path, backend, memory_max_mb=1)
+    writer.set('search:q=a', data)
+    assert writer.memory.stats()['total_size'] == raw_size
+    
+    # 另一个实例从存储后端读取（经过压缩编解码），内存层的占用仍按未压缩大小计算
+    reader = make_cache(tmp_path, backend, memory_max_mb=1)
+    assert reader.get('search:q=a') == data
+    assert reader.memory.stats()['total_size'] == raw_size
+    assert reader.backend.stats()['total_size'] < raw_size
+
+
+class TestMemoryTierCoherence:
+    """两个实例模拟两个工作进程：各自有内存层，共享同一个存储后端"""
+    
+    def test_other_process_write_visible_after_revalidate_interval(self, tmp_path, backend):
+        worker_a = make_cache(tmp_path, backend, memory_max_mb=1, memory_revalidate_seconds=0.05)
+        worker_b = make_cache(tmp_path, backend, memory_max_mb=1, memory_revalidate_seconds=0.05)
+        
+        worker_a.set('search:q=a', {'trajectory_summary': None})
+        assert worker_a.get('search:q=a') == {'trajectory_summary': None}
+        
+        time.sleep(0.02)
+        worker_b.set('search:q=a', {'trajectory_summary': 'done'})
+        
+        time.sleep(0.06)
+        assert worker_a.get('search:q=a') == {'trajectory_summary': 'done'}
+    
+    def test_revalidate_bypasses_stale_memory_copy(self, tmp_path, backend):
+        worker_a = make_cache(tmp_path, backend, memory_max_mb=1, memory_revalidate_seconds=3600)
+        worker_b = make_cache(tmp_path, backend, memory_max_mb=1, memory_revalidate_seconds=3600)
+        
+        worker_a.set('search:q=a', {'version': 1})
+        time.sleep(0.02)
+        worker_b.set('search:q=a', {'version': 2})
+        
+        # 核对间隔内普通读取仍使用内存层
+        assert worker_a.get('search:q=a') == {'version': 1}
+        assert worker_a.get('search:q=a', revalidate=True) == {'version': 2}
+        assert worker_a.get_with_staleness('search:q=a', 3600, revalidate=True) == ({'version': 2}, False)
+        assert worker_a.get('search:q=a') == {'version': 2}
+    
+    def test_other_process_delete_visible(self, tmp_path, backend):
+        worker_a = make_cache(tmp_path, backend, memory_max_mb=1, memory_revalidate_seconds=0)
+        worker_b = make_cache(tmp_path, backend, memory_max_mb=1, memory_revalidate_seconds=0)
+        
+        worker_a.set('search:q=a', {'n': 1})
+        worker_b.delete('search:q=a')
+        assert worker_a.get('search:q=a') is None
+    
+    def test_unchanged_entry_stays_in_memory(self, tmp_path, backend):
+        cache = make_cache(tmp_path, backend, memory_max_mb=1, memory_revalidate_seconds=0)
+        cache.set('search:q=a', {'n': 1})
+        
+        for _ in range(3):
+            assert cache.get('search:q=a') == {'n': 1}
+        assert cache.metrics.snapshot()['namespaces']['search']['memory_hits'] == 3
@@ -0,0 +1,101 @@
+"""
+后台清理测试：分批删除过期条目，以及按LRU/LFU把存储控制在容量上限内
+"""
+import os
+import time
+
+import pytest
+
+from services.cache_service import CacheService, CacheSweeper
+
+
+ENTRY_BYTES = 3000
+
+
+@pytest.fixture(params=['sqlite', 'file'])
+def backend(request):
+    return request.param
+
+
+def make_cache(tmp_path, backend, entries=0, **options):
+    """不压缩的缓存，容量上限刚好容纳 entries 个条目"""
+    max_size_mb = (entries * ENTRY_BYTES + ENTRY_BYTES // 2) / (1024 * 1024)
+    return CacheService(cache_dir=str(tmp_path), backend=backend, codec='none', max_size_mb=max_size_mb, **options)
+
+
+def fill(cache, *names):
+    for name in names:
+        cache.set(f'search:q={name}', {'blob': os.urandom(ENTRY_BYTES // 2 - 8).hex()})
+        time.sleep(0.01)
+
+
+def test_sweep_purges_expired_in_batches(tmp_path, backend):
+    cache = make_cache(tmp_path, backend)
+    for i in range(5):
+        cache.set(f'search:q={i}', {'n': i}, ttl=0)
+    cache.set('search:q=live', {'n': 'live'})
+    
+    report = cache.sweep(batch_size=2)
+    
+    assert report['expired'] == 5
+    assert report['error'] is None
+    assert cache.backend.stats()['entry_count'] == 1
+    assert cache.last_sweep is report
+
+
+def test_lru_evicts_least_recently_used(tmp_path, backend):
+    cache = make_cache(tmp_path, backend, entries=2, memory_max_mb=1)
+    fill(cache, 'a', 'b', 'c')
+    cache.get('search:q=a')
+    
+    report = cache.sweep()
+    
+    assert report['evicted'] == 1
+    assert report['evicted_keys'] == [cache._physical_key('search:q=b')]
+    assert cache.backend.stats()['total_size'] <= cache.max_bytes
+    # 内存层中的副本一起删除
+    assert cache.get('search:q=b') is None
+    assert cache.get('search:q=a') is not None
+    assert cache.get('search:q=c') is not None
+
+
+def test_lfu_evicts_least_frequently_used(tmp_path):
+    cache = make_cache(tmp_path, 'sqlite', entries=2, eviction_policy='lfu')
+    fill(cache, 'a', 'b', 'c')
+    for _ in range(3):
+        cache.get('search:q=a')
+        cache.get('search:q=c')
+    # b 最近访问过，但次数最少
+    cache.get('search:q=b')
+    
+    report = cache.sweep()
+    
+    assert report['evicted_keys'] == [cache._physical_key('search:q=b')]
+
+
+def test_no_eviction_under_budget(tmp_path, backend):
+    cache = make_cache(tmp_path, backend, entries=3)
+    fill(cache, 'a', 'b')
+    
+    assert cache.sweep()['evicted'] == 0
+
+
+def test_unknown_policy_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        make_cache(tmp_path, 'sqlite', eviction_policy='fifo')
+
+
+def test_sweeper_thread_runs_periodically(tmp_path):
+    cache = make_cache(tmp_path, 'sqlite')
+    cache.set('search:q=a', {'n': 1}, ttl=0)
+    sweeper = CacheSweeper(cache, interval_seconds=0.02)
+    
+    sweeper.start()
+    try:
+        deadline = time.monotonic() + 5
+        while cache.last_sweep is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        sweeper.stop(timeout=5)
+    
+    assert cache.last_sweep['expired'] == 1
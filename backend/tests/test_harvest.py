@@ -0,0 +1,81 @@
+"""
+增量采集测试：本地Atom feed服务（conftest.FeedServer，通过 base_url 接入）模拟arXiv API
+"""
+import sqlite3
+
+import pytest
+
+from services.arxiv_service import ArxivService
+from services.harvest_service import HarvestService
+from services.paper_store import PaperStore
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return tmp_path / 'papers.db'
+
+
+def make_harvester(feed_server, db_path):
+    arxiv_service = ArxivService(
+        base_url=feed_server.url, page_size=2, request_interval=0, max_retries=0, timeout=5
+    )
+    return HarvestService(arxiv_service, PaperStore(f'sqlite:///{db_path}'), initial_days=7, overlap_hours=1)
+
+
+def stored_ids(db_path):
+    conn = sqlite3.connect(db_path)
+    rows = [row[0] for row in conn.execute('SELECT arxiv_id FROM papers ORDER BY arxiv_id')]
+    conn.close()
+    return rows
+
+
+def test_watermark_advances(feed_server, db_path):
+    feed_server.add_papers(5)
+    harvester = make_harvester(feed_server, db_path)
+    
+    result = harvester.harvest_category('cs.CL')
+    
+    assert result['error'] is None
+    assert (result['fetched'], result['pages']) == (5, 3)
+    assert harvester.paper_store.get_watermark('cs.CL') == feed_server.papers[-1][1]
+    assert stored_ids(db_path) == [arxiv_id for arxiv_id, _ in feed_server.papers]
+    
+    # 新论文到达后，下一次只从水位线附近开始抓取
+    feed_server.add_papers(2)
+    result = harvester.harvest_category('cs.CL')
+    
+    assert result['fetched'] == 3
+    assert harvester.paper_store.get_watermark('cs.CL') == feed_server.papers[-1][1]
+    assert len(stored_ids(db_path)) == 7
+
+
+def test_resumes_after_mid_run_failure_without_duplicates(feed_server, db_path):
+    feed_server.add_papers(6)
+    feed_server.fail_starts.add(2)
+    harvester = make_harvester(feed_server, db_path)
+    
+    result = harvester.harvest_category('cs.CL')
+    
+    # 第一页已提交，水位线停在该页最后一篇
+    assert result['error'] is not None
+    assert result['pages'] == 1
+    assert harvester.paper_store.get_watermark('cs.CL') == feed_server.papers[1][1]
+    
+    # 进程重启后从水位线续采，重叠窗口内重复抓到的论文只保存一次
+    feed_server.fail_starts.clear()
+    result = make_harvester(feed_server, db_path).harvest_category('cs.CL')
+    
+    assert result['error'] is None
+    assert result['fetched'] == 5
+    assert harvester.paper_store.get_watermark('cs.CL') == feed_server.papers[-1][1]
+    assert stored_ids(db_path) == [arxiv_id for arxiv_id, _ in feed_server.papers]
+
+
+def test_empty_feed_ends_run(feed_server, db_path):
+    harvester = make_harvester(feed_server, db_path)
+    
+    result = harvester.harvest_category('cs.CL')
+    
+    assert result == {**result, 'fetched': 0, 'pages': 0, 'watermark': None, 'error': None}
+    assert len(feed_server.requests) == 1
+    assert harvester.paper_store.get_watermark('cs.CL') is None
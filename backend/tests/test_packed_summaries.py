@@ -0,0 +1,132 @@
+"""
+打包总结测试：按token预算分包、解析打包响应、只对缺失的论文单独重试
+"""
+import json
+
+import pytest
+
+from services.ai_service import AIService, AIServiceError
+from services.resilience import CircuitBreaker
+from services.token_budget import estimate_tokens
+
+
+def make_service(**options):
+    service = AIService(api_key='test', model='qwen3-test', provider='qwen3', max_retries=0, packed=True, **options)
+    service.breaker = CircuitBreaker(failure_threshold=100, reset_timeout=60)
+    return service
+
+
+def make_papers(count):
+    return [
+        {'arxiv_id': f'2401.{i:05d}', 'title': f'Paper {i}', 'summary': f'Abstract of paper {i}.'}
+        for i in range(count)
+    ]
+
+
+class TestParsePackedResponse:
+
+    def test_fenced_json(self):
+        text = '```json\n[{"arxiv_id": "2401.00001", "summary": "总结一"}]\n```'
+        assert AIService._parse_packed_response(text) == {'2401.00001': '总结一'}
+    
+    def test_text_around_array(self):
+        text = '结果如下：\n[{"arxiv_id": " 2401.00001 ", "summary": " 总结一 "}]\n以上。'
+        assert AIService._parse_packed_response(text) == {'2401.00001': '总结一'}
+    
+    def test_malformed_items_are_skipped(self):
+        text = json.dumps([
+            'not an object',
+            {'arxiv_id': '2401.00001'},
+            {'arxiv_id': 2401, 'summary': 'numeric id'},
+            {'arxiv_id': '2401.00002', 'summary': '   '},
+            {'arxiv_id': '2401.00003', 'summary': ['not', 'text']},
+            {'arxiv_id': '2401.00004', 'summary': '有效'},
+        ])
+        assert AIService._parse_packed_response(text) == {'2401.00004': '有效'}
+    
+    @pytest.mark.parametrize('text', ['', '没有数组', '[{"arxiv_id": "x", "summary": }]', '{"arxiv_id": "x"}'])
+    def test_unparseable_response(self, text):
+        assert AIService._parse_packed_response(text) == {}
+
+
+class TestPlanPacks:
+
+    def test_packs_fill_up_to_token_budget(self):
+        papers = make_papers(5)
+        overhead = estimate_tokens(make_service()._build_packed_prompt([], 200))
+        cost = estimate_tokens(AIService._format_packed_paper(papers[0])) + 200
+        service = make_service(pack_token_budget=overhead + 2 * cost)
+        
+        packs, singles = service._plan_packs(papers, list(range(5)), 200)
+        
+        # 每包两篇，剩下的一篇不单独成包
+        assert packs == [[0, 1], [2, 3]]
+        assert singles == [4]
+    
+    def test_pack_max_papers(self):
+        packs, singles = make_service(pack_max_papers=3)._plan_packs(make_papers(6), list(range(6)), 200)
+        
+        assert packs == [[0, 1, 2], [3, 4, 5]]
+        assert singles == []
+    
+    def test_unpackable_papers_go_single(self):
+        papers = make_papers(4)
+        papers[1]['arxiv_id'] = ''
+        papers[2]['arxiv_id'] = papers[0]['arxiv_id']
+        papers.append({'arxiv_id': '2401.99999', 'title': 'Huge', 'summary': 'word ' * 20000})
+        
+        packs, singles = make_service()._plan_packs(papers, list(range(5)), 200)
+        
+        assert packs == [[0, 3]]
+        assert sorted(singles) == [1, 2, 4]
+
+
+class TestSummarizePack:
+
+    def test_missing_and_extra_ids(self, monkeypatch):
+        service = make_service()
+        papers = make_papers(3)
+        response = json.dumps([
+            {'arxiv_id': papers[0]['arxiv_id'], 'summary': '总结0'},
+            {'arxiv_id': '9999.99999', 'summary': '不在请求中'},
+            {'arxiv_id': papers[2]['arxiv_id'], 'summary': '总结2'},
+        ], ensure_ascii=False)
+        monkeypatch.setattr(service, '_call_provider', lambda prompt, deadline: response)
+        
+        assert service._summarize_pack(papers, 200, None) == ['总结0', None, '总结2']
+    
+    def test_failed_request_returns_all_missing(self, monkeypatch):
+        service = make_service()
+        
+        def call_provider(prompt, deadline):
+            raise AIServiceError('HTTP 503')
+        
+        monkeypatch.setattr(service, '_call_provider', call_provider)
+        
+        assert service._summarize_pack(make_papers(2), 200, None) == [None, None]
+
+
+def test_batch_retries_only_missing_papers(monkeypatch):
+    service = make_service()
+    papers = make_papers(3)
+    prompts = []
+    
+    def call_provider(prompt, deadline):
+        prompts.append(prompt)
+        if 'JSON数组' in prompt:
+            return json.dumps([
+                {'arxiv_id': papers[0]['arxiv_id'], 'summary': '打包总结0'},
+                {'arxiv_id': papers[2]['arxiv_id'], 'summary': '打包总结2'},
+            ], ensure_ascii=False)
+        return '单独总结'
+    
+    monkeypatch.setattr(service, '_call_provider', call_provider)
+    
+    results = service.batch_summarize(papers)
+    
+    assert [result['summary'] for result in results] == ['打包总结0', '单独总结', '打包总结2']
+    assert all(result['error'] is None for result in results)
+    
+    # 一个打包请求，加上只针对缺失论文的一次单独请求
+    assert len(prompts) == 2
+    assert 'Paper 1' in prompts[1] and 'Paper 0' not in prompts[1]
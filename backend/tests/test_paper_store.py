@@ -0,0 +1,151 @@
+"""
+本地论文库测试：旧版数据库升级、FTS5查询构造与本地全文搜索
+"""
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from services.paper_store import PaperStore
+
+
+# 升级前版本的表结构（没有 comment/journal_ref、days_back/max_results 列和新索引）
+LEGACY_SCHEMA = [
+    """CREATE TABLE papers (
+        id INTEGER NOT NULL PRIMARY KEY,
+        arxiv_id VARCHAR(50) NOT NULL,
+        title VARCHAR(500) NOT NULL,
+        authors TEXT,
+        summary TEXT,
+        ai_summary TEXT,
+        published DATETIME NOT NULL,
+        url VARCHAR(200),
+        pdf_url VARCHAR(200),
+        categories VARCHAR(200),
+        keywords TEXT,
+        search_query VARCHAR(200),
+        created_at DATETIME,
+        updated_at DATETIME,
+        is_bookmarked BOOLEAN,
+        notes TEXT
+    )""",
+    "CREATE UNIQUE INDEX ix_papers_arxiv_id ON papers (arxiv_id)",
+    "CREATE INDEX ix_papers_search_query ON papers (search_query)",
+    """CREATE TABLE search_history (
+        id INTEGER NOT NULL PRIMARY KEY,
+        query VARCHAR(200) NOT NULL,
+        result_count INTEGER,
+        searched_at DATETIME
+    )""",
+    """INSERT INTO papers (arxiv_id, title, summary, published, is_bookmarked, notes)
+    VALUES ('2301.00001', 'Legacy paper', 'old abstract', '2023-01-02 00:00:00', 1, 'my note')""",
+]
+
+
+def test_legacy_database_is_migrated(tmp_path):
+    db_path = tmp_path / 'legacy.db'
+    conn = sqlite3.connect(db_path)
+    for statement in LEGACY_SCHEMA:
+        conn.execute(statement)
+    conn.commit()
+    conn.close()
+    
+    store = PaperStore(f'sqlite:///{db_path}')
+    
+    conn = sqlite3.connect(db_path)
+    paper_columns = {row[1] for row in conn.execute('PRAGMA table_info(papers)')}
+    history_columns = {row[1] for row in conn.execute('PRAGMA table_info(search_history)')}
+    indexes = {row[1] for row in conn.execute("SELECT type, name FROM sqlite_master WHERE type = 'index'")}
+    conn.close()
+    
+    assert {'comment', 'journal_ref'} <= paper_columns
+    assert {'days_back', 'max_results'} <= history_columns
+    assert {'ix_papers_published', 'ix_search_history_query'} <= indexes
+    
+    # 升级后的读写路径正常工作，本地字段保留
+    papers = [{
+        'arxiv_id': '2301.00001', 'title': 'Legacy paper', 'summary': 'new abstract',
+        'published': '2023-01-02T00:00:00', 'comment': '10 pages', 'journal_ref': None,
+        'authors': ['A'], 'categories': 'cs.CL', 'url': '', 'pdf_url': ''
+    }]
+    store.upsert_papers(papers)
+    store.record_search('legacy', 30, 10, papers, datetime.now(timezone.utc))
+    
+    assert store.get_coverage('legacy', 30, 10) is not None
+    stored = store.get_query_papers('legacy', 10)
+    assert [paper['arxiv_id'] for paper in stored] == ['2301.00001']
+    
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT notes, comment FROM papers WHERE arxiv_id = '2301.00001'").fetchone() == ('my note', '10 pages')
+    conn.close()
+
+
+def test_init_is_idempotent(tmp_path):
+    url = f"sqlite:///{tmp_path / 'papers.db'}"
+    PaperStore(url)
+    PaperStore(url)
+
+
+def make_paper(arxiv_id, title, summary, days_ago=1, categories='cs.CL'):
+    published = datetime.now(timezone.utc) - timedelta(days=days_ago)
+    return {
+        'arxiv_id': arxiv_id, 'title': title, 'summary': summary,
+        'published': published.isoformat(), 'authors': ['A. Author'],
+        'categories': categories, 'url': '', 'pdf_url': ''
+    }
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('graph neural', '"graph" "neural"'),
+    ('"large language model" agents', '"large language model" "agents"'),
+    ('transform*', '"transform"*'),
+    ('retrieval OR rag NOT vision', '"retrieval" OR "rag" NOT "vision"'),
+    ('c++ (tokenizer)', '"c++" "(tokenizer)"'),
+    ('say "hi', '"say" "hi"'),
+    ('AND graph OR', '"graph"'),
+    ('graph AND OR nets', '"graph" AND "nets"'),
+    ('', ''),
+    ('   ', ''),
+    ('"" * AND', ''),
+])
+def test_build_fts_query(query, expected):
+    assert PaperStore.build_fts_query(query) == expected
+
+
+class TestSearchLocal:
+    
+    @pytest.fixture
+    def store(self, tmp_path):
+        store = PaperStore(f"sqlite:///{tmp_path / 'papers.db'}")
+        store.upsert_papers([
+            make_paper('2401.00001', 'Graph neural networks for molecules', 'We study message passing.'),
+            make_paper('2401.00002', 'Vision transformers', 'Graph structure appears once in the abstract.'),
+            make_paper('2401.00003', 'Old graph neural network survey', 'Graph neural networks reviewed.', days_ago=400),
+            make_paper('2401.00004', 'Speech recognition', 'Acoustic models.'),
+        ])
+        return store
+    
+    def test_ranks_title_matches_first(self, store):
+        papers = store.search_local('graph')
+        
+        ids = [paper['arxiv_id'] for paper in papers]
+        assert set(ids) == {'2401.00001', '2401.00002', '2401.00003'}
+        assert ids[-1] == '2401.00002'
+        assert [paper['score'] for paper in papers] == sorted(paper['score'] for paper in papers)
+        assert all('snippet' in paper for paper in papers)
+    
+    def test_date_cutoff(self, store):
+        papers = store.search_local('graph neural', days_back=30)
+        
+        assert [paper['arxiv_id'] for paper in papers] == ['2401.00001']
+    
+    def test_date_cutoff_applies_before_limit(self, store):
+        # 最相关的旧论文被过滤后，仍返回时间窗口内的匹配
+        papers = store.search_local('graph', max_results=1, days_back=30)
+        
+        assert len(papers) == 1
+        assert papers[0]['arxiv_id'] != '2401.00003'
+    
+    def test_no_match(self, store):
+        assert store.search_local('quantum') == []
+        assert store.search_local('"" AND') == []
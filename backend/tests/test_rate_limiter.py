@@ -0,0 +1,38 @@
+"""
+供应商限流测试
+"""
+from services.rate_limiter import ProviderRateLimiter, TokenBucket
+
+
+def test_token_bucket_times_out():
+    bucket = TokenBucket(per_minute=1)
+    assert bucket.acquire(1, timeout=0)
+    assert not bucket.acquire(1, timeout=0.01)
+
+
+def test_refund_is_capped_at_capacity():
+    bucket = TokenBucket(per_minute=2)
+    bucket.refund(5)
+    assert bucket.tokens == 2
+
+
+def test_rejected_call_does_not_consume_request_budget():
+    limiter = ProviderRateLimiter(requests_per_minute=2, tokens_per_minute=100)
+    
+    # token数限额不足，请求被拒绝时退还请求数令牌
+    limiter.tokens.tokens = 0
+    for _ in range(3):
+        assert not limiter.acquire(50, timeout=0.01)
+    assert limiter.requests.tokens >= 2 - 1e-3
+    
+    limiter.tokens.tokens = 100
+    assert limiter.acquire(50, timeout=0)
+    assert limiter.acquire(50, timeout=0)
+    assert not limiter.acquire(1, timeout=0)
+
+
+def test_output_tokens_are_charged():
+    limiter = ProviderRateLimiter(tokens_per_minute=100)
+    assert limiter.acquire(60, timeout=0)
+    limiter.record_output(60)
+    assert not limiter.acquire(10, timeout=0)
@@ -0,0 +1,251 @@
+"""
+熔断器和AI供应商链容错测试
+"""
+import threading
+import time
+
+import pytest
+
+from services.ai_service import AIService, AIServiceError
+from services.resilience import CircuitBreaker, backoff_delay
+
+
+def make_service(provider='qwen3', **options):
+    """不访问网络的AI服务，熔断器独立于全局共享的实例"""
+    options.setdefault('max_retries', 0)
+    service = AIService(api_key='test', model=f'{provider}-model', provider=provider, **options)
+    service.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    return service
+
+
+class TestCircuitBreaker:
+
+    def test_opens_after_threshold(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert not breaker.allow()
+    
+    def test_success_resets_failure_count(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.CLOSED
+    
+    def test_half_open_allows_single_probe(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+        breaker.record_failure()
+        time.sleep(0.02)
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow()
+        assert not breaker.allow()
+    
+    def test_probe_success_closes(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+        breaker.record_failure()
+        time.sleep(0.02)
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.snapshot() == {'state': CircuitBreaker.CLOSED, 'consecutive_failures': 0}
+    
+    def test_probe_failure_reopens(self):
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.01)
+        for _ in range(3):
+            breaker.record_failure()
+        time.sleep(0.02)
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+    
+    def test_released_probe_can_be_retaken(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+        breaker.record_failure()
+        time.sleep(0.02)
+        allowed, token = breaker.acquire()
+        assert allowed and token is not None
+        breaker.release_probe(token)
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow()
+    
+    def test_only_probe_owner_releases(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+        assert breaker.acquire() == (True, None)
+        breaker.record_failure()
+        time.sleep(0.02)
+        
+        allowed, token = breaker.acquire()
+        assert allowed
+        # 不持有探测的调用、以及已经失效的旧令牌都不能释放当前探测
+        breaker.release_probe(None)
+        breaker.release_probe(token - 1)
+        assert not breaker.allow()
+        breaker.release_probe(token)
+        assert breaker.allow()
+    
+    def test_backoff_delay_is_capped(self):
+        for attempt in range(10):
+            assert 0 <= backoff_delay(attempt, base=0.5, cap=2) <= 2
+
+
+class TestProviderChain:
+
+    def test_non_fault_error_releases_half_open_probe(self, monkeypatch):
+        service = make_service()
+        outcomes = [
+            AIServiceError('HTTP 503'),
+            AIServiceError('Timed out before the request was sent', retryable=False, provider_fault=False),
+            'recovered',
+        ]
+        
+        def call_provider(prompt, deadline):
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+        
+        monkeypatch.setattr(service, '_call_provider', call_provider)
+        
+        assert service.generate('prompt') is None
+        assert service.breaker.state == CircuitBreaker.OPEN
+        time.sleep(0.06)
+        
+        # 探测调用因总耗时超限结束：不计失败，也不能让熔断器停在“探测中”
+        assert service.generate('prompt') is None
+        assert service.breaker.state == CircuitBreaker.HALF_OPEN
+        
+        assert service.generate('prompt') == 'recovered'
+        assert service.breaker.state == CircuitBreaker.CLOSED
+    
+    def test_unexpected_exception_releases_probe(self, monkeypatch):
+        service = make_service()
+        service.breaker.record_failure()
+        time.sleep(0.06)
+        
+        def call_provider(prompt, deadline):
+            raise RuntimeError('bug')
+        
+        monkeypatch.setattr(service, '_call_provider', call_provider)
+        try:
+            service.generate('prompt')
+        except RuntimeError:
+            pass
+        assert service.breaker.allow()
+    
+    def test_closed_call_ending_late_keeps_concurrent_probe(self, monkeypatch):
+        service = make_service()
+        started = {name: threading.Event() for name in ('closed', 'probe')}
+        finish = {name: threading.Event() for name in ('closed', 'probe')}
+        results = {}
+        
+        def call_provider(prompt, deadline):
+            started[prompt].set()
+            assert finish[prompt].wait(5)
+            if prompt == 'closed':
+                raise AIServiceError('Timed out waiting for qwen3 rate limit', retryable=False, provider_fault=False)
+            return 'probe ok'
+        
+        def run(name):
+            results[name] = service.generate(name)
+        
+        monkeypatch.setattr(service, '_call_provider', call_provider)
+        
+        # 熔断器关闭时开始的调用还在进行，其他调用让熔断器打开并进入半开状态
+        closed_call = threading.Thread(target=run, args=('closed',))
+        closed_call.start()
+        assert started['closed'].wait(5)
+        service.breaker.record_failure()
+        time.sleep(0.06)
+        
+        probe_call = threading.Thread(target=run, args=('probe',))
+        probe_call.start()
+        assert started['probe'].wait(5)
+        
+        # 先前的调用以非供应商原因结束，不能释放别的调用持有的探测名额
+        finish['closed'].set()
+        closed_call.join(5)
+        assert results['closed'] is None
+        assert not service.breaker.allow()
+        
+        finish['probe'].set()
+        probe_call.join(5)
+        assert results['probe'] == 'probe ok'
+        assert service.breaker.state == CircuitBreaker.CLOSED
+    
+    def test_retries_retryable_errors(self, monkeypatch):
+        service = make_service(max_retries=2, retry_backoff=0.001)
+        service.breaker = CircuitBreaker(failure_threshold=5, reset_timeout=60)
+        outcomes = [AIServiceError('HTTP 500'), AIServiceError('timeout'), 'ok']
+        
+        def call_provider(prompt, deadline):
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+        
+        monkeypatch.setattr(service, '_call_provider', call_provider)
+        assert service.generate('prompt') == 'ok'
+        assert outcomes == []
+        assert service.breaker.failures == 0
+    
+    def test_non_retryable_error_is_not_retried(self, monkeypatch):
+        service = make_service(max_retries=3)
+        service.breaker = CircuitBreaker(failure_threshold=5, reset_timeout=60)
+        calls = []
+        
+        def call_provider(prompt, deadline):
+            calls.append(prompt)
+            raise AIServiceError('HTTP 400', retryable=False)
+        
+        monkeypatch.setattr(service, '_call_provider', call_provider)
+        assert service.generate('prompt') is None
+        assert len(calls) == 1
+    
+    def test_fails_over_when_primary_circuit_open(self, monkeypatch):
+        fallback = make_service(provider='gemini')
+        service = make_service(fallbacks=[fallback])
+        service.breaker.record_failure()
+        
+        monkeypatch.setattr(service, '_call_provider', lambda prompt, deadline: 'primary')
+        monkeypatch.setattr(fallback, '_call_provider', lambda prompt, deadline: 'fallback')
+        assert service.generate('prompt') == 'fallback'
+        assert [status['state'] for status in service.provider_status()] == [CircuitBreaker.OPEN, CircuitBreaker.CLOSED]
+
+
+class HungGeminiModel:
+    """generate_content 一直阻塞到 release 被设置"""
+    
+    def __init__(self):
+        self.release = threading.Event()
+    
+    def generate_content(self, prompt):
+        self.release.wait(5)
+        return None
+
+
+class TestGeminiTimeout:
+
+    def test_hung_sdk_call_times_out(self):
+        service = make_service(provider='gemini', request_timeout=30)
+        service.client = HungGeminiModel()
+        started = time.monotonic()
+        try:
+            with pytest.raises(AIServiceError, match='timeout'):
+                service._call_gemini('prompt', timeout=0.1)
+            assert time.monotonic() - started < 1
+        finally:
+            service.client.release.set()
+    
+    def test_deadline_applies_to_gemini(self):
+        service = make_service(provider='gemini', request_timeout=30)
+        service.client = HungGeminiModel()
+        started = time.monotonic()
+        try:
+            assert service.generate('prompt', timeout=0.2) is None
+            assert time.monotonic() - started < 1
+        finally:
+            service.client.release.set()
@@ -0,0 +1,76 @@
+"""
+紧凑搜索结果测试：季度聚合以 paper_indices 引用论文，fields 参数投影论文字段，兼容内嵌论文的旧缓存
+"""
+from services.analysis_service import PaperAnalysisService
+
+
+def make_papers():
+    return [
+        {'arxiv_id': '2301.00001', 'title': 'First', 'summary': 'A.', 'published': '2023-01-10T00:00:00Z', 'authors': ['X']},
+        {'arxiv_id': '2301.00002', 'title': 'Second', 'summary': 'B.', 'published': '2023-05-10T00:00:00Z', 'authors': ['Y']},
+        {'arxiv_id': '2301.00003', 'title': 'Third', 'summary': 'C.', 'published': '2023-02-10T00:00:00Z', 'authors': ['Z']},
+    ]
+
+
+def test_quarterly_aggregates_reference_papers_by_index():
+    papers = make_papers()
+    
+    aggregates = PaperAnalysisService().get_quarterly_aggregates(papers)
+    
+    by_quarter = {aggregate['quarter']: aggregate for aggregate in aggregates}
+    assert by_quarter['2023-Q1']['paper_indices'] == [0, 2]
+    assert by_quarter['2023-Q1']['paper_count'] == 2
+    assert by_quarter['2023-Q2']['paper_indices'] == [1]
+    assert all('papers' not in aggregate for aggregate in aggregates)
+
+
+def test_shape_search_data_converts_legacy_quarters(app_module):
+    papers = make_papers()
+    legacy = {
+        'papers': papers,
+        'quarterly_data': [
+            {'quarter': '2023-Q1', 'paper_count': 2, 'papers': [papers[0], papers[2]]},
+            {'quarter': '2023-Q2', 'paper_count': 1, 'papers': [papers[1], {'arxiv_id': 'missing'}]},
+        ]
+    }
+    
+    data = app_module.shape_search_data(legacy, ['arxiv_id', 'title', 'unknown'])
+    
+    assert data['papers'][1] == {'arxiv_id': '2301.00002', 'title': 'Second'}
+    assert data['quarterly_data'] == [
+        {'quarter': '2023-Q1', 'paper_count': 2, 'paper_indices': [0, 2]},
+        {'quarter': '2023-Q2', 'paper_count': 1, 'paper_indices': [1]},
+    ]
+    assert app_module.shape_search_data(legacy, None)['papers'] == papers
+
+
+def test_search_projects_cached_result(app_module):
+    papers = make_papers()
+    cache_key = app_module.make_cache_key('search', query='llm', days_back=365 * 3, max_results=100)
+    app_module.cache_service.set(cache_key, {
+        'papers': papers,
+        'quarterly_data': PaperAnalysisService().get_quarterly_aggregates(papers),
+        'trajectory_summary': '已有的发展脉络'
+    })
+    client = app_module.app.test_client()
+    
+    data = client.get('/api/search?query=llm&fields=arxiv_id,published').get_json()['data']
+    
+    assert data['papers'] == [{'arxiv_id': p['arxiv_id'], 'published': p['published']} for p in papers]
+    assert {q['quarter']: q['paper_indices'] for q in data['quarterly_data']} == {'2023-Q1': [0, 2], '2023-Q2': [1]}
+    assert data['trajectory_summary'] == '已有的发展脉络'
+    
+    full = client.get('/api/search?query=llm').get_json()['data']
+    assert full['papers'] == papers
+
+
+def test_paper_endpoint_projects_fields(app_module, feed_server):
+    feed_server.add_papers(1)
+    arxiv_id = feed_server.papers[0][0]
+    client = app_module.app.test_client()
+    
+    response = client.get(f'/api/paper/{arxiv_id}?fields=title,arxiv_id')
+    
+    assert response.status_code == 200
+    assert response.get_json()['data'] == {'title': f'Paper {arxiv_id}', 'arxiv_id': arxiv_id}
+    assert 'summary' in client.get(f'/api/paper/{arxiv_id}').get_json()['data']
@@ -0,0 +1,159 @@
+"""
+单飞请求合并测试
+
+两个 SingleFlight 实例各自打开锁文件，flock 在它们之间互斥，用来模拟两个工作进程
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from services.singleflight import SingleFlight, SingleFlightError, SingleFlightTimeout, fcntl
+
+
+def test_concurrent_calls_share_one_computation():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+    
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return {'papers': [1]}
+    
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        futures = [executor.submit(flight.do, 'search:q=a', compute) for _ in range(5)]
+        time.sleep(0.1)
+        release.set()
+        results = [future.result() for future in futures]
+    
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert flight.in_flight() == 0
+
+
+def test_error_propagates_to_all_waiters_and_is_not_cached():
+    flight = SingleFlight()
+    release = threading.Event()
+    error = ValueError('arXiv unavailable')
+    
+    def failing():
+        release.wait(5)
+        raise error
+    
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = [executor.submit(flight.do, 'search:q=a', failing) for _ in range(3)]
+        time.sleep(0.1)
+        release.set()
+        for future in futures:
+            with pytest.raises(ValueError) as excinfo:
+                future.result()
+            assert excinfo.value is error
+    
+    # 失败不会被记住，下一次调用重新计算
+    assert flight.do('search:q=a', lambda: 'ok') == 'ok'
+
+
+def test_waiter_times_out():
+    flight = SingleFlight(timeout=0.05)
+    release = threading.Event()
+    
+    leader = threading.Thread(target=flight.do, args=('k', lambda: release.wait(5)))
+    leader.start()
+    time.sleep(0.02)
+    try:
+        with pytest.raises(SingleFlightTimeout):
+            flight.do('k', lambda: 'never')
+    finally:
+        release.set()
+        leader.join()
+
+
+def test_different_keys_do_not_wait_for_each_other():
+    flight = SingleFlight()
+    release = threading.Event()
+    
+    leader = threading.Thread(target=flight.do, args=('a', lambda: release.wait(5)))
+    leader.start()
+    try:
+        assert flight.do('b', lambda: 'b') == 'b'
+    finally:
+        release.set()
+        leader.join()
+
+
+@pytest.mark.skipif(fcntl is None, reason='fcntl not available')
+class TestCrossProcess:
+
+    def run_leader(self, flight, fn):
+        """在后台线程中执行 leader，返回 (线程, 已拿到锁的事件, 放行事件, 结果)"""
+        started, release, outcome = threading.Event(), threading.Event(), {}
+        
+        def compute():
+            started.set()
+            release.wait(5)
+            return fn()
+        
+        def run():
+            try:
+                outcome['result'] = flight.do('search:q=a', compute)
+            except Exception as e:
+                outcome['error'] = e
+        
+        thread = threading.Thread(target=run)
+        thread.start()
+        assert started.wait(5)
+        return thread, release, outcome
+    
+    def test_waiting_process_reads_result_via_check(self, tmp_path):
+        process_a = SingleFlight(lock_dir=str(tmp_path), poll_interval=0.01)
+        process_b = SingleFlight(lock_dir=str(tmp_path), poll_interval=0.01)
+        shared = {}
+        
+        def compute_a():
+            shared['search:q=a'] = 'from a'
+            return 'from a'
+        
+        thread, release, outcome = self.run_leader(process_a, compute_a)
+        threading.Timer(0.05, release.set).start()
+        
+        computed = []
+        result = process_b.do(
+            'search:q=a', lambda: computed.append(1) or 'from b', check=lambda: shared.get('search:q=a')
+        )
+        thread.join()
+        
+        assert outcome['result'] == 'from a'
+        assert result == 'from a'
+        assert computed == []
+    
+    def test_remote_failure_propagates(self, tmp_path):
+        process_a = SingleFlight(lock_dir=str(tmp_path), poll_interval=0.01)
+        process_b = SingleFlight(lock_dir=str(tmp_path), poll_interval=0.01)
+        
+        def failing():
+            raise RuntimeError('arXiv unavailable')
+        
+        thread, release, outcome = self.run_leader(process_a, failing)
+        threading.Timer(0.05, release.set).start()
+        
+        with pytest.raises(SingleFlightError, match='arXiv unavailable'):
+            process_b.do('search:q=a', lambda: 'from b', check=lambda: None)
+        thread.join()
+        assert isinstance(outcome['error'], RuntimeError)
+        
+        # 之后的调用不受旧错误影响
+        assert process_b.do('search:q=a', lambda: 'from b') == 'from b'
+    
+    def test_lock_wait_times_out(self, tmp_path):
+        process_a = SingleFlight(lock_dir=str(tmp_path), poll_interval=0.01)
+        process_b = SingleFlight(lock_dir=str(tmp_path), timeout=0.05, poll_interval=0.01)
+        
+        thread, release, _ = self.run_leader(process_a, lambda: 'from a')
+        try:
+            with pytest.raises(SingleFlightTimeout):
+                process_b.do('search:q=a', lambda: 'from b')
+        finally:
+            release.set()
+            thread.join()
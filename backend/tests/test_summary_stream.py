@@ -0,0 +1,99 @@
+"""
+流式总结接口测试：按完成顺序推送、缓存命中最先推送、客户端断开后取消剩余请求
+"""
+import json
+import threading
+import time
+
+import pytest
+
+from services.resilience import CircuitBreaker
+
+
+def make_papers(count):
+    return [
+        {'arxiv_id': f'2401.{i:05d}', 'title': f'Paper {i}', 'summary': f'Abstract of paper {i}.'}
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def service(app_module):
+    service = app_module.ai_service
+    service.breaker = CircuitBreaker(failure_threshold=100, reset_timeout=60)
+    return service
+
+
+def read_ndjson(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines() if line.strip()]
+
+
+def test_streams_in_completion_order_with_cached_first(app_module, service, monkeypatch):
+    papers = make_papers(3)
+    service._cache_result(service, service._summary_key('Paper 2', 'Abstract of paper 2.', 200), 'summary', '缓存的总结')
+    
+    def call_provider(prompt, deadline):
+        if 'Paper 0' in prompt:
+            time.sleep(0.3)
+        return '总结 ' + ('0' if 'Paper 0' in prompt else '1')
+    
+    monkeypatch.setattr(service, '_call_provider', call_provider)
+    
+    response = app_module.app.test_client().post('/api/summarize/stream?format=ndjson', json={'papers': papers})
+    
+    assert response.mimetype == 'application/x-ndjson'
+    events = read_ndjson(response)
+    summaries = [event for event in events if event['event'] == 'summary']
+    assert [event['index'] for event in summaries] == [2, 1, 0]
+    assert summaries[0]['cached'] is True and summaries[0]['summary'] == '缓存的总结'
+    assert summaries[2]['summary'] == '总结 0'
+    assert events[-1] == {'event': 'done', 'total': 3, 'completed': 3, 'failed': 0}
+
+
+def test_sse_format_reports_failures(app_module, service, monkeypatch):
+    def call_provider(prompt, deadline):
+        raise app_module.AIServiceError('HTTP 400', retryable=False)
+    
+    monkeypatch.setattr(service, '_call_provider', call_provider)
+    
+    response = app_module.app.test_client().post('/api/summarize/stream', json={'papers': make_papers(1)})
+    
+    assert response.mimetype == 'text/event-stream'
+    messages = [block.split('\n') for block in response.get_data(as_text=True).strip().split('\n\n')]
+    assert [lines[0] for lines in messages] == ['event: summary', 'event: done']
+    assert json.loads(messages[0][1][len('data: '):])['error']
+    assert json.loads(messages[1][1][len('data: '):]) == {'total': 1, 'completed': 1, 'failed': 1}
+
+
+def test_disconnect_cancels_remaining_work(app_module, service, monkeypatch):
+    service.max_workers = 1
+    gate = threading.Semaphore(1)
+    calls = []
+    
+    def call_provider(prompt, deadline):
+        calls.append(prompt)
+        assert gate.acquire(timeout=5)
+        return '总结'
+    
+    monkeypatch.setattr(service, '_call_provider', call_provider)
+    
+    response = app_module.app.test_client().post(
+        '/api/summarize/stream?format=ndjson', json={'papers': make_papers(5)}, buffered=False
+    )
+    first = json.loads(next(iter(response.response)))
+    assert first['event'] == 'summary'
+    
+    # 客户端断开：尚未开始的请求被取消，正在进行的请求结束后不再发起新的请求
+    response.close()
+    time.sleep(1)
+    for _ in range(5):
+        gate.release()
+    time.sleep(0.2)
+    
+    assert len(calls) == 2
+
+
+def test_requires_papers(app_module):
+    response = app_module.app.test_client().post('/api/summarize/stream', json={})
+    
+    assert response.status_code == 400
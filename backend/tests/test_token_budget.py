@@ -0,0 +1,135 @@
+"""
+提示词预算测试：token估算、按预算截断和去重摘要，以及分析服务经由 AIService.generate 生成
+"""
+import pytest
+
+from services.ai_service import AIService
+from services.analysis_service import PaperAnalysisService
+from services.resilience import CircuitBreaker
+from services.token_budget import estimate_tokens, fit_papers_to_budget, truncate_to_tokens
+
+
+@pytest.mark.parametrize('text, tokens', [
+    ('', 0),
+    ('abcd', 1),
+    ('abcde', 2),
+    ('大型语言模型', 6),
+    ('LLM 推理', 3),
+])
+def test_estimate_tokens(text, tokens):
+    assert estimate_tokens(text) == tokens
+
+
+class TestTruncate:
+
+    def test_short_text_only_normalizes_whitespace(self):
+        assert truncate_to_tokens('  graph   neural\nnetworks ', 100) == 'graph neural networks'
+    
+    def test_truncates_at_word_boundary(self):
+        text = 'message passing networks learn molecular properties from graphs ' * 10
+        
+        truncated = truncate_to_tokens(text, 20)
+        
+        assert truncated.endswith('…')
+        assert estimate_tokens(truncated) <= 20
+        assert text.startswith(truncated[:-1])
+        assert truncated[:-1].split()[-1] in text.split()
+    
+    def test_budget_smaller_than_ellipsis(self):
+        assert truncate_to_tokens('long text ' * 10, 0) == ''
+
+
+def make_paper(arxiv_id, title, summary):
+    return {'arxiv_id': arxiv_id, 'title': title, 'summary': summary}
+
+
+class TestFitPapers:
+
+    def test_deduplicates_versions_titles_and_abstracts(self):
+        papers = [
+            make_paper('2401.00001v2', 'Graph Networks', 'Abstract one.'),
+            make_paper('2401.00001v1', 'Graph Networks (v1)', 'Older abstract.'),
+            make_paper('2401.00002', 'graph networks!', 'Different abstract.'),
+            make_paper('2401.00003', 'Other title', 'abstract ONE'),
+            make_paper('2401.00004', 'Fresh title', 'Fresh abstract.'),
+        ]
+        
+        entries, omitted = fit_papers_to_budget(papers, 1000)
+        
+        assert [entry['title'] for entry in entries] == ['Graph Networks', 'Fresh title']
+        assert omitted == 0
+    
+    def test_titles_beyond_budget_are_omitted(self):
+        papers = [make_paper(f'2401.{i:05d}', f'Title number {i}', '') for i in range(10)]
+        
+        entries, omitted = fit_papers_to_budget(papers, 4 * 8)
+        
+        assert len(entries) == 4
+        assert omitted == 6
+    
+    def test_abstracts_share_remaining_budget(self):
+        long_abstract = 'word ' * 400
+        papers = [
+            make_paper('1', 'A', 'A short abstract that fits well within its share.'),
+            make_paper('2', 'B', long_abstract),
+            make_paper('3', 'C', long_abstract + 'x'),
+        ]
+        
+        entries, _ = fit_papers_to_budget(papers, 200, max_abstract_tokens=120)
+        
+        assert entries[0]['abstract'] == 'A short abstract that fits well within its share.'
+        assert all(entry['abstract'].endswith('…') for entry in entries[1:])
+        total = sum(estimate_tokens(entry['title']) + 4 + estimate_tokens(entry['abstract']) for entry in entries)
+        assert total <= 200
+    
+    def test_abstract_dropped_below_minimum(self):
+        entries, _ = fit_papers_to_budget([make_paper('1', 'Title', 'word ' * 100)], 10, min_abstract_tokens=12)
+        
+        assert entries == [{'title': 'Title', 'abstract': ''}]
+
+
+class TestAnalysisPrompts:
+    """分析服务经由供应商无关的 AIService.generate 生成，提示词大小受预算限制"""
+    
+    @pytest.fixture
+    def prompts(self, monkeypatch):
+        prompts = []
+        service = AIService(api_key='test', model='qwen3-test', provider='qwen3', max_retries=0)
+        service.breaker = CircuitBreaker(failure_threshold=100, reset_timeout=60)
+        
+        def call_provider(prompt, deadline):
+            prompts.append(prompt)
+            return '生成的内容'
+        
+        monkeypatch.setattr(service, '_call_provider', call_provider)
+        self.analysis = PaperAnalysisService(
+            ai_service=service, hierarchical=False,
+            trajectory_token_budget=400, quarter_token_budget=300, max_abstract_tokens=40
+        )
+        return prompts
+    
+    @staticmethod
+    def many_papers(count=200):
+        return [
+            {
+                'arxiv_id': f'2301.{i:05d}', 'title': f'Study {i} of retrieval augmented generation',
+                'summary': f'Paper {i} ' + 'describes a long method in great detail. ' * 40,
+                'published': f'2023-{i % 3 + 1:02d}-15T00:00:00Z'
+            }
+            for i in range(count)
+        ]
+    
+    def test_trajectory_prompt_fits_budget(self, prompts):
+        assert self.analysis.generate_trajectory_summary(self.many_papers()) == '生成的内容'
+        
+        assert len(prompts) == 1
+        # 论文部分不超过预算，其余为固定的模板文字
+        assert estimate_tokens(prompts[0]) < 400 + 400
+        assert '篇较早的论文未列出' in prompts[0]
+    
+    def test_quarter_prompt_fits_budget(self, prompts):
+        assert self.analysis.generate_quarterly_summaries(self.many_papers()) == {'2023-Q1': '生成的内容'}
+        
+        assert len(prompts) == 1
+        assert estimate_tokens(prompts[0]) < 300 + 400
+        assert '篇论文未列出' in prompts[0]
@@ -0,0 +1,158 @@
+"""
+分层发展脉络测试：各季度综述并发生成并缓存，已结束季度不再重新生成，发展脉络由季度综述归约而来
+"""
+import re
+import threading
+from datetime import datetime, timezone
+
+import pytest
+
+from services.ai_service import AIService, AIServiceError
+from services.analysis_service import PaperAnalysisService
+from services.cache_service import CacheService
+from services.resilience import CircuitBreaker
+
+
+CLOSED_TTL = 180 * 24 * 3600
+OPEN_TTL = 3600
+
+
+def current_quarter():
+    now = datetime.now(timezone.utc)
+    return now, f'{now.year}-Q{(now.month - 1) // 3 + 1}'
+
+
+def make_papers():
+    now, _ = current_quarter()
+    year = now.year - 1
+    papers = []
+    for i, month in enumerate([2, 2, 5, 5, 5]):
+        papers.append({
+            'arxiv_id': f'{year % 100:02d}{month:02d}.{i:05d}', 'title': f'Closed paper {i}',
+            'summary': f'Abstract {i}.', 'published': f'{year}-{month:02d}-10T00:00:00Z'
+        })
+    papers.append({
+        'arxiv_id': '9999.00001', 'title': 'Open paper 1', 'summary': 'Open abstract.',
+        'published': now.strftime('%Y-%m-%dT00:00:00Z')
+    })
+    return papers
+
+
+class FakeProvider:
+    """按提示词类型返回季度综述或发展脉络，并记录每次调用"""
+    
+    def __init__(self):
+        self.calls = []
+        self.prompts = []
+        self.lock = threading.Lock()
+        self.fail = False
+    
+    def __call__(self, prompt, deadline):
+        quarter = re.search(r'在(\d{4}-Q\d)期间', prompt)
+        with self.lock:
+            self.calls.append(quarter.group(1) if quarter else 'reduce')
+            self.prompts.append(prompt)
+        if self.fail:
+            raise AIServiceError('HTTP 503', retryable=False)
+        return f'{quarter.group(1)} 综述' if quarter else '发展脉络'
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return CacheService(cache_dir=str(tmp_path), memory_max_mb=0)
+
+
+@pytest.fixture
+def provider():
+    return FakeProvider()
+
+
+@pytest.fixture
+def analysis(cache, provider, monkeypatch):
+    service = AIService(api_key='test', model='qwen3-test', provider='qwen3', max_retries=0)
+    service.breaker = CircuitBreaker(failure_threshold=100, reset_timeout=60)
+    monkeypatch.setattr(service, '_call_provider', provider)
+    return PaperAnalysisService(
+        ai_service=service, cache_service=cache, closed_quarter_ttl=CLOSED_TTL, open_quarter_ttl=OPEN_TTL
+    )
+
+
+def test_reduces_over_all_quarter_summaries(analysis, provider):
+    papers = make_papers()
+    _, open_quarter = current_quarter()
+    year = datetime.now(timezone.utc).year - 1
+    
+    assert analysis.generate_trajectory_summary(papers) == '发展脉络'
+    
+    assert sorted(provider.calls) == sorted([f'{year}-Q1', f'{year}-Q2', open_quarter, 'reduce'])
+    assert provider.calls[-1] == 'reduce'
+    
+    # 归约提示词覆盖全部论文，季度按时间从早到晚排列
+    reduce_prompt = provider.prompts[-1]
+    assert f'共{len(papers)}篇论文' in reduce_prompt
+    positions = [reduce_prompt.index(f'【{quarter}') for quarter in (f'{year}-Q1', f'{year}-Q2', open_quarter)]
+    assert positions == sorted(positions)
+    assert f'{year}-Q2 综述' in reduce_prompt
+
+
+def test_repeat_search_is_served_from_cache(analysis, provider):
+    papers = make_papers()
+    analysis.generate_trajectory_summary(papers)
+    provider.calls.clear()
+    
+    assert analysis.generate_trajectory_summary(papers) == '发展脉络'
+    assert provider.calls == []
+
+
+def test_new_paper_only_recomputes_open_quarter(analysis, provider):
+    papers = make_papers()
+    analysis.generate_trajectory_summary(papers)
+    provider.calls.clear()
+    
+    now, open_quarter = current_quarter()
+    papers.append({
+        'arxiv_id': '9999.00002', 'title': 'Open paper 2', 'summary': 'Another abstract.',
+        'published': now.strftime('%Y-%m-%dT00:00:00Z')
+    })
+    
+    assert analysis.generate_trajectory_summary(papers) == '发展脉络'
+    assert provider.calls == [open_quarter, 'reduce']
+
+
+def test_closed_quarters_cached_with_long_ttl(analysis, cache, monkeypatch):
+    ttls = {}
+    original_set = cache.set
+    
+    def record_set(key, data, ttl=None, tags=None):
+        ttls[key.split(':', 1)[0], data['summary']] = ttl
+        return original_set(key, data, ttl, tags)
+    
+    monkeypatch.setattr(cache, 'set', record_set)
+    _, open_quarter = current_quarter()
+    year = datetime.now(timezone.utc).year - 1
+    
+    analysis.generate_trajectory_summary(make_papers())
+    
+    assert ttls[('quarter', f'{year}-Q1 综述')] == CLOSED_TTL
+    assert ttls[('quarter', f'{open_quarter} 综述')] == OPEN_TTL
+    # 包含当前季度的发展脉络会随新论文变化
+    assert ttls[('trajectory', '发展脉络')] == OPEN_TTL
+
+
+def test_falls_back_when_no_quarter_summary_generated(analysis, provider, cache):
+    provider.fail = True
+    
+    trajectory = analysis.generate_trajectory_summary(make_papers())
+    
+    assert trajectory.startswith('【研究概览】')
+    assert 'reduce' not in provider.calls
+    assert cache.backend.stats()['entry_count'] == 0
+
+
+@pytest.mark.parametrize('quarter_key, now, closed', [
+    ('2024-Q4', datetime(2025, 1, 1, tzinfo=timezone.utc), True),
+    ('2024-Q4', datetime(2024, 12, 31, 23, 59, tzinfo=timezone.utc), False),
+    ('2024-Q1', datetime(2024, 4, 1, tzinfo=timezone.utc), True),
+])
+def test_quarter_is_closed(quarter_key, now, closed):
+    assert PaperAnalysisService._quarter_is_closed(quarter_key, now) is closed
@@ -3,7 +3,7 @@
 使用SQLAlchemy定义数据库结构
 """
 from datetime import datetime
-from sqlalchemy import create_engine, Column, String, Text, DateTime, Integer, Boolean
+from sqlalchemy import create_engine, inspect, text, Column, String, Text, DateTime, Integer, Boolean, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -19,10 +19,12 @@ class Paper(Base):
     authors = Column(Text, nullable=True)  # JSON格式存储
     summary = Column(Text, nullable=True)
     ai_summary = Column(Text, nullable=True)  # AI生成的总结
-    published = Column(DateTime, nullable=False)
+    published = Column(DateTime, nullable=False, index=True)
     url = Column(String(200), nullable=True)
     pdf_url = Column(String(200), nullable=True)
     categories = Column(String(200), nullable=True)
+    comment = Column(Text, nullable=True)  # arXiv作者备注
+    journal_ref = Column(String(500), nullable=True)  # 期刊引用信息
     keywords = Column(Text, nullable=True)  # JSON格式存储
     search_query = Column(String(200), nullable=True, index=True)  # 用于追踪搜索源
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -46,6 +48,8 @@ class Paper(Base):
             'url': self.url,
             'pdf_url': self.pdf_url,
             'categories': self.categories,
+            'comment': self.comment,
+            'journal_ref': self.journal_ref,
             'keywords': self.keywords,
             'is_bookmarked': self.is_bookmarked,
             'notes': self.notes,
@@ -57,14 +61,45 @@ class SearchHistory(Base):
     __tablename__ = 'search_history'
     
     id = Column(Integer, primary_key=True)
-    query = Column(String(200), nullable=False)
+    query = Column(String(200), nullable=False, index=True)
     result_count = Column(Integer, default=0)
+    days_back = Column(Integer, nullable=True)  # 本次搜索的时间范围
+    max_results = Column(Integer, nullable=True)  # 本次向arXiv请求的论文数
     searched_at = Column(DateTime, default=datetime.utcnow)
     
     def __repr__(self):
         return f'<SearchHistory {self.query}>'
 
 
+class SearchResult(Base):
+    """搜索结果关联模型（查询 -> 论文）"""
+    __tablename__ = 'search_results'
+    __table_args__ = (
+        Index('ix_search_results_query_published', 'query', 'published'),
+    )
+    
+    query = Column(String(200), primary_key=True)
+    arxiv_id = Column(String(50), primary_key=True)
+    published = Column(DateTime, nullable=False)  # 冗余存储，便于按时间取最新结果
+    
+    def __repr__(self):
+        return f'<SearchResult {self.query} -> {self.arxiv_id}>'
+
+
+
+class HarvestState(Base):
+    """增量采集状态模型（每个分类一条水位线）"""
+    __tablename__ = 'harvest_state'
+    
+    category = Column(String(50), primary_key=True)
+    watermark = Column(DateTime, nullable=False)  # 已采集论文的最新提交时间
+    harvested_count = Column(Integer, default=0)
+    last_run_at = Column(DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f'<HarvestState {self.category} @ {self.watermark}>'
+
+
 def init_db(database_url: str = 'sqlite:///./arxiv_papers.db'):
     """
     初始化数据库
@@ -74,4 +109,43 @@ def init_db(database_url: str = 'sqlite:///./arxiv_papers.db'):
     """
     engine = create_engine(database_url, echo=False)
     Base.metadata.create_all(engine)
+    migrate_db(engine)
     return engine, sessionmaker(bind=engine)
+
+
+def migrate_db(engine):
+    """
+    为旧版数据库中已存在的表补上新增的列和索引
+    
+    create_all 只创建缺少的表，不会修改已存在的表；新增的列都可为空，
+    用 ALTER TABLE ADD COLUMN 补齐，索引按名称补建
+    
+    Args:
+        engine: 数据库引擎
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            
+            columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in columns:
+                    continue
+                if not column.nullable:
+                    raise RuntimeError(
+                        f'Cannot add NOT NULL column {table.name}.{column.name} to an existing database, '
+                        f'please rebuild the database'
+                    )
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                print(f"[INFO] Added column {table.name}.{column.name}")
+            
+            indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexes:
+                    index.create(conn)
+                    print(f"[INFO] Created index {index.name}")
@@ -32,8 +32,13 @@ let appState = {
     currentPapers: [],
     apiResponse: null,  // 保存完整的API响应
     isLoading: false,
+    summaryStream: null,  // 进行中的AI总结流，新的搜索开始时中止
+    trajectoryJob: null,  // 正在轮询的发展脉络任务ID，新的搜索开始时停止轮询
 };
 
+// 发展脉络任务的轮询间隔(毫秒)
+const JOB_POLL_INTERVAL = 1500;
+
 // ==================== 初始化 ====================
 
 document.addEventListener('DOMContentLoaded', () => {
@@ -106,18 +111,24 @@ async function handleSearch() {
             timestamp: Date.now()
         }));
         
-        // 如果启用AI总结，则获取总结
-        if (elements.aiSummaryCheckbox.checked && papers.length > 0) {
-            await fetchAISummaries(papers);
-        }
-        
         // 显示结果
         displayResults(papers);
+        
+        // 如果启用AI总结，则在后台逐篇接收总结（不阻塞结果显示）
+        if (elements.aiSummaryCheckbox.checked && papers.length > 0) {
+            fetchAISummaries(papers);
+        }
         showStats(papers.length, data.from_cache);
         
         // 如果有完整的API响应数据，显示发展脉络和季度汇总
+        appState.trajectoryJob = null;
         if (appState.apiResponse && appState.apiResponse.trajectory_summary !== undefined) {
             displayTrajectoryAndQuarterly(appState.apiResponse);
+            
+            // 发展脉络在后台生成时轮询任务结果
+            if (appState.apiResponse.trajectory_job_id) {
+                pollTrajectoryJob(appState.apiResponse.trajectory_job_id);
+            }
         }
         
     } catch (error) {
@@ -134,11 +145,19 @@ function handleClear() {
     hideStats();
     hideError();
     localStorage.removeItem('lastSearch');
+    appState.trajectoryJob = null;
 }
 
 // ==================== API调用 ====================
 
 async function fetchAISummaries(papers) {
+    // 中止上一次搜索尚未完成的总结流，服务端会取消剩余请求
+    if (appState.summaryStream) {
+        appState.summaryStream.abort();
+    }
+    const controller = new AbortController();
+    appState.summaryStream = controller;
+    
     try {
         const paperData = papers.map(p => ({
             arxiv_id: p.arxiv_id,
@@ -146,7 +165,7 @@ async function fetchAISummaries(papers) {
             summary: p.summary
         }));
         
-        const response = await fetch(`${API_BASE_URL}/summarize`, {
+        const response = await fetch(`${API_BASE_URL}/summarize/stream?format=ndjson`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -154,28 +173,75 @@ async function fetchAISummaries(papers) {
             body: JSON.stringify({
                 papers: paperData,
                 max_length: 200
-            })
+            }),
+            signal: controller.signal
         });
         
-        if (response.ok) {
-            const data = await response.json();
+        if (!response.ok || !response.body) {
+            return;
+        }
+        
+        // 每行一个事件，总结完成一篇就合并一篇到papers中（详情弹窗直接读取）
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
             
-            // 将AI总结合并到papers中
-            if (data.data && Array.isArray(data.data)) {
-                const summaryMap = {};
-                data.data.forEach(item => {
-                    summaryMap[item.arxiv_id] = item.summary;
-                });
-                
-                appState.currentPapers = papers.map(p => ({
-                    ...p,
-                    ai_summary: summaryMap[p.arxiv_id] || null
-                }));
-            }
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+            
+            lines.filter(line => line.trim()).forEach(line => {
+                const item = JSON.parse(line);
+                if (item.event === 'summary' && item.summary && papers[item.index]) {
+                    papers[item.index].ai_summary = item.summary;
+                }
+            });
         }
     } catch (error) {
-        console.error('AI summarization error:', error);
+        if (error.name !== 'AbortError') {
+            console.error('AI summarization error:', error);
+        }
         // 继续显示论文，即使AI总结失败
+    } finally {
+        if (appState.summaryStream === controller) {
+            appState.summaryStream = null;
+        }
+    }
+}
+
+async function pollTrajectoryJob(jobId) {
+    appState.trajectoryJob = jobId;
+    
+    while (appState.trajectoryJob === jobId) {
+        try {
+            const response = await fetch(`${API_BASE_URL}/jobs/${jobId}`);
+            const data = await response.json();
+            
+            // 任务已过期或不存在
+            if (!response.ok || data.status !== 'success') {
+                break;
+            }
+            
+            if (data.data.status === 'done' || data.data.status === 'failed') {
+                if (appState.trajectoryJob === jobId) {
+                    appState.apiResponse.trajectory_summary = data.data.result;
+                    displayTrajectory(data.data.result);
+                }
+                break;
+            }
+        } catch (error) {
+            console.error('Trajectory job polling error:', error);
+        }
+        
+        await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL));
+    }
+    
+    if (appState.trajectoryJob === jobId) {
+        appState.trajectoryJob = null;
     }
 }
 
@@ -341,20 +407,22 @@ function displayTrajectoryAndQuarterly(data) {
     // 显示容器
     resultsContainer.classList.remove('hidden');
     
-    // 显示发展脉络总结（左栏）
-    displayTrajectory(data.trajectory_summary);
+    // 显示发展脉络总结（左栏），后台生成中时显示等待提示
+    displayTrajectory(data.trajectory_summary, Boolean(data.trajectory_job_id));
     
     // 显示季度聚合（右栏）
     displayQuarterly(data.quarterly_data);
 }
 
-function displayTrajectory(trajectory) {
+function displayTrajectory(trajectory, pending = false) {
     const trajectoryContent = document.getElementById('trajectoryContent');
     
     if (!trajectoryContent) return;
     
     if (trajectory) {
         trajectoryContent.innerHTML = `<p>${escapeHtml(trajectory)}</p>`;
+    } else if (pending) {
+        trajectoryContent.innerHTML = '<p style="color: var(--text-light);">发展脉络总结生成中...</p>';
     } else {
         trajectoryContent.innerHTML = '<p style="color: var(--text-light);">暂无发展脉络总结</p>';
     }